@@ -1,5 +1,6 @@
 import React, { useState } from 'react';
-import type { Product } from '../types';
+import type { LinkHealthSummary, MigrationJobStatus, Product } from '../types';
+import { apiService } from '../services/apiService';
 import Spinner from './ui/Spinner';
 import { parseLabeledLines, formatLabeledLines } from '../utils/urlUtils';
 
@@ -35,6 +36,47 @@ const DeveloperDashboard: React.FC<DeveloperDashboardProps> = ({
   const [editTitle, setEditTitle] = useState('');
   const [editDescription, setEditDescription] = useState('');
   const [editImageUrl, setEditImageUrl] = useState('');
+  const [migration, setMigration] = useState<MigrationJobStatus | null>(null);
+  const [linkHealth, setLinkHealth] = useState<LinkHealthSummary | null>(null);
+  const [isLoadingHealth, setIsLoadingHealth] = useState(false);
+
+  // Start (or join) the background link migration and poll it until it finishes
+  const handleMigrateLinks = async () => {
+    try {
+      let job = await apiService.migrateLinks();
+      setMigration(job);
+      while (job.status === 'running') {
+        await new Promise((resolve) => setTimeout(resolve, 2000));
+        job = await apiService.getMigrationStatus();
+        setMigration(job);
+      }
+      if (job.status === 'done') {
+        alert(`Migration complete. Scanned: ${job.scanned}/${job.total}, Updated: ${job.updated}. Reloading products...`);
+        window.location.reload();
+      } else {
+        alert(`Migration ${job.status}${job.error ? `: ${job.error}` : ''}. Products updated so far are kept.`);
+      }
+    } catch (e) {
+      alert('Migration failed. Ensure you are logged in and the server is reachable.');
+    } finally {
+      setMigration(null);
+    }
+  };
+
+  const handleToggleLinkHealth = async () => {
+    if (linkHealth) {
+      setLinkHealth(null);
+      return;
+    }
+    setIsLoadingHealth(true);
+    try {
+      setLinkHealth(await apiService.getLinkHealth());
+    } catch (e) {
+      alert('Could not load link health. Ensure you are logged in and the server is reachable.');
+    } finally {
+      setIsLoadingHealth(false);
+    }
+  };
 
   const handleSubmit = (e: React.FormEvent) => {
     e.preventDefault();
@@ -273,30 +315,61 @@ const DeveloperDashboard: React.FC<DeveloperDashboardProps> = ({
               <h3 className="text-2xl font-bold text-gray-800 dark:text-slate-100">
                 Your Shoppable Feed ({products.length})
               </h3>
-              <button
-                type="button"
-                className="px-4 py-2 text-sm font-medium rounded-lg bg-indigo-50 dark:bg-slate-900/40 text-indigo-700 dark:text-indigo-300 hover:bg-indigo-100 border border-indigo-200 dark:border-slate-700 transition-colors"
-                onClick={async () => {
-                  try {
-                    const res = await (
-                      await fetch(
-                        (import.meta as any).env?.VITE_API_URL
-                          ? `${(import.meta as any).env.VITE_API_URL}/admin/debug/migrate-links`
-                          : 'http://localhost:8000/api/admin/debug/migrate-links',
-                        { method: 'POST', credentials: 'include' }
-                      )
-                    ).json();
-                    alert(`Migration complete. Scanned: ${res.scanned}, Updated: ${res.updated}. Reloading products...`);
-                    window.location.reload();
-                  } catch (e) {
-                    alert('Migration failed. Ensure you are logged in and the server is reachable.');
-                  }
-                }}
-              >
-                Fix existing links
-              </button>
+              <div className="flex items-center gap-3">
+                <button
+                  type="button"
+                  className="px-4 py-2 text-sm font-medium rounded-lg bg-white dark:bg-slate-900/40 text-gray-700 dark:text-slate-300 hover:bg-gray-50 border border-gray-200 dark:border-slate-700 transition-colors disabled:opacity-60 disabled:cursor-not-allowed"
+                  onClick={handleToggleLinkHealth}
+                  disabled={isLoadingHealth}
+                >
+                  {isLoadingHealth ? 'Loading…' : linkHealth ? 'Hide link health' : 'Link health'}
+                </button>
+                <button
+                  type="button"
+                  className="px-4 py-2 text-sm font-medium rounded-lg bg-indigo-50 dark:bg-slate-900/40 text-indigo-700 dark:text-indigo-300 hover:bg-indigo-100 border border-indigo-200 dark:border-slate-700 transition-colors disabled:opacity-60 disabled:cursor-not-allowed"
+                  onClick={handleMigrateLinks}
+                  disabled={migration !== null}
+                >
+                  {migration
+                    ? `Fixing links… ${Math.round(migration.progress * 100)}%${migration.eta_seconds != null ? ` (~${Math.ceil(migration.eta_seconds)}s left)` : ''}`
+                    : 'Fix existing links'}
+                </button>
+              </div>
             </div>
 
+            {linkHealth && (
+              <div className="mb-8 bg-white dark:bg-slate-800 p-6 rounded-2xl border border-gray-200 dark:border-gray-700">
+                <div className="flex flex-wrap gap-4 text-sm text-gray-600 dark:text-slate-300">
+                  <span>OK: <strong>{linkHealth.by_status.ok}</strong></span>
+                  <span>Redirected: <strong className="text-amber-600 dark:text-amber-400">{linkHealth.by_status.redirected}</strong></span>
+                  <span>Dead: <strong className="text-red-600 dark:text-red-400">{linkHealth.by_status.dead}</strong></span>
+                  <span>Unchecked: <strong>{linkHealth.by_status.unchecked}</strong></span>
+                  <span>Due for a check: <strong>{linkHealth.due}</strong></span>
+                  {!linkHealth.enabled && <span className="text-gray-400">(scheduled checks are off)</span>}
+                </div>
+                {linkHealth.problems.length === 0 ? (
+                  <p className="mt-4 text-sm text-gray-500 dark:text-slate-400">No dead or redirected links.</p>
+                ) : (
+                  <ul className="mt-4 space-y-2 text-sm">
+                    {linkHealth.problems.map(problem => (
+                      <li key={`${problem.product_id}-${problem.position}`} className="flex flex-col sm:flex-row sm:items-center gap-1 sm:gap-3">
+                        <span className={`shrink-0 px-2 py-0.5 rounded text-xs font-semibold ${problem.check_status === 'dead' ? 'bg-red-50 text-red-700 dark:bg-red-900/20 dark:text-red-300' : 'bg-amber-50 text-amber-700 dark:bg-amber-900/20 dark:text-amber-300'}`}>
+                          {problem.check_status}{problem.http_status ? ` ${problem.http_status}` : ''}
+                        </span>
+                        <span className="font-medium text-gray-800 dark:text-slate-100 truncate">{problem.product_title}</span>
+                        <a href={problem.resolved_url} target="_blank" rel="noopener noreferrer" className="text-indigo-600 dark:text-indigo-400 hover:underline truncate" title={problem.resolved_url}>
+                          {problem.label || problem.resolved_url}
+                        </a>
+                        {problem.redirect_url && (
+                          <span className="text-gray-500 dark:text-slate-400 truncate" title={problem.redirect_url}>→ {problem.redirect_url}</span>
+                        )}
+                      </li>
+                    ))}
+                  </ul>
+                )}
+              </div>
+            )}
+
             <div className="grid grid-cols-1 sm:grid-cols-2 lg:grid-cols-3 gap-8">
               {products.map(product => {
                 const links = parseLabeledLines(product.productUrl);
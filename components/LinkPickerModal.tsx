@@ -98,6 +98,7 @@ const LinkPickerModal: React.FC<LinkPickerModalProps> = ({ items, open, title =
 
   useEffect(() => {
     let cancelled = false;
+    const controller = new AbortController();
 
     async function run() {
       const channel3Idx: number[] = [];
@@ -121,19 +122,40 @@ const LinkPickerModal: React.FC<LinkPickerModalProps> = ({ items, open, title =
       }
 
       try {
-        const { resolved, titles } = await apiService.publicResolveAndTitles(channel3Urls);
-        let merged = items.map((it, i) => {
-          const idx = channel3Idx.indexOf(i);
-          if (idx !== -1) {
-            const newUrl = guardLocalhost(resolved[idx] || it.url, it.url);
-            const fetched = (titles[idx] || '') as string;
-            const newLabelRaw = fetched && fetched.trim().length > 0 ? fetched.trim() : inferLabelFromUrl(newUrl);
-            const newLabel = sanitizeLabel(newLabelRaw, newUrl);
-            // For Channel3 items, always override label with fetched title or inferred label
-            return { url: newUrl, label: newLabel };
+        let merged = [...items];
+        const applied = new Set<number>();
+        const applyResult = (pos: number, resolvedUrl: string | undefined, fetchedTitle: string | null | undefined) => {
+          const i = channel3Idx[pos];
+          const it = items[i];
+          const newUrl = guardLocalhost(resolvedUrl || it.url, it.url);
+          const fetched = (fetchedTitle || '') as string;
+          const newLabelRaw = fetched && fetched.trim().length > 0 ? fetched.trim() : inferLabelFromUrl(newUrl);
+          const newLabel = sanitizeLabel(newLabelRaw, newUrl);
+          // For Channel3 items, always override label with fetched title or inferred label
+          merged[i] = { url: newUrl, label: newLabel };
+          applied.add(pos);
+        };
+
+        // Stream results so each row fills in as soon as its link is resolved
+        const streamed = await apiService.publicResolveStream(
+          channel3Urls,
+          (pos, resolvedUrl, fetchedTitle) => {
+            applyResult(pos, resolvedUrl, fetchedTitle);
+            if (!cancelled) setResolvedItems([...merged]);
+          },
+          controller.signal
+        );
+        if (cancelled) return;
+        if (!streamed) {
+          // Stream unavailable or cut short: fill the remaining rows from the JSON resolver
+          const pending = channel3Urls.map((_, pos) => pos).filter((pos) => !applied.has(pos));
+          if (pending.length) {
+            const { resolved, titles } = await apiService.publicResolveAndTitles(pending.map((pos) => channel3Urls[pos]));
+            pending.forEach((pos, k) => {
+              if (k < resolved.length) applyResult(pos, resolved[k], titles[k]);
+            });
           }
-          return it;
-        });
+        }
 
         // Second pass: any rows still pointing to trychannel3 get re-resolved individually
         const stillIdx: number[] = [];
@@ -178,6 +200,7 @@ const LinkPickerModal: React.FC<LinkPickerModalProps> = ({ items, open, title =
 
     return () => {
       cancelled = true;
+      controller.abort();
     };
   }, [open, items]);
 
@@ -14,7 +14,14 @@ const PublicProductPage: React.FC<PublicProductPageProps> = ({ product, influenc
   const displayImageUrl =
     product.customImageUrl || product.imageUrl || `https://picsum.photos/seed/${encodeURIComponent(product.slug)}/400/400`;
 
-  const items = useMemo(() => parseLabeledLines(product.productUrl), [product.productUrl]);
+  // Prefer the structured links from the API; older payloads only carry the text form
+  const items = useMemo(
+    () =>
+      product.links && product.links.length > 0
+        ? product.links.map((l) => ({ label: l.label, url: l.url }))
+        : parseLabeledLines(product.productUrl),
+    [product.links, product.productUrl]
+  );
   const [pickerOpen, setPickerOpen] = useState(false);
 
   const handleShopClick = useCallback(() => {
@@ -0,0 +1,58 @@
+"""
+Benchmark: legacy per-hint regexes vs html_hints.scan_html_hints().
+
+For every page in the offline corpus (tests/fixtures/html/ plus synthetic
+large pages) it times extracting all seven hints both ways, checks the two
+agree, and reports the mean time per page.
+
+Usage (from server/):
+    python -m benchmarks.bench_html_hints [--repeat 200]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from html_hints import scan_html_hints  # noqa: E402
+from benchmarks.html_corpus import legacy_scan, load_fixtures, synthetic_page  # noqa: E402
+
+
+def _per_call_us(fn, text: str, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(text)
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def main(repeat: int):
+    pages = load_fixtures()
+    pages["synthetic_500_tags"] = synthetic_page(tags=500)
+    pages["synthetic_2000_tags_no_hints"] = synthetic_page(tags=2000, with_hints=False)
+    # Attribute-heavy tags that make `<meta[^>]+...` backtrack inside every tag
+    pages["synthetic_wide_meta_tags"] = (
+        "<html><head>"
+        + ('<meta property="og:image" ' + 'data-x="property=og content" ' * 200 + ">") * 200
+        + "<title>Wide Tags</title></head><body></body></html>"
+    )
+
+    print(f"{'page':40} {'bytes':>9} {'legacy us':>11} {'scanner us':>11} {'speedup':>8}")
+    total_legacy = total_scan = 0.0
+    for name, text in pages.items():
+        if legacy_scan(text) != scan_html_hints(text):
+            print(f"{name}: MISMATCH legacy={legacy_scan(text)} scanner={scan_html_hints(text)}")
+        n = max(1, repeat if len(text) < 100_000 else repeat // 20)
+        legacy = _per_call_us(legacy_scan, text, n)
+        scanner = _per_call_us(scan_html_hints, text, n)
+        total_legacy += legacy
+        total_scan += scanner
+        print(f"{name:40} {len(text):>9} {legacy:>11.1f} {scanner:>11.1f} {legacy / scanner:>7.1f}x")
+    print(f"{'total':40} {'':>9} {total_legacy:>11.1f} {total_scan:>11.1f} {total_legacy / total_scan:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    main(args.repeat)
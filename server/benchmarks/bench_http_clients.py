@@ -0,0 +1,86 @@
+"""
+Benchmark: per-request httpx.AsyncClient vs the shared http_clients pool.
+
+Runs the same sequence of GETs against a local TLS stand-in server twice:
+once building a fresh client per request (what the routers used to do) and
+once through http_clients.get_client(). Reports wall time and how many
+TCP+TLS handshakes the server saw.
+
+Usage (from server/):
+    python -m benchmarks.bench_http_clients [--requests 200] [--concurrency 10]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ADMIN_PASSWORD", "benchmark")
+os.environ.setdefault("SESSION_SECRET", "benchmark")
+
+import httpx  # noqa: E402
+
+import http_clients  # noqa: E402
+from benchmarks.tls_standin import TLSStandInServer  # noqa: E402
+
+
+async def _run(get_client, url: str, total: int, concurrency: int) -> float:
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with sem:
+            async with get_client() as client:
+                r = await client.get(f"{url}/p/{i}")
+                r.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return time.perf_counter() - started
+
+
+class _Borrowed:
+    """Async context manager that lends the shared client without closing it."""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def __aenter__(self):
+        return self.client
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+async def main(total: int, concurrency: int):
+    async with TLSStandInServer() as srv:
+        ctx = srv.client_ssl_context
+
+        def fresh():
+            return httpx.AsyncClient(verify=ctx, timeout=5.0)
+
+        before = srv.connections
+        fresh_time = await _run(fresh, srv.base_url, total, concurrency)
+        fresh_conns = srv.connections - before
+
+        # Every request targets one host; lift the per-host cap so both modes run at `concurrency`
+        http_clients.settings.outbound_per_host_concurrency = concurrency
+        shared = http_clients.build_client("sanitizer", verify=ctx)
+        before = srv.connections
+        shared_time = await _run(lambda: _Borrowed(shared), srv.base_url, total, concurrency)
+        shared_conns = srv.connections - before
+        await shared.aclose()
+
+    print(f"requests={total} concurrency={concurrency}")
+    print(f"{'mode':<22}{'seconds':>10}{'ms/req':>10}{'handshakes':>12}")
+    for mode, secs, conns in (("client per request", fresh_time, fresh_conns), ("shared pool", shared_time, shared_conns)):
+        print(f"{mode:<22}{secs:>10.3f}{secs * 1000 / total:>10.2f}{conns:>12}")
+    print(f"speedup: {fresh_time / shared_time:.1f}x, handshakes saved: {fresh_conns - shared_conns}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
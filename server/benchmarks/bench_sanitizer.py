@@ -0,0 +1,111 @@
+"""
+Benchmark: sanitize_multiline_urls against the hermetic fake upstream.
+
+Builds `--posts` product posts of `--links` links each (a mix of every
+FakeUpstream scenario, or `--scenario` only), sanitizes them with
+`--concurrency` posts in flight through a sanitizer client whose transport is
+the fake upstream, and reports links/sec, per-post p50/p99 latency and the
+upstream requests and bytes it took. --warm repeats the run on the same links
+to measure the link cache. The persistent link_cache table is not used.
+
+Usage (from server/):
+    python -m benchmarks.bench_sanitizer [--posts 200] [--links 5] [--concurrency 10]
+        [--scenario chain] [--latency-ms 20] [--warm]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ADMIN_PASSWORD", "benchmark")
+os.environ.setdefault("SESSION_SECRET", "benchmark")
+
+import host_health  # noqa: E402
+import http_clients  # noqa: E402
+import link_cache  # noqa: E402
+from benchmarks.fake_upstream import SCENARIOS, FakeUpstream, mixed_links  # noqa: E402
+from utils import sanitize_multiline_urls  # noqa: E402
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+async def run_posts(client, posts: list[str], concurrency: int) -> tuple[float, list[float]]:
+    """Sanitize every post with at most `concurrency` in flight: (wall seconds, per-post seconds)."""
+    sem = asyncio.Semaphore(max(1, concurrency))
+    latencies: list[float] = []
+
+    async def one(post: str):
+        async with sem:
+            started = time.perf_counter()
+            await sanitize_multiline_urls(post, client)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(p) for p in posts))
+    return time.perf_counter() - started, latencies
+
+
+def report(label: str, links: int, wall: float, latencies: list[float], upstream: FakeUpstream) -> dict:
+    row = {
+        "run": label,
+        "links_per_sec": links / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "upstream_requests": upstream.requests,
+        "requests_per_link": upstream.requests / links if links else 0.0,
+        "upstream_kb": upstream.bytes_sent / 1024,
+    }
+    print(f"{row['run']:<8}{row['links_per_sec']:>12.1f}{row['p50_ms']:>10.1f}{row['p99_ms']:>10.1f}"
+          f"{row['upstream_requests']:>10}{row['requests_per_link']:>10.2f}{row['upstream_kb']:>12.0f}")
+    return row
+
+
+async def main(posts: int, links: int, concurrency: int, scenario: str | None, latency_ms: float, warm: bool):
+    link_cache.settings.link_cache_enabled = False
+    link_cache.memory.clear()
+    host_health.registry.reset()
+    # Shop hosts are few and shared by many links; don't let the per-host cap dominate
+    http_clients.settings.outbound_per_host_concurrency = max(concurrency, 4)
+
+    upstream = FakeUpstream(latency_seconds=latency_ms / 1000)
+    mix = {scenario: 1} if scenario else None
+    all_links = mixed_links(upstream, posts * links, mix)
+    batches = ["\n".join(all_links[i:i + links]) for i in range(0, len(all_links), links)]
+    client = http_clients.build_client("sanitizer", transport=upstream)
+
+    print(f"posts={posts} links/post={links} concurrency={concurrency} "
+          f"scenario={scenario or 'mixed'} latency={latency_ms:g}ms")
+    print(f"{'run':<8}{'links/sec':>12}{'p50 ms':>10}{'p99 ms':>10}{'requests':>10}{'req/link':>10}{'upstream KB':>12}")
+    try:
+        wall, latencies = await run_posts(client, batches, concurrency)
+        rows = [report("cold", len(all_links), wall, latencies, upstream)]
+        if warm:
+            upstream.reset_counters()
+            wall, latencies = await run_posts(client, batches, concurrency)
+            rows.append(report("warm", len(all_links), wall, latencies, upstream))
+    finally:
+        await client.aclose()
+
+    by_host = ", ".join(f"{host}={n}" for host, n in sorted(upstream.requests_by_host.items()))
+    print(f"requests by host (last run): {by_host}")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--posts", type=int, default=200)
+    parser.add_argument("--links", type=int, default=5, help="links per post (the sanitizer keeps at most 10)")
+    parser.add_argument("--concurrency", type=int, default=10, help="posts sanitized at once")
+    parser.add_argument("--scenario", choices=SCENARIOS, default=None, help="use one scenario instead of the mix")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="delay before every upstream response")
+    parser.add_argument("--warm", action="store_true", help="repeat the run to measure cache hits")
+    args = parser.parse_args()
+    asyncio.run(main(args.posts, args.links, args.concurrency, args.scenario, args.latency_ms, args.warm))
@@ -0,0 +1,170 @@
+"""
+Hermetic stand-in for Channel 3 and the retailer sites behind it.
+
+FakeUpstream is an httpx transport, so it plugs in wherever a real one would:
+
+    upstream = FakeUpstream()
+    client = http_clients.build_client("sanitizer", transport=upstream)
+
+which keeps the host_health caps and the client's redirect handling in the
+loop, exactly as in production. Links come from upstream.link(scenario, id):
+
+    chain      302 chain across Channel 3 hosts (`chain_hops` redirects) to a shop page
+    meta       Channel 3 interstitial with a <meta http-equiv="refresh">
+    js         Channel 3 interstitial with a window.location redirect
+    canonical  Channel 3 interstitial whose only hint is <link rel="canonical">
+    slow       302 to slow.example, which answers after `slow_seconds`
+    timeout    302 to hang.example, which raises httpx.ReadTimeout after `timeout_seconds`
+    giant      302 to huge.example, a `giant_bytes` page whose <head> is mostly inline script
+    direct     a shop page that is not behind Channel 3 (title fetch only)
+
+Shop pages are titled "Product <id>". Every request waits `latency_seconds`
+first. requests / requests_by_host / bytes_sent count what the client actually
+pulled, so tests and benchmarks can assert on upstream traffic.
+"""
+from collections import Counter
+import asyncio
+import urllib.parse
+
+import httpx
+
+SCENARIOS = ("chain", "meta", "js", "canonical", "slow", "timeout", "giant", "direct")
+
+CHANNEL3_HOST = "buy.trychannel3.com"
+HOP_HOST = "go.trychannel3.com"
+
+_CHUNK = 16 * 1024
+
+
+class _ChunkedBody(httpx.AsyncByteStream):
+    """Streams a body in chunks, counting only the bytes the client reads."""
+
+    def __init__(self, body: bytes, upstream: "FakeUpstream"):
+        self._body = body
+        self._upstream = upstream
+
+    async def __aiter__(self):
+        for start in range(0, len(self._body), _CHUNK):
+            chunk = self._body[start:start + _CHUNK]
+            self._upstream.bytes_sent += len(chunk)
+            yield chunk
+            await asyncio.sleep(0)
+
+    async def aclose(self) -> None:
+        pass
+
+
+class FakeUpstream(httpx.AsyncBaseTransport):
+    def __init__(self, latency_seconds: float = 0.0, chain_hops: int = 3, slow_seconds: float = 0.25,
+                 timeout_seconds: float = 0.5, giant_bytes: int = 4 * 1024 * 1024, shop_hosts: int = 8):
+        self.latency_seconds = latency_seconds
+        self.chain_hops = chain_hops
+        self.slow_seconds = slow_seconds
+        self.timeout_seconds = timeout_seconds
+        self.giant_bytes = giant_bytes
+        self.shop_hosts = max(1, shop_hosts)
+        self.requests = 0
+        self.requests_by_host: Counter = Counter()
+        self.bytes_sent = 0
+
+    # ---------------------------- Links ---------------------------- #
+
+    def link(self, scenario: str, item_id: str) -> str:
+        if scenario not in SCENARIOS:
+            raise ValueError(f"unknown scenario {scenario!r}")
+        if scenario == "direct":
+            return self.shop_url(item_id)
+        return f"https://{CHANNEL3_HOST}/x/{scenario}/{item_id}"
+
+    def shop_url(self, item_id: str) -> str:
+        return f"https://shop{sum(map(ord, item_id)) % self.shop_hosts}.example/p/{item_id}"
+
+    def destination(self, scenario: str, item_id: str) -> str:
+        """Where the sanitizer should end up for link(scenario, item_id)."""
+        if scenario == "slow":
+            return f"https://slow.example/p/{item_id}"
+        if scenario == "timeout":
+            return f"https://hang.example/p/{item_id}"
+        if scenario == "giant":
+            return f"https://huge.example/p/{item_id}"
+        return self.shop_url(item_id)
+
+    def reset_counters(self) -> None:
+        self.requests = 0
+        self.requests_by_host.clear()
+        self.bytes_sent = 0
+
+    # ---------------------------- Transport ---------------------------- #
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        self.requests += 1
+        self.requests_by_host[host] += 1
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+
+        parts = [p for p in request.url.path.split("/") if p]
+        if host == CHANNEL3_HOST and len(parts) == 3 and parts[0] == "x":
+            return self._channel3(request, parts[1], parts[2])
+        if host == HOP_HOST and len(parts) == 3 and parts[0] == "hop":
+            return self._hop(request, int(parts[1]), parts[2])
+        if len(parts) == 2 and parts[0] == "p":
+            item_id = parts[1]
+            if host == "slow.example":
+                await asyncio.sleep(self.slow_seconds)
+            elif host == "hang.example":
+                await asyncio.sleep(self.timeout_seconds)
+                raise httpx.ReadTimeout("fake upstream timed out", request=request)
+            elif host == "huge.example":
+                return self._html(request, self._giant_page(item_id))
+            return self._html(request, self._shop_page(item_id))
+        return httpx.Response(404, request=request, headers={"content-type": "text/html"},
+                              content=b"<title>Not Found</title>")
+
+    def _channel3(self, request: httpx.Request, scenario: str, item_id: str) -> httpx.Response:
+        dest = self.destination(scenario, item_id)
+        if scenario == "chain":
+            return self._hop(request, 1, item_id)
+        if scenario == "meta":
+            return self._html(request, f'<html><head><meta http-equiv="refresh" content="0; url={dest}">'
+                                       f"</head><body>Redirecting</body></html>")
+        if scenario == "js":
+            return self._html(request, f'<html><head><script>window.location.href = "{dest}";</script>'
+                                       f"</head><body>Redirecting</body></html>")
+        if scenario == "canonical":
+            return self._html(request, f'<html><head><link rel="canonical" href="{dest}">'
+                                       f"<title>Channel 3</title></head><body></body></html>")
+        return self._redirect(request, dest)
+
+    def _hop(self, request: httpx.Request, hop: int, item_id: str) -> httpx.Response:
+        if hop >= self.chain_hops:
+            return self._redirect(request, self.shop_url(item_id))
+        return self._redirect(request, f"https://{HOP_HOST}/hop/{hop + 1}/{urllib.parse.quote(item_id)}")
+
+    @staticmethod
+    def _redirect(request: httpx.Request, location: str) -> httpx.Response:
+        return httpx.Response(302, request=request, headers={"location": location})
+
+    def _html(self, request: httpx.Request, page: str) -> httpx.Response:
+        body = page.encode("utf-8")
+        return httpx.Response(200, request=request, headers={"content-type": "text/html; charset=utf-8"},
+                              stream=_ChunkedBody(body, self))
+
+    @staticmethod
+    def _shop_page(item_id: str) -> str:
+        return (f'<html><head><meta charset="utf-8"><title>Product {item_id} | Fake Shop</title></head>'
+                f"<body><h1>Product {item_id}</h1>{'<p>details</p>' * 200}</body></html>")
+
+    def _giant_page(self, item_id: str) -> str:
+        head = f"<html><head><title>Product {item_id}</title><script>"
+        tail = "</script></head><body></body></html>"
+        filler = "var x = 1;\n" * max(0, (self.giant_bytes - len(head) - len(tail)) // 11)
+        return head + filler + tail
+
+
+def mixed_links(upstream: FakeUpstream, count: int, mix: dict[str, int] | None = None,
+                prefix: str = "item") -> list[str]:
+    """`count` unique links cycling through `mix` (scenario -> weight); one of each scenario by default."""
+    mix = mix or {scenario: 1 for scenario in SCENARIOS}
+    wheel = [scenario for scenario, weight in mix.items() for _ in range(weight)]
+    return [upstream.link(wheel[i % len(wheel)], f"{prefix}-{i}") for i in range(count)]
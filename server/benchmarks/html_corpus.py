@@ -0,0 +1,67 @@
+"""
+Offline HTML corpus and the legacy per-hint regexes, used to benchmark and
+check html_hints.scan_html_hints().
+
+The fixtures are trimmed copies of retailer and Channel 3 interstitial pages
+saved under tests/fixtures/html/. synthetic_page() builds large head-heavy
+pages (hundreds of <meta>/<link> tags and inline scripts) for stress runs.
+"""
+import os
+import re
+
+from html_hints import HtmlHints
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests", "fixtures", "html")
+
+# The regexes utils.py ran one after another before the single-pass scanner
+LEGACY_PATTERNS = {
+    "og_title": re.compile(
+        r'<meta[^>]+property=["\']og:title["\'][^>]+content=["\'](.*?)["\']',
+        re.IGNORECASE | re.DOTALL,
+    ),
+    "title": re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL),
+    "meta_refresh": re.compile(
+        r'<meta[^>]+http-equiv=["\']refresh["\'][^>]+content=["\']\s*\d+\s*;\s*url=([^"\']+)["\']',
+        re.IGNORECASE,
+    ),
+    "js_href": re.compile(r'window\.location(?:\.href)?\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE),
+    "js_replace": re.compile(r'location\.replace\(\s*["\']([^"\']+)["\']\s*\)', re.IGNORECASE),
+    "js_assign": re.compile(r'location\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE),
+    "canonical": re.compile(r'<link[^>]+rel=["\']canonical["\'][^>]+href=["\']([^"\']+)["\']', re.IGNORECASE),
+}
+
+
+def legacy_scan(text: str) -> HtmlHints:
+    """All hints via the legacy regexes: one full search of the page per hint."""
+    found = {}
+    for name, rx in LEGACY_PATTERNS.items():
+        m = rx.search(text)
+        found[name] = m.group(1) if m else None
+    return HtmlHints(**found)
+
+
+def load_fixtures() -> dict[str, str]:
+    """name -> page text for every saved fixture."""
+    pages = {}
+    for name in sorted(os.listdir(FIXTURE_DIR)):
+        if name.endswith(".html"):
+            with open(os.path.join(FIXTURE_DIR, name), encoding="utf-8") as f:
+                pages[name] = f.read()
+    return pages
+
+
+def synthetic_page(tags: int = 500, script_kb: int = 64, with_hints: bool = True) -> str:
+    """A large page whose head is mostly meta/link tags and inline script."""
+    parts = ["<!doctype html><html><head><meta charset='utf-8'>"]
+    for i in range(tags):
+        parts.append(f'<meta name="x-tracking-{i}" content="{"v" * 40}{i}" data-k="{i}">')
+        parts.append(f'<link rel="preload" as="image" href="https://cdn.example/img/{i}.jpg" fetchpriority="low">')
+    script = "var state = {" + ",".join(f'"k{i}": "{"w" * 20}"' for i in range(script_kb * 1024 // 30)) + "};"
+    parts.append(f"<script>{script} var q = location.search;</script>")
+    if with_hints:
+        parts.append('<meta property="og:title" content="Synthetic Product | Big Store">')
+        parts.append("<title>Synthetic Product - Big Store</title>")
+        parts.append('<link rel="canonical" href="https://bigstore.example/p/synthetic">')
+        parts.append("<script>window.location.href = 'https://bigstore.example/p/synthetic?js=1';</script>")
+    parts.append("</head><body>" + "<div class='tile'>item</div>" * 2000 + "</body></html>")
+    return "".join(parts)
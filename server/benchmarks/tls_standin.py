@@ -0,0 +1,100 @@
+"""
+Local HTTPS stand-in server for outbound-fetch benchmarks.
+
+Serves a small HTML page over TLS with HTTP/1.1 keep-alive on 127.0.0.1 and
+counts accepted connections, so a benchmark can tell how many TCP+TLS
+handshakes a client performed. The certificate is self-signed and generated
+on the fly (requires `cryptography`, already in requirements.txt).
+"""
+import asyncio
+import datetime
+import ipaddress
+import os
+import ssl
+import tempfile
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+PAGE = b"<html><head><title>Stand-in Product | Shop</title></head><body>ok</body></html>"
+
+
+def write_self_signed_cert(directory: str) -> tuple[str, str]:
+    """Create a localhost certificate/key pair in `directory`; returns (cert_path, key_path)."""
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=5))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(
+            x509.SubjectAlternativeName([x509.DNSName("localhost"), x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]),
+            critical=False,
+        )
+        .sign(key, hashes.SHA256())
+    )
+    cert_path = os.path.join(directory, "standin.crt")
+    key_path = os.path.join(directory, "standin.key")
+    with open(cert_path, "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as f:
+        f.write(key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.TraditionalOpenSSL,
+            serialization.NoEncryption(),
+        ))
+    return cert_path, key_path
+
+
+class TLSStandInServer:
+    """async with TLSStandInServer() as srv: ... srv.base_url, srv.client_ssl_context, srv.connections"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.connections = 0
+        self.requests = 0
+        self._tmp = tempfile.TemporaryDirectory()
+        self._server = None
+        self.port = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                if not head:
+                    break
+                self.requests += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: text/html; charset=utf-8\r\n"
+                    b"Connection: keep-alive\r\nContent-Length: " + str(len(PAGE)).encode() + b"\r\n\r\n" + PAGE
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ssl.SSLError):
+            pass
+        finally:
+            writer.close()
+
+    async def __aenter__(self):
+        cert_path, key_path = write_self_signed_cert(self._tmp.name)
+        server_ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        server_ctx.load_cert_chain(cert_path, key_path)
+        self.client_ssl_context = ssl.create_default_context(cafile=cert_path)
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0, ssl=server_ctx)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self.base_url = f"https://localhost:{self.port}"
+        return self
+
+    async def __aexit__(self, *exc):
+        self._server.close()
+        await self._server.wait_closed()
+        self._tmp.cleanup()
@@ -0,0 +1,172 @@
+"""
+Bulkheads: separate outbound fetch budgets for public, admin and background work.
+
+Every shared client purpose belongs to one pool (POOLS_BY_PURPOSE):
+- public: unauthenticated /api/public/* link resolution;
+- admin: admin saves, Eve ingestion (/api/feed-items) and the admin debug tools;
+- background: the link worker, link migrations and scheduled link checks.
+
+A pool allows `bulkhead_<pool>_concurrency` requests in flight and
+`bulkhead_<pool>_queue` more waiting for a slot. A request arriving when both are
+full is refused at once with BulkheadFull (a HostUnavailable, so the sanitizer
+falls back to the original URL and nothing is cached), and the public
+endpoints check saturation before starting any work and answer 503. Per-host
+slots (host_health.py) are also kept per pool, so a burst of public requests
+to one retailer can't take the slots ingestion needs for the same host.
+
+Slots are held until the response body is closed. Per-pool counters and queue
+wait times are visible through GET /api/admin/debug/bulkheads.
+"""
+from collections import deque
+import asyncio
+import time
+import weakref
+
+import httpx
+
+from config import settings
+from host_health import HostUnavailable, ReleasingStream
+
+PUBLIC = "public"
+ADMIN = "admin"
+BACKGROUND = "background"
+
+POOLS_BY_PURPOSE = {
+    "public": PUBLIC,
+    "sanitizer": ADMIN,
+    "resolver": ADMIN,
+    "title_fetcher": ADMIN,
+    "gemini": ADMIN,
+    "worker": BACKGROUND,
+    "migrator": BACKGROUND,
+    "checker": BACKGROUND,
+}
+
+# Queue waits kept per pool for the percentiles
+_WAIT_SAMPLES = 1000
+
+
+class BulkheadFull(HostUnavailable):
+    """Request refused locally because its pool's slots and queue are all taken."""
+
+
+class Bulkhead:
+    def __init__(self, name: str):
+        self.name = name
+        # asyncio primitives are bound to one event loop; keep a semaphore per loop
+        self._semaphores: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self.reset()
+
+    def reset(self) -> None:
+        """Zero the counters and forget the semaphores (their limits are re-read from settings)."""
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._waits: deque = deque(maxlen=_WAIT_SAMPLES)
+        self._semaphores.clear()
+
+    @property
+    def max_concurrent(self) -> int:
+        return max(1, getattr(settings, f"bulkhead_{self.name}_concurrency"))
+
+    @property
+    def max_queue(self) -> int:
+        return max(0, getattr(settings, f"bulkhead_{self.name}_queue"))
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        sem = self._semaphores.get(loop)
+        if sem is None:
+            sem = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrent)
+        return sem
+
+    def saturated(self) -> bool:
+        """True if a request arriving now would be refused."""
+        return self.in_flight >= self.max_concurrent and self.queued >= self.max_queue
+
+    async def acquire(self) -> None:
+        """Take a slot, waiting in the queue if there is room, or raise BulkheadFull."""
+        if self.saturated():
+            self.rejected += 1
+            raise BulkheadFull(f"{self.name} outbound pool is saturated")
+        sem = self._semaphore()
+        started = time.monotonic()
+        self.queued += 1
+        try:
+            await sem.acquire()
+        finally:
+            self.queued -= 1
+        wait = time.monotonic() - started
+        self.in_flight += 1
+        self.admitted += 1
+        self.wait_seconds_total += wait
+        self.wait_seconds_max = max(self.wait_seconds_max, wait)
+        self._waits.append(wait)
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._semaphore().release()
+
+    def _wait_percentile(self, pct: float) -> float:
+        if not self._waits:
+            return 0.0
+        ordered = sorted(self._waits)
+        return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+    def snapshot(self) -> dict:
+        return {
+            "pool": self.name,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "wait_ms_mean": round(1000 * self.wait_seconds_total / self.admitted, 3) if self.admitted else 0.0,
+            "wait_ms_p50": round(1000 * self._wait_percentile(50), 3),
+            "wait_ms_p99": round(1000 * self._wait_percentile(99), 3),
+            "wait_ms_max": round(1000 * self.wait_seconds_max, 3),
+        }
+
+
+pools = {name: Bulkhead(name) for name in (PUBLIC, ADMIN, BACKGROUND)}
+
+
+def for_purpose(purpose: str) -> Bulkhead:
+    return pools[POOLS_BY_PURPOSE.get(purpose, ADMIN)]
+
+
+def snapshot() -> list[dict]:
+    return [pool.snapshot() for pool in pools.values()]
+
+
+def reset() -> None:
+    for pool in pools.values():
+        pool.reset()
+
+
+class BulkheadTransport(httpx.AsyncBaseTransport):
+    """Hold a pool slot around another transport, until the response body is closed."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, pool: Bulkhead):
+        self._inner = inner
+        self._pool = pool
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await self._pool.acquire()
+        try:
+            response = await self._inner.handle_async_request(request)
+        except BaseException:
+            self._pool.release()
+            raise
+        if isinstance(response.stream, httpx.ByteStream):
+            self._pool.release()  # body already in memory; nothing is held
+        else:
+            response.stream = ReleasingStream(response.stream, self._pool.release)
+        return response
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
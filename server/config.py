@@ -11,6 +11,84 @@ class Settings(BaseSettings):
     public_feed_enabled: bool = True
     eve_api_key: str = "CHANGE_ME"
     gemini_api_key: Optional[str] = None
+    # Max concurrent outbound fetches per sanitize_multiline_urls call
+    link_sanitize_concurrency: int = 10
+    # Store product links immediately with inferred labels and sanitize them in the
+    # background (link_worker.py) instead of during the request
+    link_sanitize_async: bool = False
+    link_worker_count: int = 2
+    # Streamed batch resolution (link_batch.py): URLs per request, lookups in flight
+    link_batch_max_urls: int = 500
+    link_batch_concurrency: int = 16
+    # The unauthenticated /api/public/resolve-urls/stream takes far fewer
+    public_link_batch_max_urls: int = 20
+    # Batch feed-item ingestion (POST /api/feed-items/batch): items per request,
+    # items whose links are prepared at once
+    feed_batch_max_items: int = 200
+    feed_batch_concurrency: int = 8
+    # Asynchronous feed-item ingestion (feed_jobs.py): create every feed item through
+    # the job queue (otherwise only requests sending `Prefer: respond-async`), and
+    # how many jobs are processed at once, and after how long a job left running
+    # (e.g. by a crashed process) may be taken over
+    feed_ingest_async: bool = False
+    feed_job_workers: int = 4
+    feed_job_lease_seconds: float = 300.0
+    # Background link migration (migration_jobs.py): products per committed batch,
+    # products sanitized at once within a batch
+    migration_batch_size: int = 200
+    migration_concurrency: int = 10
+    # Scheduled link health checks (link_checker.py): every published link is
+    # re-checked about once per window, in ticks of at most max_per_tick links
+    link_check_enabled: bool = True
+    link_check_window_hours: float = 7 * 24
+    link_check_interval_seconds: float = 60.0
+    link_check_max_per_tick: int = 200
+    link_check_concurrency: int = 4
+    link_check_dead_after: int = 3
+    # Idempotency-Key support for POST /api/feed-items[/batch] (idempotency.py): how long
+    # responses are replayed, how long a duplicate waits for the original request,
+    # and when an unfinished original (e.g. a crashed worker) may be taken over
+    idempotency_ttl_hours: float = 24.0
+    idempotency_wait_seconds: float = 30.0
+    idempotency_lock_seconds: float = 120.0
+    # Persistent link resolution/title cache (link_cache table)
+    link_cache_enabled: bool = True
+    link_cache_ttl_seconds: int = 7 * 24 * 3600
+    link_cache_negative_ttl_seconds: int = 15 * 60
+    # Page validators and head metadata for conditional refetches (http_cache table);
+    # Cache-Control max-age is honored up to http_cache_max_age_seconds
+    http_cache_enabled: bool = True
+    http_cache_max_age_seconds: int = 24 * 3600
+    # In-process LRU in front of link_cache (0 disables)
+    link_memory_cache_max_entries: int = 5000
+    link_memory_cache_max_bytes: int = 8 * 1024 * 1024
+    # URL canonicalization for cache keys, dedupe and stored links (url_canon.py):
+    # comma-separated extra parameters to drop, "param" or "host:param"
+    url_canonicalize: bool = True
+    url_canon_extra_params: str = ""
+    # Max bytes of an HTML page read when looking for title/redirect hints
+    html_head_max_bytes: int = 512 * 1024
+    # Shared outbound HTTP client pools (http_clients.py)
+    outbound_max_connections: int = 100
+    outbound_max_keepalive_connections: int = 20
+    outbound_keepalive_expiry_seconds: float = 30.0
+    outbound_http2: bool = False  # requires the optional 'h2' package
+    # Outbound bulkheads (bulkheads.py): requests in flight and waiting per pool;
+    # requests beyond both are refused at once (public endpoints answer 503)
+    bulkhead_public_concurrency: int = 16
+    bulkhead_public_queue: int = 32
+    bulkhead_admin_concurrency: int = 48
+    bulkhead_admin_queue: int = 512
+    bulkhead_background_concurrency: int = 16
+    bulkhead_background_queue: int = 512
+    # Per-host limits for outbound fetches (host_health.py)
+    outbound_per_host_concurrency: int = 4
+    host_backoff_base_seconds: float = 1.0
+    host_backoff_max_seconds: float = 60.0
+    # Wait out shorter backoffs; fail fast (inferred label) on longer ones
+    host_backoff_max_wait_seconds: float = 1.0
+    host_failure_threshold: int = 5
+    host_circuit_open_seconds: float = 30.0
     
     class Config:
         env_file = ".env"
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker
 from config import settings
 from models import Base
@@ -7,6 +7,14 @@ from models import Base
 engine = create_engine(settings.database_url)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    def _enable_sqlite_foreign_keys(dbapi_conn, _record):
+        # SQLite ignores FOREIGN KEY / ON DELETE CASCADE unless enabled per connection
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
 def get_db():
     db = SessionLocal()
     try:
@@ -78,3 +86,105 @@ def ensure_feed_settings_backfill():
 
     except Exception as e:
         print(f"Feed settings backfill failed: {e}")
+
+def ensure_bundle_products_cascade():
+    """
+    Lightweight migration for bundle_products (SQLite-safe):
+    - Rebuilds the table with ON DELETE CASCADE foreign keys if it predates them
+      (SQLite cannot ALTER a foreign key), dropping orphaned rows on the way.
+    - Ensures the reverse index on product_id exists.
+    Safe to call multiple times.
+    """
+    try:
+        with engine.begin() as conn:
+            fks = conn.execute(text("PRAGMA foreign_key_list('bundle_products')")).fetchall()
+            # row tuple: (id, seq, table, from, to, on_update, on_delete, match)
+            needs_rebuild = bool(fks) and any((row[6] or "").upper() != "CASCADE" for row in fks)
+            if needs_rebuild:
+                conn.execute(text("""
+                    CREATE TABLE bundle_products_new (
+                        bundle_id VARCHAR NOT NULL REFERENCES bundles (id) ON DELETE CASCADE,
+                        product_id VARCHAR NOT NULL REFERENCES products (id) ON DELETE CASCADE,
+                        PRIMARY KEY (bundle_id, product_id)
+                    )
+                """))
+                conn.execute(text("""
+                    INSERT INTO bundle_products_new (bundle_id, product_id)
+                    SELECT bp.bundle_id, bp.product_id FROM bundle_products bp
+                    WHERE EXISTS (SELECT 1 FROM bundles b WHERE b.id = bp.bundle_id)
+                      AND EXISTS (SELECT 1 FROM products p WHERE p.id = bp.product_id)
+                """))
+                conn.execute(text("DROP TABLE bundle_products"))
+                conn.execute(text("ALTER TABLE bundle_products_new RENAME TO bundle_products"))
+                print("Migration: Rebuilt bundle_products with ON DELETE CASCADE")
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_bundle_products_product_id ON bundle_products (product_id)"
+            ))
+    except Exception as e:
+        print(f"Migration check for bundle_products cascade failed: {e}")
+
+def ensure_products_sanitization_columns():
+    """
+    Lightweight migration: add background link sanitation columns to products if missing (SQLite-safe).
+    Safe to call multiple times.
+    """
+    try:
+        with engine.begin() as conn:
+            res = conn.execute(text("PRAGMA table_info('products')"))
+            cols = [row[1] for row in res]
+            if "sanitization_status" not in cols:
+                conn.execute(text("ALTER TABLE products ADD COLUMN sanitization_status TEXT"))
+                print("Migration: Added 'sanitization_status' column to products")
+            if "raw_product_url" not in cols:
+                conn.execute(text("ALTER TABLE products ADD COLUMN raw_product_url TEXT"))
+                print("Migration: Added 'raw_product_url' column to products")
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_products_sanitization_status ON products (sanitization_status)"
+            ))
+    except Exception as e:
+        print(f"Migration check for products sanitization columns failed: {e}")
+
+def ensure_feed_settings_version_column():
+    """
+    Lightweight migration: add 'version' column to feed_settings if missing (SQLite-safe).
+    Safe to call multiple times.
+    """
+    try:
+        with engine.begin() as conn:
+            res = conn.execute(text("PRAGMA table_info('feed_settings')"))
+            cols = [row[1] for row in res]
+            if "version" not in cols:
+                conn.execute(text("ALTER TABLE feed_settings ADD COLUMN version INTEGER NOT NULL DEFAULT 0"))
+                print("Migration: Added 'version' column to feed_settings")
+    except Exception as e:
+        print(f"Migration check for feed_settings.version failed: {e}")
+
+def ensure_product_links_health_columns():
+    """
+    Lightweight migration: add link health columns to product_links if missing (SQLite-safe).
+    Safe to call multiple times.
+    """
+    columns = {
+        "check_status": "TEXT",
+        "http_status": "INTEGER",
+        "redirect_url": "TEXT",
+        "etag": "TEXT",
+        "last_modified": "TEXT",
+        "check_failures": "INTEGER NOT NULL DEFAULT 0",
+    }
+    try:
+        with engine.begin() as conn:
+            res = conn.execute(text("PRAGMA table_info('product_links')"))
+            cols = [row[1] for row in res]
+            for name, ddl in columns.items():
+                if name not in cols:
+                    conn.execute(text(f"ALTER TABLE product_links ADD COLUMN {name} {ddl}"))
+                    print(f"Migration: Added '{name}' column to product_links")
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_product_links_check_status ON product_links (check_status)"
+            ))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_product_links_last_checked ON product_links (last_checked)"
+            ))
+    except Exception as e:
+        print(f"Migration check for product_links health columns failed: {e}")
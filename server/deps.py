@@ -2,6 +2,7 @@ from fastapi import Depends, HTTPException, status, Request
 from sqlalchemy.orm import Session
 from database import get_db
 from config import settings
+import bulkheads
 import logging
 
 logger = logging.getLogger(__name__)
@@ -34,3 +35,14 @@ def require_public_feed_enabled():
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Public feed is disabled"
         )
+
+def require_public_fetch_capacity():
+    """Dependency for public endpoints that fetch upstream: 503 while the public bulkhead is saturated"""
+    pool = bulkheads.pools[bulkheads.PUBLIC]
+    if pool.saturated():
+        pool.rejected += 1
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Link resolution is busy, retry shortly",
+            headers={"Retry-After": "1"},
+        )
@@ -0,0 +1,85 @@
+"""
+Feed item creation shared by the Eve ingestion endpoints and the job worker.
+
+A feed item is a SINGLE product holding all of a look's links, wrapped in a
+one-product Bundle; both are published straight away.
+"""
+from datetime import datetime
+import logging
+
+from sqlalchemy.orm import Session
+
+from models import Bundle, Product
+from schemas import FeedItemCreate
+from utils import generate_slug, commit_with_slug_retry, refresh_bundle_read_models
+import link_worker
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DESCRIPTION = "Curated Must‑Have\n\nPopular\nA perfect pick for your look. Stylish, versatile, and ready to wear."
+
+
+def apply_defaults(payload: FeedItemCreate) -> None:
+    # Generate default title if not provided
+    if payload.title is None:
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        payload.title = f"Eve Look - {timestamp}"
+        logger.info(f"Generated default title: {payload.title}")
+    else:
+        logger.info(f"Creating feed item: {payload.title} with {len(payload.links)} links")
+
+
+def stage(db: Session, payload: FeedItemCreate, link_fields: dict) -> Bundle:
+    """Stage the product and its bundle (slugs allocated without lookups)."""
+    product = Product(
+        slug=generate_slug(),
+        title=payload.title,
+        image_url=payload.image_url,
+        is_published=True, # Publish this single card
+        feed=payload.feed,
+        **link_fields # All links are stored on this product
+    )
+    bundle = Bundle(
+        slug=generate_slug(),
+        title=payload.title,
+        description=payload.description if payload.description else DEFAULT_DESCRIPTION,
+        is_published=True,
+        feed=payload.feed,
+        products=[product]
+    )
+    db.add(bundle)
+    return bundle
+
+
+def public_url(bundle: Bundle) -> str:
+    # Assuming public feed URL format: /public/bundle/{slug}/page
+    # Adjust based on actual frontend routing
+    return f"/public/bundle/{bundle.slug}/page"
+
+
+async def create(db: Session, payload: FeedItemCreate, before_commit=None) -> Bundle:
+    """
+    Sanitize the links (or leave them to link_worker), then insert and commit the item.
+    `before_commit(bundle)`, if given, runs in the same transaction once the bundle has an id.
+    """
+    apply_defaults(payload)
+
+    # Network work happens before any rows are staged
+    # Sanitize the multiline string (resolves Channel 3 links, fetches titles, etc.),
+    # or label from URLs now and leave sanitation to the background worker
+    link_fields = await link_worker.prepare_product_links("\n".join(payload.links))
+
+    # A slug collision on commit re-runs build()
+    def build():
+        bundle = stage(db, payload, link_fields)
+        db.flush()  # assigns bundle.id
+        refresh_bundle_read_models(db, [bundle.id])
+        if before_commit is not None:
+            before_commit(bundle)
+        return bundle
+
+    bundle = commit_with_slug_retry(db, build)
+    db.refresh(bundle)
+    for product in bundle.products:
+        link_worker.enqueue_if_pending(product)
+    return bundle
@@ -0,0 +1,198 @@
+"""
+Asynchronous feed-item ingestion.
+
+POST /api/feed-items with `Prefer: respond-async` (or always, with
+settings.feed_ingest_async) validates the body, stores it as a FeedItemJob row
+("queued") and answers 202 with the job id, without waiting for link
+sanitation. A pool of `feed_job_workers` tasks creates the items; clients poll
+GET /api/feed-items/jobs/{id} for the status and, once done, the public URL.
+
+Jobs are durable: start() re-queues jobs left queued by a previous process. A
+worker claims a job with a guarded update (queued -> running, bumping
+`attempts`), and the job is marked done, fenced on that attempt, in the same
+transaction that inserts the feed item, so a job queued twice or taken over is
+still created once. A job left running is only taken over once its claim is
+older than `feed_job_lease_seconds`, so jobs another live process is running
+are left alone. Like link_worker, the queue belongs to the event loop that
+created it and is created lazily.
+"""
+from datetime import datetime, timedelta, timezone
+import asyncio
+import json
+
+from sqlalchemy import and_, or_, select, update
+
+from config import settings
+from database import SessionLocal
+from models import FeedItemJob
+from schemas import FeedItemCreate
+import feed_items
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# (event loop, queue, worker tasks) of the running pool, if any
+_pool: tuple[asyncio.AbstractEventLoop, asyncio.Queue, list[asyncio.Task]] | None = None
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _ensure_pool() -> asyncio.Queue:
+    global _pool
+    loop = asyncio.get_running_loop()
+    if _pool is not None and _pool[0] is loop and not all(t.done() for t in _pool[2]):
+        return _pool[1]
+    queue: asyncio.Queue = asyncio.Queue()
+    tasks = [loop.create_task(_run(queue)) for _ in range(max(1, settings.feed_job_workers))]
+    _pool = (loop, queue, tasks)
+    return queue
+
+
+def submit(payload: FeedItemCreate) -> FeedItemJob:
+    """Persist a job for `payload` and queue it. Returns the (detached) job row."""
+    with SessionLocal() as db:
+        job = FeedItemJob(status=QUEUED, payload=payload.model_dump_json())
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        db.expunge(job)
+    _ensure_pool().put_nowait(job.id)
+    return job
+
+
+def get(job_id: str) -> FeedItemJob | None:
+    with SessionLocal() as db:
+        job = db.get(FeedItemJob, job_id)
+        if job is not None:
+            db.expunge(job)
+        return job
+
+
+async def _run(queue: asyncio.Queue) -> None:
+    while True:
+        job_id = await queue.get()
+        try:
+            await process(job_id)
+        except Exception as e:
+            print(f"Feed item job {job_id} crashed: {e}")
+        finally:
+            queue.task_done()
+
+
+class JobTakenOver(Exception):
+    """Another worker claimed the job after this one's lease expired."""
+
+
+def _claimable(now: datetime):
+    return or_(
+        FeedItemJob.status == QUEUED,
+        and_(
+            FeedItemJob.status == RUNNING,
+            FeedItemJob.started_at < now - timedelta(seconds=settings.feed_job_lease_seconds),
+        ),
+    )
+
+
+def _owned(job_id: str, attempt: int):
+    return (FeedItemJob.id == job_id, FeedItemJob.status == RUNNING, FeedItemJob.attempts == attempt)
+
+
+async def process(job_id: str) -> bool:
+    """
+    Create the feed item of a queued job (or of a running one whose lease
+    expired). Returns False if the job is unknown, finished or held by another
+    worker.
+    """
+    now = _utcnow()
+    with SessionLocal() as db:
+        claimed = db.execute(
+            update(FeedItemJob)
+            .where(FeedItemJob.id == job_id, _claimable(now))
+            .values(status=RUNNING, started_at=now, attempts=FeedItemJob.attempts + 1)
+        ).rowcount
+        db.commit()
+        if not claimed:
+            return False
+        job = db.get(FeedItemJob, job_id)
+        raw, attempt = job.payload, job.attempts
+
+    try:
+        payload = FeedItemCreate.model_validate(json.loads(raw))
+        with SessionLocal() as db:
+            def mark_done(bundle):
+                # Same transaction as the insert: the item exists iff the job is done
+                done = db.execute(
+                    update(FeedItemJob)
+                    .where(*_owned(job_id, attempt))
+                    .values(status=DONE, item_id=bundle.id, public_url=feed_items.public_url(bundle),
+                            finished_at=_utcnow())
+                ).rowcount
+                if not done:
+                    raise JobTakenOver(job_id)
+
+            await feed_items.create(db, payload, before_commit=mark_done)
+    except JobTakenOver:
+        print(f"Feed item job {job_id} was taken over by another worker")
+        return False
+    except Exception as e:
+        print(f"Feed item job {job_id} failed: {e}")
+        with SessionLocal() as db:
+            db.execute(
+                update(FeedItemJob)
+                .where(*_owned(job_id, attempt))
+                .values(status=FAILED, error=f"{type(e).__name__}: {e}", finished_at=_utcnow())
+            )
+            db.commit()
+    return True
+
+
+async def start() -> None:
+    """
+    Start the worker pool and re-queue jobs left unfinished by a previous run.
+    Running jobs are queued for when their lease expires; if their process is
+    still alive and finishes them first, the claim then finds nothing to do.
+    """
+    now = _utcnow()
+    with SessionLocal() as db:
+        jobs = db.execute(
+            select(FeedItemJob.id, FeedItemJob.status, FeedItemJob.started_at)
+            .where(FeedItemJob.status.in_([QUEUED, RUNNING]))
+            .order_by(FeedItemJob.created_at)
+        ).all()
+    queue = _ensure_pool()
+    loop = asyncio.get_running_loop()
+    for job_id, status, started_at in jobs:
+        if status == RUNNING and started_at is not None:
+            if started_at.tzinfo is None:
+                started_at = started_at.replace(tzinfo=timezone.utc)  # SQLite returns naive UTC
+            expires_in = (started_at - now).total_seconds() + settings.feed_job_lease_seconds
+            if expires_in > 0:
+                loop.call_later(expires_in, queue.put_nowait, job_id)
+                continue
+        queue.put_nowait(job_id)
+    if jobs:
+        print(f"Feed item jobs: re-queued {len(jobs)} unfinished job(s)")
+
+
+async def drain() -> None:
+    """Wait until every queued job has been processed."""
+    if _pool is not None and _pool[0] is asyncio.get_running_loop():
+        await _pool[1].join()
+
+
+async def stop() -> None:
+    """Cancel the worker tasks (unfinished jobs are picked up again by the next start())."""
+    global _pool
+    if _pool is None:
+        return
+    owner, _queue, tasks = _pool
+    _pool = None
+    if owner is not asyncio.get_running_loop():
+        return
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
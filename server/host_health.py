@@ -0,0 +1,264 @@
+"""
+Per-host protection for outbound fetches: concurrency caps, backoff and a circuit breaker.
+
+HostLimitedTransport wraps the transport of every shared client (see
+http_clients.build_client), so each request to a host:
+- waits for one of `outbound_per_host_concurrency` slots for that host (held until
+  the response body is closed, not just until the headers arrive); each
+  bulkhead pool (bulkheads.py) has its own set of slots;
+- waits out a short backoff after the host answered 429/503 (Retry-After is
+  honoured), or fails fast if the remaining backoff is longer than
+  `host_backoff_max_wait_seconds`;
+- fails fast while the host's circuit is open, i.e. after
+  `host_failure_threshold` consecutive failures (429/5xx, timeouts, connection
+  errors), for `host_circuit_open_seconds`; then a single probe request decides
+  whether to close it again.
+
+Fast failures raise HostUnavailable, an httpx.TransportError, so the sanitizer's
+existing fallbacks (keep the original URL, infer the label from it) apply
+without burning a timeout. State is per process and visible through
+GET /api/admin/debug/host-health.
+"""
+from dataclasses import dataclass, field
+import asyncio
+import time
+import weakref
+
+import httpx
+
+from config import settings
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_THROTTLE_STATUSES = (429, 503)
+
+
+class HostUnavailable(httpx.TransportError):
+    """Request refused locally because the host is backing off or its circuit is open."""
+
+
+@dataclass
+class HostState:
+    host: str
+    state: str = CLOSED
+    consecutive_failures: int = 0
+    backoff_seconds: float = 0.0
+    retry_at: float = 0.0  # time.monotonic() before which requests back off
+    open_until: float = 0.0  # time.monotonic() until which the circuit stays open
+    probing: bool = False
+    in_flight: int = 0
+    requests: int = 0
+    successes: int = 0
+    failures: int = 0
+    throttled: int = 0
+    rejected: int = 0
+    last_error: str | None = None
+    # asyncio primitives are bound to one event loop; keep semaphores per loop,
+    # one per bulkhead pool (see bulkheads.py) so pools don't share host slots
+    _semaphores: weakref.WeakKeyDictionary = field(default_factory=weakref.WeakKeyDictionary, repr=False)
+
+    def semaphore(self, pool: str | None = None) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        per_pool = self._semaphores.get(loop)
+        if per_pool is None:
+            per_pool = self._semaphores[loop] = {}
+        sem = per_pool.get(pool)
+        if sem is None:
+            sem = per_pool[pool] = asyncio.Semaphore(max(1, settings.outbound_per_host_concurrency))
+        return sem
+
+
+class HostHealth:
+    """Registry of HostState keyed by lowercase hostname."""
+
+    def __init__(self):
+        self._hosts: dict[str, HostState] = {}
+
+    def get(self, host: str) -> HostState:
+        host = (host or "").lower()
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = HostState(host=host)
+        return state
+
+    def reset(self) -> None:
+        self._hosts.clear()
+
+    async def admit(self, state: HostState) -> bool:
+        """
+        Wait until a request to the host may start, or raise HostUnavailable.
+        Returns True if this request is the half-open probe.
+        """
+        now = time.monotonic()
+        if state.state == OPEN:
+            if now < state.open_until:
+                state.rejected += 1
+                raise HostUnavailable(f"circuit open for {state.host}")
+            state.state = HALF_OPEN
+            state.probing = False
+        probe = False
+        if state.state == HALF_OPEN:
+            if state.probing:
+                state.rejected += 1
+                raise HostUnavailable(f"circuit half-open for {state.host}; probe in flight")
+            state.probing = probe = True
+
+        wait = state.retry_at - now
+        if wait > 0:
+            if wait > settings.host_backoff_max_wait_seconds:
+                state.rejected += 1
+                if probe:
+                    state.probing = False
+                raise HostUnavailable(f"{state.host} is backing off for {wait:.1f}s")
+            try:
+                await asyncio.sleep(wait)
+            except BaseException:
+                if probe:
+                    state.probing = False
+                raise
+        return probe
+
+    def record_success(self, state: HostState) -> None:
+        state.successes += 1
+        state.consecutive_failures = 0
+        state.backoff_seconds = 0.0
+        state.state = CLOSED
+        state.probing = False
+
+    def record_failure(self, state: HostState, error: str, retry_after: float | None = None,
+                       throttled: bool = False) -> None:
+        now = time.monotonic()
+        state.failures += 1
+        state.consecutive_failures += 1
+        state.last_error = error
+        if throttled:
+            state.throttled += 1
+            base = max(settings.host_backoff_base_seconds, 0.0)
+            state.backoff_seconds = min(
+                settings.host_backoff_max_seconds,
+                state.backoff_seconds * 2 if state.backoff_seconds else base,
+            )
+            delay = state.backoff_seconds
+            if retry_after is not None:
+                delay = min(settings.host_backoff_max_seconds, max(delay, retry_after))
+            state.retry_at = max(state.retry_at, now + delay)
+        if state.state == HALF_OPEN or state.consecutive_failures >= settings.host_failure_threshold:
+            state.state = OPEN
+            state.open_until = now + settings.host_circuit_open_seconds
+        state.probing = False
+
+    def snapshot(self) -> list[dict]:
+        now = time.monotonic()
+        rows = []
+        for state in sorted(self._hosts.values(), key=lambda s: s.host):
+            rows.append({
+                "host": state.host,
+                "state": state.state,
+                "in_flight": state.in_flight,
+                "consecutive_failures": state.consecutive_failures,
+                "backoff_remaining_seconds": round(max(0.0, state.retry_at - now), 3),
+                "open_remaining_seconds": round(max(0.0, state.open_until - now), 3) if state.state == OPEN else 0.0,
+                "requests": state.requests,
+                "successes": state.successes,
+                "failures": state.failures,
+                "throttled": state.throttled,
+                "rejected": state.rejected,
+                "last_error": state.last_error,
+            })
+        return rows
+
+
+registry = HostHealth()
+
+
+def _retry_after_seconds(response: httpx.Response) -> float | None:
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None  # HTTP-date form: fall back to our own backoff
+
+
+class ReleasingStream(httpx.AsyncByteStream):
+    """Response body wrapper that frees a slot (once) when the body is closed."""
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+        self._released = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._release()
+
+
+class HostLimitedTransport(httpx.AsyncBaseTransport):
+    """Apply the per-host registry around another transport (host slots taken from `pool`'s share)."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, health: HostHealth | None = None,
+                 pool: str | None = None):
+        self._inner = inner
+        self._health = health or registry
+        self._pool = pool
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        state = self._health.get(request.url.host)
+        probe = await self._health.admit(state)
+        sem = state.semaphore(self._pool)
+        try:
+            await sem.acquire()
+        except BaseException:
+            if probe:
+                state.probing = False
+            raise
+        state.in_flight += 1
+        state.requests += 1
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                state.in_flight -= 1
+                sem.release()
+
+        try:
+            response = await self._inner.handle_async_request(request)
+        except httpx.TransportError as e:
+            release()
+            self._health.record_failure(state, f"{type(e).__name__}: {e}" if str(e) else type(e).__name__)
+            raise
+        except BaseException:
+            release()
+            if probe:
+                state.probing = False
+            raise
+
+        if response.status_code in _THROTTLE_STATUSES:
+            self._health.record_failure(state, f"HTTP {response.status_code}",
+                                        retry_after=_retry_after_seconds(response), throttled=True)
+        elif response.status_code >= 500:
+            self._health.record_failure(state, f"HTTP {response.status_code}")
+        else:
+            self._health.record_success(state)
+
+        if isinstance(response.stream, httpx.ByteStream):
+            release()  # body already in memory; no connection is held
+        else:
+            response.stream = ReleasingStream(response.stream, release)
+        return response
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
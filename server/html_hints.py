@@ -0,0 +1,143 @@
+"""
+Shared scanner for the HTML hints used by link sanitation.
+
+Title lookup and Channel 3 unwrapping need the same handful of facts about a
+page: its og:title / <title>, a meta refresh target, a JS location redirect and
+the canonical link. Instead of running one regex per hint over the whole page,
+scan_html_hints() lowercases the page once and makes two literal sweeps over it,
+one for tag openers (`<meta`, `<title`, `<link`) and one for `location`,
+matching the specific pattern only at those offsets. Attribute scans are lazy
+and cannot cross the end of the tag.
+
+Results match the previous per-hint regexes (see benchmarks/html_corpus.py and
+tests/test_html_hints.py); the one deliberate difference is that a tag repeating
+the same attribute now yields its first occurrence rather than its last.
+"""
+from dataclasses import dataclass
+import re
+
+# Where hints can start. The sweeps run case-sensitively over a lowercased copy of
+# the page, which lets the regex engine skip ahead by literal search instead of
+# stepping through every character the way the IGNORECASE patterns do.
+_TAG_ANCHOR_RE = re.compile(r"<meta|<title|<link")
+_JS_ANCHOR_RE = re.compile(r"location")
+_TAG_ANCHOR_RE_I = re.compile(_TAG_ANCHOR_RE.pattern, re.IGNORECASE)
+_JS_ANCHOR_RE_I = re.compile(_JS_ANCHOR_RE.pattern, re.IGNORECASE)
+
+_OG_TITLE_AT = re.compile(
+    r'<meta[^>]+?property=["\']og:title["\'][^>]+?content=["\'](.*?)["\']',
+    re.IGNORECASE | re.DOTALL,
+)
+_TITLE_AT = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+META_REFRESH_RE = re.compile(
+    r'<meta[^>]+?http-equiv=["\']refresh["\'][^>]+?content=["\']\s*\d+\s*;\s*url=([^"\']+)["\']',
+    re.IGNORECASE,
+)
+_CANONICAL_AT = re.compile(r'<link[^>]+?rel=["\']canonical["\'][^>]+?href=["\']([^"\']+)["\']', re.IGNORECASE)
+_JS_HREF_AT = re.compile(r'window\.location(?:\.href)?\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE)
+_JS_REPLACE_AT = re.compile(r'location\.replace\(\s*["\']([^"\']+)["\']\s*\)', re.IGNORECASE)
+_JS_ASSIGN_AT = re.compile(r'location\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE)
+
+_WINDOW_PREFIX = "window."
+
+TITLE_HINTS = frozenset({"og_title", "title"})
+REDIRECT_HINTS = frozenset({"meta_refresh", "js_href", "js_replace", "js_assign", "canonical"})
+ALL_HINTS = TITLE_HINTS | REDIRECT_HINTS
+
+_TAG_SWEEP = frozenset({"og_title", "title", "meta_refresh", "canonical"})
+_JS_SWEEP = frozenset({"js_href", "js_replace", "js_assign"})
+
+
+@dataclass
+class HtmlHints:
+    """First occurrence of each hint in the page (raw, unstripped), or None."""
+    og_title: str | None = None
+    title: str | None = None
+    meta_refresh: str | None = None
+    js_href: str | None = None
+    js_replace: str | None = None
+    js_assign: str | None = None
+    canonical: str | None = None
+
+    @property
+    def page_title(self) -> str | None:
+        """og:title when the page declares one (even if empty), else <title>."""
+        return self.og_title if self.og_title is not None else self.title
+
+    @property
+    def js_redirect(self) -> str | None:
+        """JS redirect target, preferring window.location(.href)= over replace() over bare assignment."""
+        for value in (self.js_href, self.js_replace, self.js_assign):
+            if value is not None:
+                return value
+        return None
+
+
+def scan_html_hints(text: str, want=ALL_HINTS, until: str | None = None) -> HtmlHints:
+    """
+    Collect the hints named in `want` from `text`.
+    If `until` is given, scanning stops as soon as that hint is found (use it for
+    a hint that outranks everything else the caller asked for).
+    """
+    hints = HtmlHints()
+    if not text:
+        return hints
+    pending = set(want)
+    stop_on = until if until in pending else None
+
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        tag_anchors, js_anchors, haystack = _TAG_ANCHOR_RE, _JS_ANCHOR_RE, lowered
+    else:
+        # A few non-ASCII characters change length when lowercased; keep offsets valid
+        tag_anchors, js_anchors, haystack = _TAG_ANCHOR_RE_I, _JS_ANCHOR_RE_I, text
+
+    def found(name: str, m: re.Match | None) -> None:
+        if m is not None:
+            setattr(hints, name, m.group(1))
+            pending.discard(name)
+
+    def done(sweep: frozenset) -> bool:
+        return not pending & sweep or (stop_on is not None and stop_on not in pending)
+
+    # Tag sweep: <meta> (og:title, refresh), <title>, <link rel=canonical>
+    if not done(_TAG_SWEEP):
+        end = None  # offset of the next '>' (-1 once none are left)
+        for anchor in tag_anchors.finditer(haystack):
+            pos = anchor.start()
+            tag = haystack[pos + 1].lower()
+            if tag == "t":
+                if "title" in pending:
+                    found("title", _TITLE_AT.match(text, pos))
+            else:
+                # The attribute patterns cannot match past the first '>', so a plain
+                # substring test on the tag body rules most tags out cheaply
+                if end is None or -1 < end < pos:
+                    end = haystack.find(">", pos)
+                attrs = haystack[pos:end] if end != -1 else haystack[pos:]
+                if haystack is text:
+                    attrs = attrs.lower()
+                if tag == "m":
+                    if "og_title" in pending and "og:title" in attrs:
+                        found("og_title", _OG_TITLE_AT.match(text, pos))
+                    if "meta_refresh" in pending and "refresh" in attrs:
+                        found("meta_refresh", META_REFRESH_RE.match(text, pos))
+                elif "canonical" in pending and "canonical" in attrs:
+                    found("canonical", _CANONICAL_AT.match(text, pos))
+            if done(_TAG_SWEEP):
+                break
+
+    # Script sweep: window.location(.href) = ..., location.replace(...), location = ...
+    if not done(_JS_SWEEP):
+        for anchor in js_anchors.finditer(haystack):
+            pos = anchor.start()
+            start = pos - len(_WINDOW_PREFIX)
+            if "js_href" in pending and start >= 0 and haystack[start:pos].lower() == _WINDOW_PREFIX:
+                found("js_href", _JS_HREF_AT.match(text, start))
+            if "js_replace" in pending:
+                found("js_replace", _JS_REPLACE_AT.match(text, pos))
+            if "js_assign" in pending:
+                found("js_assign", _JS_ASSIGN_AT.match(text, pos))
+            if done(_JS_SWEEP):
+                break
+    return hints
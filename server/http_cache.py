@@ -0,0 +1,210 @@
+"""
+Conditional-request cache for outbound page fetches.
+
+For pages the sanitizer reads (destination pages reached while resolving
+Channel 3 links, pages fetched for their titles) the `http_cache` table keeps
+the response validators (ETag, Last-Modified), the freshness lifetime the
+server gave it (Cache-Control max-age, else Expires) and the metadata parsed
+from its <head> (cleaned title, content type, final URL). Bodies are not kept.
+
+Refetching a page:
+- while it is fresh: no request, the stored metadata is used;
+- once stale, if it had validators: a conditional GET (If-None-Match /
+  If-Modified-Since); a 304 extends the entry and reuses its metadata, so an
+  unchanged page costs a status line and headers rather than a download;
+- otherwise: a plain GET, whose result replaces the entry.
+
+no-cache means always revalidate, no-store keeps nothing, and max-age is capped
+at `http_cache_max_age_seconds`. Responses with neither validators nor a
+freshness lifetime are not stored, since they could not save a request.
+
+This sits below link_cache: link_cache answers "what is this page's title"
+for its own TTL; when that expires, the refetch goes through here.
+"""
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+
+import httpx
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from config import settings
+from database import SessionLocal, engine
+from models import HttpCacheEntry
+from url_canon import canonicalize
+
+# Outcomes since process start: served while fresh, revalidated with a 304, fetched in full
+stats = {"fresh": 0, "revalidated": 0, "fetched": 0, "stored": 0}
+
+
+@dataclass(frozen=True)
+class CachedPage:
+    url: str
+    final_url: str | None
+    status_code: int
+    content_type: str | None
+    etag: str | None
+    last_modified: str | None
+    title: str | None
+    fetched_at: datetime
+    expires_at: datetime
+
+    def is_fresh(self, now: datetime | None = None) -> bool:
+        return self.expires_at > (now or _utcnow())
+
+    def conditional_headers(self) -> dict:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes; they are always written as UTC
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _cache_control(headers: httpx.Headers) -> dict[str, str]:
+    directives = {}
+    for part in headers.get_list("cache-control", split_commas=True):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip().strip('"')
+    return directives
+
+
+def freshness(headers: httpx.Headers, now: datetime | None = None) -> timedelta | None:
+    """Freshness lifetime left for a response, or None if it must not be stored."""
+    now = now or _utcnow()
+    directives = _cache_control(headers)
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return timedelta(0)
+    lifetime = None
+    if "max-age" in directives:
+        try:
+            lifetime = int(directives["max-age"])
+        except ValueError:
+            lifetime = 0
+    elif headers.get("expires"):
+        try:
+            expires = _as_utc(parsedate_to_datetime(headers["expires"]))
+            date = _as_utc(parsedate_to_datetime(headers["date"])) if headers.get("date") else now
+            lifetime = int((expires - date).total_seconds())
+        except (TypeError, ValueError):
+            lifetime = 0  # invalid Expires means already expired
+    if lifetime is None:
+        return timedelta(0)
+    try:
+        lifetime -= int(headers.get("age", 0))
+    except ValueError:
+        pass
+    return timedelta(seconds=max(0, min(lifetime, settings.http_cache_max_age_seconds)))
+
+
+def record(outcome: str) -> None:
+    stats[outcome] += 1
+
+
+def lookup(url: str) -> CachedPage | None:
+    """The stored entry for url (fresh or not), or None on miss/DB error."""
+    if not settings.http_cache_enabled:
+        return None
+    try:
+        with SessionLocal() as db:
+            entry = db.get(HttpCacheEntry, canonicalize(url))
+            if entry is None:
+                return None
+            return CachedPage(
+                url=entry.url,
+                final_url=entry.final_url,
+                status_code=entry.status_code,
+                content_type=entry.content_type,
+                etag=entry.etag,
+                last_modified=entry.last_modified,
+                title=entry.title,
+                fetched_at=_as_utc(entry.fetched_at),
+                expires_at=_as_utc(entry.expires_at),
+            )
+    except Exception as e:
+        print(f"http_cache lookup failed: {e}")
+        return None
+
+
+def _upsert(values: dict) -> None:
+    try:
+        dialect = engine.dialect.name
+        if dialect == "sqlite":
+            stmt = sqlite_insert(HttpCacheEntry).values(**values)
+        elif dialect == "postgresql":
+            stmt = pg_insert(HttpCacheEntry).values(**values)
+        else:
+            stmt = None
+
+        with SessionLocal() as db:
+            if stmt is not None:
+                update_cols = {k: stmt.excluded[k] for k in values if k != "url"}
+                db.execute(stmt.on_conflict_do_update(index_elements=["url"], set_=update_cols))
+            else:
+                db.merge(HttpCacheEntry(**values))
+            db.commit()
+        stats["stored"] += 1
+    except Exception as e:
+        print(f"http_cache store failed: {e}")
+
+
+def store(url: str, response: httpx.Response, title: str | None) -> None:
+    """Record a full 200 response for url with the title parsed from it. Failures are logged, never raised."""
+    if not settings.http_cache_enabled or response.status_code != 200:
+        return
+    now = _utcnow()
+    lifetime = freshness(response.headers, now)
+    etag = response.headers.get("etag")
+    last_modified = response.headers.get("last-modified")
+    if lifetime is None or not (etag or last_modified or lifetime):
+        return
+    _upsert({
+        "url": canonicalize(url),
+        "final_url": str(response.url),
+        "status_code": response.status_code,
+        "content_type": response.headers.get("content-type"),
+        "etag": etag,
+        "last_modified": last_modified,
+        "title": title,
+        "fetched_at": now,
+        "expires_at": now + lifetime,
+    })
+
+
+def revalidated(page: CachedPage, response: httpx.Response) -> CachedPage:
+    """Extend an entry after a 304, taking any validators/lifetime the 304 carried."""
+    now = _utcnow()
+    lifetime = freshness(response.headers, now)
+    page = replace(
+        page,
+        etag=response.headers.get("etag") or page.etag,
+        last_modified=response.headers.get("last-modified") or page.last_modified,
+        fetched_at=now,
+        expires_at=now + (lifetime or timedelta(0)),
+    )
+    if settings.http_cache_enabled and lifetime is not None:
+        _upsert({
+            "url": page.url,
+            "final_url": page.final_url,
+            "status_code": page.status_code,
+            "content_type": page.content_type,
+            "etag": page.etag,
+            "last_modified": page.last_modified,
+            "title": page.title,
+            "fetched_at": page.fetched_at,
+            "expires_at": page.expires_at,
+        })
+    return page
@@ -0,0 +1,112 @@
+"""
+Application-lifetime outbound HTTP clients, one per purpose.
+
+Each purpose keeps its own headers/timeouts but shares a tuned connection pool
+for the lifetime of the app, so repeat requests to the same host reuse TCP/TLS
+connections instead of handshaking per request. Clients are opened on startup
+(main.startup_event) and closed on shutdown; get_client() also creates them
+lazily so scripts and tests work without the lifespan hooks.
+"""
+import asyncio
+import httpx
+
+import bulkheads
+from config import settings
+from host_health import HostLimitedTransport
+
+_SANITIZER_UA = "Channel3-LinkSanitizer/1.0 (+https://trychannel3.com)"
+_BROWSER_UA = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+
+_SHORT_TIMEOUT = httpx.Timeout(3.0, connect=3.0, read=3.0, write=3.0)
+
+# purpose -> client options
+PURPOSES = {
+    # Link sanitation on product/feed-item writes
+    "sanitizer": {"timeout": _SHORT_TIMEOUT, "headers": {"User-Agent": _SANITIZER_UA}, "follow_redirects": True},
+    # Background link sanitation (link_worker.py)
+    "worker": {"timeout": _SHORT_TIMEOUT, "headers": {"User-Agent": _SANITIZER_UA}, "follow_redirects": True},
+    # Admin debug endpoints
+    "resolver": {"timeout": _SHORT_TIMEOUT, "headers": {"User-Agent": "Channel3-LinkResolver/1.0 (+https://trychannel3.com)"}, "follow_redirects": True},
+    "title_fetcher": {"timeout": _SHORT_TIMEOUT, "headers": {"User-Agent": "Channel3-TitleFetcher/1.0 (+https://trychannel3.com)"}, "follow_redirects": True},
+    "migrator": {"timeout": httpx.Timeout(5.0, connect=3.0, read=3.0, write=3.0), "headers": {"User-Agent": "Channel3-Migrator/1.0 (+https://trychannel3.com)"}, "follow_redirects": True},
+    # Scheduled link health checks (link_checker.py)
+    "checker": {"timeout": httpx.Timeout(5.0, connect=3.0, read=5.0, write=3.0), "headers": {"User-Agent": "Channel3-LinkChecker/1.0 (+https://trychannel3.com)"}, "follow_redirects": True},
+    # Unauthenticated /api/public/resolve-urls
+    "public": {"timeout": _SHORT_TIMEOUT, "headers": {"User-Agent": _BROWSER_UA}, "follow_redirects": True},
+    # Gemini product details
+    "gemini": {"timeout": httpx.Timeout(10.0)},
+}
+
+# purpose -> (event loop, client). Pooled connections belong to the loop that opened
+# them, so a client is only reused on the loop it was created on.
+_clients: dict[str, tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+
+
+def _http2_enabled() -> bool:
+    if not settings.outbound_http2:
+        return False
+    try:
+        import h2  # noqa: F401  (optional dependency of httpx[http2])
+        return True
+    except ImportError:
+        print("OUTBOUND_HTTP2 is set but the 'h2' package is not installed; using HTTP/1.1")
+        return False
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.outbound_max_connections,
+        max_keepalive_connections=settings.outbound_max_keepalive_connections,
+        keepalive_expiry=settings.outbound_keepalive_expiry_seconds,
+    )
+
+
+def build_client(purpose: str, **overrides) -> httpx.AsyncClient:
+    """
+    Create a new client configured for `purpose` (callers own its lifecycle).
+    Its transport is wrapped in host_health.HostLimitedTransport, so per-host
+    concurrency caps, backoff and the circuit breaker apply to every request,
+    and then in the bulkhead of the purpose's pool (bulkheads.py).
+    """
+    options = dict(PURPOSES[purpose])
+    options.update(overrides)
+    transport = options.pop("transport", None)
+    if transport is None:
+        transport = httpx.AsyncHTTPTransport(
+            verify=options.pop("verify", True),
+            limits=options.pop("limits", _limits()),
+            http2=options.pop("http2", _http2_enabled()),
+        )
+    pool = bulkheads.for_purpose(purpose)
+    options["transport"] = bulkheads.BulkheadTransport(HostLimitedTransport(transport, pool=pool.name), pool)
+    return httpx.AsyncClient(**options)
+
+
+def get_client(purpose: str) -> httpx.AsyncClient:
+    """Return the shared client for `purpose`, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    entry = _clients.get(purpose)
+    if entry is not None and entry[0] is loop and not entry[1].is_closed:
+        return entry[1]
+    client = build_client(purpose)
+    _clients[purpose] = (loop, client)
+    return client
+
+
+async def start() -> None:
+    """Open every shared client (called from the app startup hook)."""
+    for purpose in PURPOSES:
+        get_client(purpose)
+
+
+async def close_all() -> None:
+    """
+    Close the shared clients owned by the current loop (called on app shutdown).
+    Clients of other loops are left registered: their pools can only be closed
+    on their own loop, by that loop's close_all().
+    """
+    loop = asyncio.get_running_loop()
+    for purpose, (owner, client) in list(_clients.items()):
+        if owner is loop:
+            await client.aclose()
+            del _clients[purpose]
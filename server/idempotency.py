@@ -0,0 +1,175 @@
+"""
+Idempotency-Key support for non-idempotent POSTs (POST /api/feed-items).
+
+The first request with a key claims it by inserting an `idempotency_keys` row
+("in_progress") with a fingerprint of its payload, does the work, and stores
+its response on the row ("completed"). A retry with the same key then:
+- gets the stored response back without any work, if the original finished;
+- waits for the original (up to `idempotency_wait_seconds`) if it is still
+  running, then gets its response;
+- is rejected if its payload differs from the original's (IdempotencyKeyReused).
+
+Failed requests release their key, so the client's retry runs again rather than
+replaying an error. Keys are kept for `idempotency_ttl_hours`; a claim left
+unfinished for `idempotency_lock_seconds` (crashed worker) can be taken over.
+The claim is a primary-key insert, so this holds across workers sharing the
+database; in-process duplicates are woken as soon as the original completes.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+import asyncio
+import hashlib
+import json
+import time
+
+from sqlalchemy import and_, delete, or_, update
+from sqlalchemy.exc import IntegrityError
+
+from config import settings
+from database import SessionLocal
+from models import IdempotencyKey
+
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+
+MAX_KEY_LENGTH = 255
+
+# How often a duplicate re-reads a claim held by another process
+_POLL_SECONDS = 0.2
+
+# (scope, key) -> event set when this process finishes or releases the key
+_events: dict[tuple[str, str], asyncio.Event] = {}
+
+
+class IdempotencyKeyReused(Exception):
+    """The key was already used for a request with a different payload."""
+
+
+class IdempotencyKeyInProgress(Exception):
+    """The original request is still running after the wait timed out."""
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    status_code: int
+    body: dict
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def fingerprint(payload: dict) -> str:
+    """SHA-256 of the payload as canonical JSON."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _expired(now: datetime):
+    return or_(
+        IdempotencyKey.created_at < now - timedelta(hours=settings.idempotency_ttl_hours),
+        and_(
+            IdempotencyKey.status == IN_PROGRESS,
+            IdempotencyKey.created_at < now - timedelta(seconds=settings.idempotency_lock_seconds),
+        ),
+    )
+
+
+def _claim(scope: str, key: str, digest: str) -> tuple[bool, IdempotencyKey | None]:
+    """Insert our claim: (True, None) if we got it, else (False, the existing row, detached)."""
+    now = _utcnow()
+    with SessionLocal() as db:
+        db.execute(delete(IdempotencyKey).where(
+            IdempotencyKey.scope == scope, IdempotencyKey.key == key, _expired(now)
+        ))
+        db.add(IdempotencyKey(scope=scope, key=key, fingerprint=digest, status=IN_PROGRESS, created_at=now))
+        try:
+            db.commit()
+            return True, None
+        except IntegrityError:
+            db.rollback()
+        row = db.get(IdempotencyKey, (scope, key))
+        if row is not None:
+            db.expunge(row)
+        return False, row
+
+
+async def begin(scope: str, key: str, digest: str) -> StoredResponse | None:
+    """
+    Claim `key` for a request whose payload has fingerprint `digest`.
+    Returns None when the caller owns the key (it must then call complete() or
+    release()), or the original's stored response for a retry. Raises
+    IdempotencyKeyReused or IdempotencyKeyInProgress.
+    """
+    deadline = time.monotonic() + settings.idempotency_wait_seconds
+    while True:
+        claimed, row = _claim(scope, key, digest)
+        if claimed:
+            _events[(scope, key)] = asyncio.Event()
+            return None
+        if row is None:
+            continue  # released between our insert and read; try again
+        if row.fingerprint != digest:
+            raise IdempotencyKeyReused(f"Idempotency-Key {key!r} was used for a different request")
+        if row.status == COMPLETED:
+            return StoredResponse(status_code=row.status_code, body=json.loads(row.response))
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise IdempotencyKeyInProgress(f"A request with Idempotency-Key {key!r} is still in progress")
+        event = _events.get((scope, key))
+        try:
+            if event is not None:
+                await asyncio.wait_for(event.wait(), timeout=remaining)
+            else:
+                await asyncio.sleep(min(_POLL_SECONDS, remaining))
+        except asyncio.TimeoutError:
+            pass
+
+
+def _finish(scope: str, key: str) -> None:
+    event = _events.pop((scope, key), None)
+    if event is not None:
+        event.set()
+
+
+def complete(scope: str, key: str, status_code: int, body: dict) -> None:
+    """
+    Store the response of the request that owns `key` for later retries.
+    Failures are logged, never raised: the work is done and must not be reported
+    as failed (the claim then expires after `idempotency_lock_seconds`).
+    """
+    try:
+        with SessionLocal() as db:
+            db.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+                .values(status=COMPLETED, status_code=status_code, response=json.dumps(body),
+                        completed_at=_utcnow())
+            )
+            db.commit()
+    except Exception as e:
+        print(f"Idempotency key completion failed: {e}")
+    finally:
+        _finish(scope, key)
+
+
+def release(scope: str, key: str) -> None:
+    """Give up a claim after a failure, so a retry runs the request again."""
+    try:
+        with SessionLocal() as db:
+            db.execute(delete(IdempotencyKey).where(
+                IdempotencyKey.scope == scope, IdempotencyKey.key == key, IdempotencyKey.status == IN_PROGRESS
+            ))
+            db.commit()
+    except Exception as e:
+        print(f"Idempotency key release failed: {e}")
+    finally:
+        _finish(scope, key)
+
+
+def prune_expired() -> int:
+    """Delete expired keys. Returns the number removed."""
+    with SessionLocal() as db:
+        removed = db.execute(delete(IdempotencyKey).where(_expired(_utcnow()))).rowcount
+        db.commit()
+    return removed
@@ -0,0 +1,108 @@
+"""
+Concurrent batch link resolution, streamed as NDJSON.
+
+The JSON resolvers (/api/public/resolve-urls, /api/admin/debug/resolve-urls and
+fetch-titles) take 10 URLs and answer once all of them are done. The /stream
+variants take up to `link_batch_max_urls` URLs (the unauthenticated public one
+only `public_link_batch_max_urls` Channel 3 links), resolve and title them with at
+most `link_batch_concurrency` in flight (per-host caps still apply in the shared
+clients), and write one JSON line per URL as soon as it is ready:
+
+    {"index": 3, "url": "...", "final_url": "...", "title": "..." | null, "ms": 84.2, "error": null}
+
+Lines arrive in completion order; `index` is the position in the request. A last
+line {"done": true, "count": n, "ms": total} marks the end of the batch. If the
+client goes away, the outstanding lookups are cancelled.
+"""
+from typing import AsyncIterator
+import asyncio
+import json
+import time
+import urllib.parse
+
+import httpx
+
+from config import settings
+from link_rules import CHANNEL3_ROOTS
+from utils import fetch_title, resolve_link
+
+MEDIA_TYPE = "application/x-ndjson"
+
+
+def is_channel3_url(u: str) -> bool:
+    try:
+        host = (urllib.parse.urlparse(u).hostname or "").lower()
+    except ValueError:
+        return False
+    return any(host == root or host.endswith("." + root) for root in CHANNEL3_ROOTS)
+
+
+async def resolve_one(u: str, client: httpx.AsyncClient, titles_for_all: bool) -> dict:
+    """
+    Resolve one link and look up its title. With titles_for_all False (public
+    callers) only Channel 3 links are titled; other links are echoed back.
+    Never raises: failures keep the original URL and report `error`.
+    """
+    started = time.perf_counter()
+    final_url, title, error = u, None, None
+    try:
+        parsed = urllib.parse.urlparse(u)
+        if parsed.scheme not in ("http", "https") or not parsed.hostname:
+            error = "invalid_url"
+        elif titles_for_all or is_channel3_url(u):
+            resolution = await resolve_link(u, client)
+            final_url = resolution.final_url
+            # Reuse the title read during resolution, else fetch the destination page
+            if resolution.title_checked:
+                title = resolution.title
+            else:
+                title = await fetch_title(final_url, client)
+    except Exception as e:
+        error = type(e).__name__
+    return {
+        "url": u,
+        "final_url": final_url,
+        "title": title,
+        "ms": round((time.perf_counter() - started) * 1000, 1),
+        "error": error,
+    }
+
+
+async def iter_results(urls: list[str], client: httpx.AsyncClient, titles_for_all: bool,
+                       concurrency: int | None = None) -> AsyncIterator[dict]:
+    """Yield resolve_one() results (plus their `index`) as they complete."""
+    sem = asyncio.Semaphore(max(1, concurrency or settings.link_batch_concurrency))
+
+    async def run(index: int, u: str) -> dict:
+        async with sem:
+            result = await resolve_one(u, client, titles_for_all)
+        return {"index": index, **result}
+
+    tasks = [asyncio.ensure_future(run(i, u)) for i, u in enumerate(urls)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def ndjson_lines(urls: list[str], client: httpx.AsyncClient, titles_for_all: bool) -> AsyncIterator[str]:
+    started = time.perf_counter()
+    count = 0
+    async for result in iter_results(urls, client, titles_for_all):
+        count += 1
+        yield json.dumps(result) + "\n"
+    yield json.dumps({"done": True, "count": count, "ms": round((time.perf_counter() - started) * 1000, 1)}) + "\n"
+
+
+def batch_urls(urls, max_urls: int | None = None) -> list[str]:
+    """
+    Validate the request's URL list; raises ValueError past `max_urls`
+    (default link_batch_max_urls).
+    """
+    limit = settings.link_batch_max_urls if max_urls is None else max_urls
+    urls = [str(u) for u in (urls or [])]
+    if len(urls) > limit:
+        raise ValueError(f"At most {limit} URLs per batch")
+    return urls
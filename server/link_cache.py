@@ -0,0 +1,249 @@
+"""
+Caches for outbound link work (Channel 3 resolution and page titles).
+
+Two tiers, consulted by read_through():
+- an in-process LRU with TTL and a byte budget, plus single-flight coalescing so
+  N concurrent requests for the same uncached URL cause one upstream fetch;
+- the persistent `link_cache` table, shared by every worker and surviving restarts.
+
+Successful lookups are kept for `link_cache_ttl_seconds`, failures/empty results
+for the much shorter `link_cache_negative_ttl_seconds`.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+import asyncio
+import sys
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from config import settings
+from database import SessionLocal, engine
+from models import LinkCacheEntry
+from url_canon import canonicalize
+
+KIND_RESOLVE = "resolve"
+KIND_TITLE = "title"
+
+STATUS_OK = "ok"
+STATUS_EMPTY = "empty"
+STATUS_ERROR = "error"
+
+
+@dataclass(frozen=True)
+class CachedResult:
+    status: str
+    final_url: str | None = None
+    title: str | None = None
+    fetched_at: datetime | None = None
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes; they are always written as UTC
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def normalize_cache_key(url: str) -> str:
+    """Cache key for a URL: its url_canon.canonicalize() form, so tracking variants share an entry."""
+    try:
+        return canonicalize(url)
+    except Exception:
+        return (url or "").strip()
+
+
+def is_fresh(entry, now: datetime | None = None) -> bool:
+    ttl = settings.link_cache_ttl_seconds if entry.status == STATUS_OK else settings.link_cache_negative_ttl_seconds
+    if ttl <= 0 or entry.fetched_at is None:
+        return False
+    return _as_utc(entry.fetched_at) + timedelta(seconds=ttl) > (now or _utcnow())
+
+
+def lookup(kind: str, url: str) -> CachedResult | None:
+    """Return a fresh persistent entry for (kind, url), or None on miss/expiry/DB error."""
+    if not settings.link_cache_enabled:
+        return None
+    try:
+        with SessionLocal() as db:
+            entry = db.execute(
+                select(LinkCacheEntry).where(
+                    LinkCacheEntry.url == normalize_cache_key(url),
+                    LinkCacheEntry.kind == kind,
+                )
+            ).scalar_one_or_none()
+            if entry is None or not is_fresh(entry):
+                return None
+            return CachedResult(
+                status=entry.status,
+                final_url=entry.final_url,
+                title=entry.title,
+                fetched_at=_as_utc(entry.fetched_at),
+            )
+    except Exception as e:
+        print(f"link_cache lookup failed: {e}")
+        return None
+
+
+def store(kind: str, url: str, status: str, final_url: str | None = None, title: str | None = None,
+          fetched_at: datetime | None = None) -> None:
+    """Upsert a persistent entry in its own short transaction. Failures are logged, never raised."""
+    if not settings.link_cache_enabled:
+        return
+    values = {
+        "url": normalize_cache_key(url),
+        "kind": kind,
+        "final_url": final_url,
+        "title": title,
+        "status": status,
+        "fetched_at": fetched_at or _utcnow(),
+    }
+    try:
+        dialect = engine.dialect.name
+        if dialect == "sqlite":
+            stmt = sqlite_insert(LinkCacheEntry).values(**values)
+        elif dialect == "postgresql":
+            stmt = pg_insert(LinkCacheEntry).values(**values)
+        else:
+            stmt = None
+
+        with SessionLocal() as db:
+            if stmt is not None:
+                update_cols = {k: stmt.excluded[k] for k in ("final_url", "title", "status", "fetched_at")}
+                db.execute(stmt.on_conflict_do_update(index_elements=["url", "kind"], set_=update_cols))
+            else:
+                db.merge(LinkCacheEntry(**values))
+            db.commit()
+    except Exception as e:
+        print(f"link_cache store failed: {e}")
+
+
+# ---------------------------- In-process tier ---------------------------- #
+
+class MemoryCache:
+    """
+    Bounded LRU of CachedResult keyed by (kind, normalized url).
+    Capped both by entry count and by an estimate of retained bytes; expired
+    entries are dropped on access. Not thread-safe (used from the event loop only).
+    """
+
+    _ENTRY_OVERHEAD = 200  # rough per-entry cost of the tuple/dataclass/OrderedDict node
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes_used = 0
+        self._data: OrderedDict = OrderedDict()
+
+    @classmethod
+    def _size_of(cls, key, value: CachedResult) -> int:
+        size = cls._ENTRY_OVERHEAD + sys.getsizeof(key[1])
+        for text in (value.final_url, value.title):
+            if text:
+                size += sys.getsizeof(text)
+        return size
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key) -> CachedResult | None:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, size = item
+        if not is_fresh(value):
+            del self._data[key]
+            self.bytes_used -= size
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def put(self, key, value: CachedResult) -> None:
+        if self.max_entries <= 0 or self.max_bytes <= 0:
+            return
+        size = self._size_of(key, value)
+        if size > self.max_bytes:
+            return
+        old = self._data.pop(key, None)
+        if old is not None:
+            self.bytes_used -= old[1]
+        self._data[key] = (value, size)
+        self.bytes_used += size
+        while self._data and (len(self._data) > self.max_entries or self.bytes_used > self.max_bytes):
+            _, (_, evicted_size) = self._data.popitem(last=False)
+            self.bytes_used -= evicted_size
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.bytes_used = 0
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one in-flight task."""
+
+    def __init__(self):
+        self._inflight: dict = {}
+
+    async def do(self, key, fn):
+        task = self._inflight.get(key)
+        if task is None or task.done():
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+
+            def _forget(t, k=key):
+                if self._inflight.get(k) is t:
+                    del self._inflight[k]
+
+            task.add_done_callback(_forget)
+        # shield: one caller being cancelled must not cancel the fetch the others share
+        return await asyncio.shield(task)
+
+
+memory = MemoryCache(
+    max_entries=settings.link_memory_cache_max_entries,
+    max_bytes=settings.link_memory_cache_max_bytes,
+)
+_flights = SingleFlight()
+
+
+def prime(kind: str, url: str, result: CachedResult) -> None:
+    """Record a result obtained as a side effect of other work (e.g. a title read during resolution)."""
+    if result.fetched_at is None:
+        result = CachedResult(status=result.status, final_url=result.final_url, title=result.title,
+                              fetched_at=_utcnow())
+    memory.put((kind, normalize_cache_key(url)), result)
+    store(kind, url, result.status, final_url=result.final_url, title=result.title,
+          fetched_at=result.fetched_at)
+
+
+async def read_through(kind: str, url: str, fetch) -> CachedResult:
+    """
+    Return the cached result for (kind, url), consulting memory, then the
+    link_cache table, then `fetch()` (an async callable returning CachedResult).
+    Concurrent misses for the same key share a single upstream fetch.
+    """
+    key = (kind, normalize_cache_key(url))
+    hit = memory.get(key)
+    if hit is not None:
+        return hit
+
+    async def load() -> CachedResult:
+        result = lookup(kind, url)
+        if result is None:
+            fetched = await fetch()
+            result = CachedResult(
+                status=fetched.status,
+                final_url=fetched.final_url,
+                title=fetched.title,
+                fetched_at=fetched.fetched_at or _utcnow(),
+            )
+            store(kind, url, result.status, final_url=result.final_url, title=result.title,
+                  fetched_at=result.fetched_at)
+        memory.put(key, result)
+        return result
+
+    return await _flights.do(key, load)
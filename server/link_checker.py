@@ -0,0 +1,292 @@
+"""
+Scheduled, incremental health checks of published product links.
+
+Every `link_check_interval_seconds` the checker takes the published links
+checked longest ago (never-checked first) and re-fetches their resolved URLs,
+`link_check_concurrency` at a time and through the same per-host limits and
+circuit breakers as every other outbound fetch (host_health.py). The number of
+links per tick follows from the catalog size so that each link is visited
+about once per `link_check_window_hours`: ceil(links * interval / window),
+capped at `link_check_max_per_tick`. Links checked (or sanitized) within the
+last half window are not due yet, so small catalogs aren't re-fetched early.
+
+Checks only read response headers and are conditional when the last response
+had validators (If-None-Match / If-Modified-Since). Outcomes:
+- 2xx/304 at the same canonical URL: "ok"
+- 2xx/304 after redirecting elsewhere: "redirected", with redirect_url
+- 404/410: "dead"
+- anything else (timeouts, 5xx, 403/429): a failed check; the link is marked
+  "dead" after `link_check_dead_after` consecutive failures
+Links on a host whose circuit is open are skipped until a later tick.
+
+last_checked always moves forward; the other columns are written only when
+they change, and a product's bundles and feed version only when one of its
+links changes check_status or redirect_url.
+"""
+from datetime import datetime, timedelta, timezone
+import asyncio
+import math
+import time
+
+from sqlalchemy import func, or_, select, update
+
+from config import settings
+from database import SessionLocal
+from host_health import HostUnavailable
+from http_clients import get_client
+from link_batch import is_channel3_url
+from link_worker import STATUS_PENDING
+from models import Product, ProductLink
+from url_canon import canonicalize
+from utils import bump_feed_version, invalidate_bundles_for_product, refresh_bundle_read_models
+
+OK = "ok"
+REDIRECTED = "redirected"
+DEAD = "dead"
+
+_GONE = {404, 410}
+
+# Columns a check may change (besides last_checked)
+_CHECK_COLUMNS = ("check_status", "http_status", "redirect_url", "etag", "last_modified", "check_failures")
+
+# Counters since process start
+stats = {
+    "ticks": 0,
+    "checked": 0,
+    "failed": 0,
+    "skipped": 0,
+    "changed": 0,
+    "last_tick_at": None,
+    "last_tick_seconds": None,
+}
+
+# (event loop, task) of the scheduler, if running
+_scheduler: tuple[asyncio.AbstractEventLoop, asyncio.Task] | None = None
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _window_seconds() -> float:
+    return max(1.0, settings.link_check_window_hours * 3600)
+
+
+def _published(query):
+    """Restrict a ProductLink query to links of published, already-sanitized products."""
+    return (
+        query.join(Product, Product.id == ProductLink.product_id)
+        .where(Product.is_published == True)  # noqa: E712
+        .where(or_(Product.sanitization_status.is_(None), Product.sanitization_status != STATUS_PENDING))
+    )
+
+
+def _due(query, now: datetime | None = None):
+    cutoff = (now or _utcnow()) - timedelta(seconds=_window_seconds() / 2)
+    return query.where(or_(ProductLink.last_checked.is_(None), ProductLink.last_checked < cutoff))
+
+
+def tick_size(total: int) -> int:
+    """Links to check per tick so `total` links are covered once per window."""
+    if total <= 0:
+        return 0
+    per_tick = math.ceil(total * settings.link_check_interval_seconds / _window_seconds())
+    return max(1, min(settings.link_check_max_per_tick, per_tick))
+
+
+def due_links(db, limit: int, now: datetime | None = None) -> list:
+    query = _due(_published(select(ProductLink.id, ProductLink.product_id, ProductLink.resolved_url,
+                                   *(getattr(ProductLink, c) for c in _CHECK_COLUMNS))), now)
+    order = (ProductLink.last_checked.asc().nulls_first(), ProductLink.id)
+    return db.execute(query.order_by(*order).limit(limit)).all()
+
+
+def _failed(link, http_status: int | None) -> dict:
+    failures = (link.check_failures or 0) + 1
+    return {
+        "check_status": DEAD if failures >= settings.link_check_dead_after else link.check_status,
+        "http_status": http_status if http_status is not None else link.http_status,
+        "redirect_url": link.redirect_url,
+        "etag": link.etag,
+        "last_modified": link.last_modified,
+        "check_failures": failures,
+    }
+
+
+async def check_link(link, client) -> dict | None:
+    """New values of _CHECK_COLUMNS for one link, or None if its host is unavailable right now."""
+    headers = {}
+    if link.etag:
+        headers["If-None-Match"] = link.etag
+    if link.last_modified:
+        headers["If-Modified-Since"] = link.last_modified
+    try:
+        # Headers are all we need; leaving the block closes the response unread
+        async with client.stream("GET", link.resolved_url, headers=headers) as response:
+            code = response.status_code
+            final_url = str(response.url)
+            etag = response.headers.get("etag")
+            last_modified = response.headers.get("last-modified")
+    except HostUnavailable:
+        return None
+    except Exception:
+        return _failed(link, None)
+
+    if code in _GONE:
+        return {"check_status": DEAD, "http_status": code, "redirect_url": None,
+                "etag": None, "last_modified": None, "check_failures": 0}
+    if not (200 <= code < 300 or code == 304):
+        return _failed(link, code)
+
+    # Channel 3 links left unresolved are expected to redirect
+    moved = canonicalize(final_url) != canonicalize(link.resolved_url) and not is_channel3_url(link.resolved_url)
+    not_modified = code == 304
+    return {
+        "check_status": REDIRECTED if moved else OK,
+        "http_status": link.http_status if not_modified and link.http_status else code,
+        "redirect_url": canonicalize(final_url) if moved else None,
+        "etag": etag or (link.etag if not_modified else None),
+        "last_modified": last_modified or (link.last_modified if not_modified else None),
+        "check_failures": 0,
+    }
+
+
+async def run_tick(limit: int | None = None) -> dict:
+    """Check the next due links (tick_size() of them unless `limit` is given) and record the results."""
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        if limit is None:
+            limit = tick_size(db.execute(_published(select(func.count(ProductLink.id)))).scalar_one())
+        links = due_links(db, limit) if limit > 0 else []
+
+    client = get_client("checker")
+    sem = asyncio.Semaphore(max(1, settings.link_check_concurrency))
+
+    async def one(link):
+        async with sem:
+            return await check_link(link, client)
+
+    results = await asyncio.gather(*(one(link) for link in links))
+
+    checked = failed = skipped = 0
+    changed_products: set[str] = set()
+    now = _utcnow()
+    with SessionLocal() as db:
+        for link, values in zip(links, results):
+            if values is None:
+                skipped += 1
+                continue
+            checked += 1
+            if values["check_failures"]:
+                failed += 1
+            diff = {column: value for column, value in values.items() if getattr(link, column) != value}
+            # Skip links rewritten by the sanitizer since they were read
+            guarded = (
+                update(ProductLink)
+                .where(ProductLink.id == link.id, ProductLink.resolved_url == link.resolved_url)
+                .values(last_checked=now, **diff)
+            )
+            if db.execute(guarded).rowcount and ("check_status" in diff or "redirect_url" in diff):
+                changed_products.add(link.product_id)
+        if changed_products:
+            bundle_ids: set[str] = set()
+            for product_id in changed_products:
+                bundle_ids.update(invalidate_bundles_for_product(db, product_id))
+            refresh_bundle_read_models(db, bundle_ids)
+            feeds = db.execute(select(Product.feed).where(Product.id.in_(changed_products))).scalars()
+            for feed in set(feeds):
+                bump_feed_version(db, feed)
+        db.commit()
+
+    elapsed = time.perf_counter() - started
+    stats["ticks"] += 1
+    stats["checked"] += checked
+    stats["failed"] += failed
+    stats["skipped"] += skipped
+    stats["changed"] += len(changed_products)
+    stats["last_tick_at"] = now
+    stats["last_tick_seconds"] = round(elapsed, 3)
+    if links:
+        print(f"Link check: checked={checked} failed={failed} skipped={skipped} "
+              f"products_changed={len(changed_products)} in {elapsed:.1f}s")
+    return {"checked": checked, "failed": failed, "skipped": skipped,
+            "products_changed": len(changed_products), "seconds": round(elapsed, 3)}
+
+
+def summary(db, problems_limit: int = 100) -> dict:
+    """Schedule, link counts by health status and the dead/redirected links."""
+    counts = dict(db.execute(
+        _published(select(ProductLink.check_status, func.count(ProductLink.id))).group_by(ProductLink.check_status)
+    ).all())
+    total = sum(counts.values())
+    due = db.execute(_due(_published(select(func.count(ProductLink.id))))).scalar_one()
+    problems = db.execute(
+        _published(select(ProductLink, Product.title, Product.slug))
+        .where(ProductLink.check_status.in_((DEAD, REDIRECTED)))
+        .order_by(ProductLink.check_status, ProductLink.last_checked.desc())
+        .limit(problems_limit)
+    ).all()
+    return {
+        "enabled": settings.link_check_enabled,
+        "window_hours": settings.link_check_window_hours,
+        "interval_seconds": settings.link_check_interval_seconds,
+        "per_tick": tick_size(total),
+        "total": total,
+        "due": due,
+        "by_status": {
+            OK: counts.get(OK, 0),
+            REDIRECTED: counts.get(REDIRECTED, 0),
+            DEAD: counts.get(DEAD, 0),
+            "unchecked": counts.get(None, 0),
+        },
+        "stats": dict(stats),
+        "problems": [
+            {
+                "product_id": link.product_id,
+                "product_title": title,
+                "product_slug": slug,
+                "position": link.position,
+                "label": link.label,
+                "resolved_url": link.resolved_url,
+                "check_status": link.check_status,
+                "http_status": link.http_status,
+                "redirect_url": link.redirect_url,
+                "check_failures": link.check_failures,
+                "last_checked": link.last_checked,
+            }
+            for link, title, slug in problems
+        ],
+    }
+
+
+async def _loop() -> None:
+    while True:
+        await asyncio.sleep(max(1.0, settings.link_check_interval_seconds))
+        try:
+            await run_tick()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Link check tick failed: {e}")
+
+
+async def start() -> None:
+    """Start the scheduler (called from the app startup hook)."""
+    global _scheduler
+    if not settings.link_check_enabled:
+        return
+    loop = asyncio.get_running_loop()
+    if _scheduler is not None and _scheduler[0] is loop and not _scheduler[1].done():
+        return
+    _scheduler = (loop, loop.create_task(_loop()))
+
+
+async def stop() -> None:
+    """Stop the scheduler; the next start() carries on with the oldest-checked links."""
+    global _scheduler
+    if _scheduler is None or _scheduler[0] is not asyncio.get_running_loop():
+        return
+    task = _scheduler[1]
+    _scheduler = None
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
@@ -0,0 +1,237 @@
+"""
+Offline resolver for redirect and affiliate links that carry their destination.
+
+Many Channel 3 and affiliate-network links encode the destination URL in a query
+parameter (`?url=`, `?murl=`, `?ued=` ...) or in the path (CJ `/type/dlg/https://...`).
+utils.resolve_link asks unwrap() first for Channel 3 links and only goes to the
+network when no rule matches; a decoded link that is itself a known wrapper is
+unwrapped again (e.g. an affiliate link inside a Channel 3 link). Affiliate links
+pasted directly are never rewritten, so the creator's attribution is kept.
+
+Rules are plain LinkRule objects kept in RULES, in priority order. Add one with
+register(), usually built by query_param_rule() or path_url_rule(). Each rule is
+covered by tests/fixtures/link_rules.json. Per-rule hit counts are kept in
+process and exposed by stats() (GET /api/admin/debug/resolver-stats).
+"""
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable
+import re
+import urllib.parse
+
+# Channel 3 link hosts (a host matches a root or any subdomain of it)
+CHANNEL3_ROOTS = ("trychannel3.com", "ch3.link", "channel3.link")
+
+# Decoded links are unwrapped at most this many times (wrapper inside wrapper)
+MAX_UNWRAP_DEPTH = 5
+
+_EMBEDDED_URL_RE = re.compile(r"https?(?::|%3A)(?://|%2F%2F)", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class LinkRule:
+    name: str
+    # Host roots the rule applies to (exact host or any subdomain)
+    hosts: tuple[str, ...]
+    # Returns the raw destination for a matching link, or None
+    extract: Callable[[urllib.parse.SplitResult], str | None]
+    description: str = ""
+
+    def applies_to(self, host: str) -> bool:
+        return any(host == root or host.endswith("." + root) for root in self.hosts)
+
+
+RULES: list[LinkRule] = []
+
+_stats: Counter = Counter()
+
+
+def register(rule: LinkRule) -> LinkRule:
+    """Add a rule after the existing ones (earlier rules win)."""
+    if any(r.name == rule.name for r in RULES):
+        raise ValueError(f"duplicate link rule {rule.name!r}")
+    RULES.append(rule)
+    return rule
+
+
+def _clean_destination(value: str | None, default_scheme: str | None = None) -> str | None:
+    """Normalise a decoded destination; only absolute http(s) URLs are accepted."""
+    if not value:
+        return None
+    value = value.strip()
+    # Some networks double-encode the destination
+    for _ in range(2):
+        if re.match(r"https?%3A", value, re.IGNORECASE):
+            value = urllib.parse.unquote(value)
+    if default_scheme and "://" not in value:
+        value = f"{default_scheme}://{value}"
+    try:
+        parsed = urllib.parse.urlsplit(value)
+    except ValueError:
+        return None
+    if parsed.scheme.lower() not in ("http", "https") or not parsed.hostname:
+        return None
+    return value
+
+
+def query_param_rule(name: str, hosts: tuple[str, ...], params: tuple[str, ...],
+                     path_prefix: str | None = None, default_scheme: str | None = None,
+                     description: str = "") -> LinkRule:
+    """Rule for links whose destination is the first present of `params` in the query string."""
+    def extract(parts: urllib.parse.SplitResult) -> str | None:
+        if path_prefix and not parts.path.lower().startswith(path_prefix):
+            return None
+        query = urllib.parse.parse_qs(parts.query, keep_blank_values=False)
+        lowered = {k.lower(): v for k, v in query.items()}
+        for param in params:
+            values = lowered.get(param)
+            if values:
+                return _clean_destination(values[0], default_scheme)
+        return None
+
+    return LinkRule(name=name, hosts=hosts, extract=extract, description=description)
+
+
+def path_url_rule(name: str, hosts: tuple[str, ...], description: str = "") -> LinkRule:
+    """Rule for links that embed the destination URL (plain or percent-encoded) in the path."""
+    def extract(parts: urllib.parse.SplitResult) -> str | None:
+        m = _EMBEDDED_URL_RE.search(parts.path)
+        if not m:
+            return None
+        embedded = parts.path[m.start():]
+        if "%3a" in embedded[:8].lower():
+            embedded = urllib.parse.unquote(embedded)
+        elif parts.query:
+            # An unencoded destination keeps its own query string
+            embedded = f"{embedded}?{parts.query}"
+        return _clean_destination(embedded)
+
+    return LinkRule(name=name, hosts=hosts, extract=extract, description=description)
+
+
+def decode(url: str) -> tuple[str, str] | None:
+    """Apply the first matching rule to `url`: (rule name, destination) or None. No stats."""
+    try:
+        parts = urllib.parse.urlsplit((url or "").strip())
+    except ValueError:
+        return None
+    host = (parts.hostname or "").lower()
+    if not host:
+        return None
+    for rule in RULES:
+        if not rule.applies_to(host):
+            continue
+        try:
+            destination = rule.extract(parts)
+        except Exception:
+            destination = None
+        if destination and destination != url:
+            return rule.name, destination
+    return None
+
+
+def unwrap(url: str) -> tuple[str, list[str]]:
+    """
+    Decode `url` through as many wrapper layers as rules recognise.
+    Returns (destination, names of the rules applied); the destination is `url`
+    itself when nothing matched. Counted in stats().
+    """
+    applied: list[str] = []
+    current = url
+    for _ in range(MAX_UNWRAP_DEPTH):
+        hit = decode(current)
+        if hit is None:
+            break
+        name, current = hit
+        applied.append(name)
+
+    _stats["lookups"] += 1
+    if applied:
+        _stats["hits"] += 1
+        for name in applied:
+            _stats[f"rule:{name}"] += 1
+    return current, applied
+
+
+def record_fallback() -> None:
+    """Count a lookup that still needed the HTTP resolver."""
+    _stats["fallbacks"] += 1
+
+
+def stats() -> dict:
+    lookups = _stats["lookups"]
+
+    def rate(n: int) -> float:
+        return round(n / lookups, 4) if lookups else 0.0
+
+    return {
+        "lookups": lookups,
+        "hits": _stats["hits"],
+        "hit_rate": rate(_stats["hits"]),
+        "fallbacks": _stats["fallbacks"],
+        "rules": [
+            {"name": rule.name, "hits": _stats[f"rule:{rule.name}"], "hit_rate": rate(_stats[f"rule:{rule.name}"])}
+            for rule in RULES
+        ],
+    }
+
+
+def reset_stats() -> None:
+    _stats.clear()
+
+
+# ---------------------------- Built-in rules ---------------------------- #
+
+register(query_param_rule(
+    "channel3_query", CHANNEL3_ROOTS,
+    ("url", "u", "dest", "destination", "redirect", "redirect_url", "target", "to"),
+    description="Channel 3 links with the destination in the query string",
+))
+register(path_url_rule(
+    "channel3_path", CHANNEL3_ROOTS,
+    description="Channel 3 links with the destination embedded in the path",
+))
+register(query_param_rule(
+    "skimlinks", ("go.skimresources.com", "go.redirectingat.com"), ("url",),
+    description="Skimlinks: go.skimresources.com/?id=...&url=<dest>",
+))
+register(query_param_rule(
+    "sovrn", ("redirect.viglink.com",), ("u", "out"),
+    description="Sovrn Commerce (VigLink): redirect.viglink.com/?key=...&u=<dest>",
+))
+register(query_param_rule(
+    "rakuten", ("click.linksynergy.com",), ("murl",),
+    description="Rakuten Advertising: click.linksynergy.com/deeplink?id=...&murl=<dest>",
+))
+register(query_param_rule(
+    "awin", ("awin1.com",), ("ued", "p"),
+    description="Awin: www.awin1.com/cread.php?awinmid=...&ued=<dest>",
+))
+register(query_param_rule(
+    "impact", ("sjv.io", "pxf.io", "evyy.net", "7eer.net", "ojrq.net"), ("u",),
+    description="impact.com: <brand>.sjv.io/c/...?u=<dest>",
+))
+register(path_url_rule(
+    "cj_path", ("anrdoezrs.net", "dpbolvw.net", "jdoqocy.com", "kqzyfj.com", "tkqlhce.com"),
+    description="CJ deep links: /links/<pid>/type/dlg/<dest>",
+))
+register(query_param_rule(
+    "cj_query", ("anrdoezrs.net", "dpbolvw.net", "jdoqocy.com", "kqzyfj.com", "tkqlhce.com"), ("url",),
+    description="CJ click links: /click-<pid>-<aid>?url=<dest>",
+))
+register(query_param_rule(
+    "shareasale", ("shareasale.com",), ("urllink",), path_prefix="/r.cfm", default_scheme="https",
+    description="ShareASale: shareasale.com/r.cfm?...&urllink=<dest without scheme>",
+))
+register(query_param_rule(
+    "pepperjam", ("pjtra.com", "pjatr.com", "gopjn.com"), ("url",),
+    description="Pepperjam: pjtra.com/t/...?url=<dest>",
+))
+register(query_param_rule(
+    "google_redirect", ("google.com",), ("q", "url"), path_prefix="/url",
+    description="Google result redirects: www.google.com/url?q=<dest>",
+))
+register(query_param_rule(
+    "facebook_linkshim", ("l.facebook.com", "lm.facebook.com", "l.instagram.com"), ("u",),
+    description="Facebook/Instagram link shim: l.facebook.com/l.php?u=<dest>",
+))
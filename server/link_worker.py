@@ -0,0 +1,159 @@
+"""
+Background link sanitation for product writes.
+
+With settings.link_sanitize_async enabled, product and feed-item writes store the
+raw links straight away, labelled from their URLs (utils.infer_links),
+with sanitization_status "pending". The worker here then resolves and titles the
+links, rewrites the product row and the read models of its bundles, and bumps the
+feed version so clients showing the provisional labels know to refetch.
+
+Pending rows are durable: start() re-queues any left over from a previous run.
+Like http_clients, the queue belongs to the event loop that created it and is
+created lazily, so enqueue() works without the lifespan hooks.
+"""
+import asyncio
+
+from sqlalchemy import select
+
+from config import settings
+from database import SessionLocal
+from http_clients import get_client
+from models import Product
+from utils import (
+    bump_feed_version,
+    format_links,
+    infer_links,
+    invalidate_bundles_for_product,
+    product_link_rows,
+    refresh_bundle_read_models,
+    sanitize_links,
+)
+
+STATUS_PENDING = "pending"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+# (event loop, queue, worker tasks) of the running worker, if any
+_worker: tuple[asyncio.AbstractEventLoop, asyncio.Queue, list[asyncio.Task]] | None = None
+
+
+async def prepare_product_links(raw: str) -> dict:
+    """
+    Attribute values for writing `raw` to Product.product_url (and Product.links):
+    sanitized inline, or (in async mode) labelled from the URLs now and left for
+    the worker. Call enqueue_if_pending() once the row is committed.
+    """
+    if settings.link_sanitize_async and raw:
+        links = infer_links(raw)
+        return {
+            "product_url": format_links(links),
+            "links": product_link_rows(links),
+            "sanitization_status": STATUS_PENDING,
+            "raw_product_url": raw,
+        }
+    links = await sanitize_links(raw, get_client("sanitizer"))
+    return {
+        "product_url": format_links(links) if raw else raw,
+        "links": product_link_rows(links),
+        "sanitization_status": None,
+        "raw_product_url": None,
+    }
+
+
+def _ensure_worker() -> asyncio.Queue:
+    global _worker
+    loop = asyncio.get_running_loop()
+    if _worker is not None and _worker[0] is loop and not all(t.done() for t in _worker[2]):
+        return _worker[1]
+    queue: asyncio.Queue = asyncio.Queue()
+    tasks = [loop.create_task(_run(queue)) for _ in range(max(1, settings.link_worker_count))]
+    _worker = (loop, queue, tasks)
+    return queue
+
+
+def enqueue(product_id: str) -> None:
+    """Queue a product whose links are pending sanitation."""
+    _ensure_worker().put_nowait(product_id)
+
+
+def enqueue_if_pending(product: Product) -> None:
+    if product.sanitization_status == STATUS_PENDING:
+        enqueue(product.id)
+
+
+async def _run(queue: asyncio.Queue) -> None:
+    while True:
+        product_id = await queue.get()
+        try:
+            await sanitize_product(product_id)
+        except Exception as e:
+            print(f"Background link sanitation failed for product {product_id}: {e}")
+        finally:
+            queue.task_done()
+
+
+async def sanitize_product(product_id: str) -> bool:
+    """
+    Sanitize one pending product's links and apply the result.
+    Returns False if there was nothing to do (deleted, already applied, or the
+    links were edited again meanwhile; a newer edit queues its own run).
+    """
+    with SessionLocal() as db:
+        product = db.get(Product, product_id)
+        if product is None or product.sanitization_status != STATUS_PENDING:
+            return False
+        raw = product.raw_product_url
+
+    try:
+        sanitized = await sanitize_links(raw, get_client("worker"))
+        status = STATUS_DONE
+    except Exception as e:
+        print(f"Link sanitation error for product {product_id}: {e}")
+        sanitized, status = None, STATUS_FAILED
+
+    with SessionLocal() as db:
+        product = db.get(Product, product_id)
+        if product is None or product.sanitization_status != STATUS_PENDING or product.raw_product_url != raw:
+            return False
+        if sanitized is not None:
+            product.product_url = format_links(sanitized)
+            product.links = product_link_rows(sanitized)
+        product.sanitization_status = status
+        product.raw_product_url = None
+        refresh_bundle_read_models(db, invalidate_bundles_for_product(db, product_id))
+        bump_feed_version(db, product.feed)
+        db.commit()
+    return True
+
+
+async def start() -> None:
+    """Start the worker and re-queue products left pending by a previous run."""
+    with SessionLocal() as db:
+        pending = db.execute(
+            select(Product.id).where(Product.sanitization_status == STATUS_PENDING)
+        ).scalars().all()
+    queue = _ensure_worker()
+    for product_id in pending:
+        queue.put_nowait(product_id)
+    if pending:
+        print(f"Link worker: re-queued {len(pending)} pending product(s)")
+
+
+async def drain() -> None:
+    """Wait until every queued product has been processed."""
+    if _worker is not None and _worker[0] is asyncio.get_running_loop():
+        await _worker[1].join()
+
+
+async def stop() -> None:
+    """Cancel the worker tasks (pending rows are picked up again by the next start())."""
+    global _worker
+    if _worker is None:
+        return
+    owner, _queue, tasks = _worker
+    _worker = None
+    if owner is not asyncio.get_running_loop():
+        return
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
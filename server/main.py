@@ -8,7 +8,14 @@ import os
 import shutil
 
 from config import settings
-from database import create_tables, ensure_products_feed_column, ensure_bundles_feed_column, ensure_feed_settings_backfill
+from database import SessionLocal, create_tables, ensure_products_feed_column, ensure_bundles_feed_column, ensure_feed_settings_backfill, ensure_bundle_products_cascade, ensure_products_sanitization_columns, ensure_feed_settings_version_column, ensure_product_links_health_columns
+from utils import backfill_bundle_read_models, backfill_product_links
+import feed_jobs
+import http_clients
+import idempotency
+import link_checker
+import link_worker
+import migration_jobs
 from routers import auth, admin_products, admin_bundles, public, admin_settings, admin_debug, api_feed
 
 # Create FastAPI app
@@ -160,8 +167,80 @@ async def startup_event():
     ensure_products_feed_column()
     ensure_bundles_feed_column()
     ensure_feed_settings_backfill()
+    ensure_bundle_products_cascade()
+    ensure_products_sanitization_columns()
+    ensure_feed_settings_version_column()
+    ensure_product_links_health_columns()
     print("Database tables created successfully")
 
+    # Structured product_links rows for products saved before the table existed
+    try:
+        db = SessionLocal()
+        try:
+            count = backfill_product_links(db)
+            if count:
+                print(f"Backfill: Created product_links for {count} product(s)")
+        finally:
+            db.close()
+    except Exception as e:
+        print(f"Product links backfill failed: {e}")
+
+    # Materialize public bundle JSON for bundles created before the read model existed
+    try:
+        db = SessionLocal()
+        try:
+            count = backfill_bundle_read_models(db)
+            if count:
+                print(f"Backfill: Materialized {count} bundle read model(s)")
+        finally:
+            db.close()
+    except Exception as e:
+        print(f"Bundle read model backfill failed: {e}")
+
+    # Forget Idempotency-Keys past their TTL
+    try:
+        count = idempotency.prune_expired()
+        if count:
+            print(f"Pruned {count} expired idempotency key(s)")
+    except Exception as e:
+        print(f"Idempotency key pruning failed: {e}")
+
+    # Shared outbound HTTP clients (connection pools live for the app lifetime)
+    await http_clients.start()
+
+    # Background link sanitation (resumes products left pending by a previous run)
+    try:
+        await link_worker.start()
+    except Exception as e:
+        print(f"Link worker start failed: {e}")
+
+    # Asynchronous feed item jobs (re-queues jobs left unfinished by a previous run)
+    try:
+        await feed_jobs.start()
+    except Exception as e:
+        print(f"Feed item jobs start failed: {e}")
+
+    # Resume link migrations interrupted by a restart (from their last committed batch)
+    try:
+        await migration_jobs.start()
+    except Exception as e:
+        print(f"Link migration resume failed: {e}")
+
+    # Rolling health checks of published product links
+    try:
+        await link_checker.start()
+    except Exception as e:
+        print(f"Link checker start failed: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background jobs and close shared outbound HTTP clients"""
+    await link_checker.stop()
+    await migration_jobs.stop()
+    await feed_jobs.stop()
+    await link_worker.stop()
+    await http_clients.close_all()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,259 @@
+"""
+Resumable background link migration.
+
+POST /api/admin/debug/migrate-links starts a job instead of sanitizing every
+product inside one request. The job walks products in primary-key order,
+`batch_size` at a time (keyset pagination, so memory stays bounded however
+many products there are), sanitizes each batch with at most
+`migration_concurrency` products in flight, and commits the batch's product
+updates (product_url and product_links), bundle read models and the job
+checkpoint (MigrationJob.last_id) in one transaction. Work done before a crash or restart is kept; start() resumes
+jobs still marked running from their checkpoint.
+
+Only one link migration runs at a time. Progress and ETA are read from the
+MigrationJob row (status()), so they survive restarts too.
+"""
+from datetime import datetime, timezone
+import asyncio
+import time
+
+from sqlalchemy import func, select, update
+
+from config import settings
+from database import SessionLocal
+from http_clients import get_client
+from link_worker import STATUS_PENDING
+from models import MigrationJob, Product
+from utils import (
+    bump_feed_version,
+    format_links,
+    invalidate_bundles_for_product,
+    refresh_bundle_read_models,
+    replace_product_links,
+    sanitize_links,
+)
+
+KIND_MIGRATE_LINKS = "migrate_links"
+
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# job id -> (event loop, task) of the jobs running in this process
+_tasks: dict[str, tuple[asyncio.AbstractEventLoop, asyncio.Task]] = {}
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def status(job: MigrationJob) -> dict:
+    """Public view of a job: counters, progress and an ETA from the batch rate so far."""
+    remaining = max(0, (job.total or 0) - (job.scanned or 0))
+    rate = (job.scanned / job.elapsed_seconds) if job.scanned and job.elapsed_seconds else None
+    eta = round(remaining / rate, 1) if rate and job.status == RUNNING else None
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "batch_size": job.batch_size,
+        "total": job.total,
+        "scanned": job.scanned,
+        "updated": job.updated,
+        "failed": job.failed,
+        "progress": round(min(1.0, job.scanned / job.total), 4) if job.total else (1.0 if job.status == DONE else 0.0),
+        "products_per_second": round(rate, 2) if rate else None,
+        "eta_seconds": eta,
+        "last_id": job.last_id,
+        "error": job.error,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+        "finished_at": job.finished_at,
+    }
+
+
+def _spawn(job_id: str) -> None:
+    loop = asyncio.get_running_loop()
+    entry = _tasks.get(job_id)
+    if entry is not None and entry[0] is loop and not entry[1].done():
+        return
+    task = loop.create_task(run_job(job_id))
+    _tasks[job_id] = (loop, task)
+
+    def _forget(t: asyncio.Task) -> None:
+        if job_id in _tasks and _tasks[job_id][1] is t:
+            del _tasks[job_id]
+
+    task.add_done_callback(_forget)
+
+
+async def start_job(batch_size: int | None = None) -> MigrationJob:
+    """Start a link migration, or return the one already running."""
+    with SessionLocal() as db:
+        job = db.execute(
+            select(MigrationJob)
+            .where(MigrationJob.kind == KIND_MIGRATE_LINKS, MigrationJob.status == RUNNING)
+            .order_by(MigrationJob.created_at.desc())
+        ).scalars().first()
+        if job is None:
+            job = MigrationJob(
+                kind=KIND_MIGRATE_LINKS,
+                status=RUNNING,
+                batch_size=max(1, batch_size or settings.migration_batch_size),
+                total=db.execute(select(func.count(Product.id))).scalar_one(),
+                scanned=0,
+                updated=0,
+                failed=0,
+                elapsed_seconds=0.0,
+            )
+            db.add(job)
+            db.commit()
+        db.refresh(job)
+        db.expunge(job)
+    _spawn(job.id)
+    return job
+
+
+def get_job(job_id: str | None = None) -> MigrationJob | None:
+    """A job by id, or the most recent link migration."""
+    with SessionLocal() as db:
+        if job_id:
+            job = db.get(MigrationJob, job_id)
+        else:
+            job = db.execute(
+                select(MigrationJob)
+                .where(MigrationJob.kind == KIND_MIGRATE_LINKS)
+                .order_by(MigrationJob.created_at.desc())
+            ).scalars().first()
+        if job is not None:
+            db.expunge(job)
+        return job
+
+
+def cancel_job(job_id: str) -> MigrationJob | None:
+    """Mark a running job cancelled; it stops before its next batch is applied."""
+    with SessionLocal() as db:
+        job = db.get(MigrationJob, job_id)
+        if job is None:
+            return None
+        if job.status == RUNNING:
+            job.status = CANCELLED
+            job.finished_at = _utcnow()
+            db.commit()
+            db.refresh(job)
+        db.expunge(job)
+        return job
+
+
+async def _sanitize_batch(rows, client) -> list[tuple[list | None, bool]]:
+    """(sanitized links or None on failure, failed) per row; order matches rows."""
+    sem = asyncio.Semaphore(max(1, settings.migration_concurrency))
+
+    async def one(row):
+        try:
+            async with sem:
+                return await sanitize_links(row.product_url or "", client), False
+        except Exception:
+            return None, True
+
+    return await asyncio.gather(*(one(row) for row in rows))
+
+
+async def run_job(job_id: str) -> None:
+    """Process batches from the job's checkpoint until done, cancelled or failed."""
+    client = get_client("migrator")
+    try:
+        while True:
+            with SessionLocal() as db:
+                job = db.get(MigrationJob, job_id)
+                if job is None or job.status != RUNNING:
+                    return
+                after, batch_size = job.last_id, job.batch_size
+                query = select(Product.id, Product.product_url, Product.feed, Product.sanitization_status)
+                if after is not None:
+                    query = query.where(Product.id > after)
+                rows = db.execute(query.order_by(Product.id).limit(batch_size)).all()
+                if not rows:
+                    job.status = DONE
+                    job.finished_at = _utcnow()
+                    db.commit()
+                    print(f"Link migration {job_id}: done, scanned={job.scanned} updated={job.updated} failed={job.failed}")
+                    return
+
+            started = time.perf_counter()
+            # Products still waiting for the background sanitizer are left to it
+            todo = [row for row in rows if row.sanitization_status != STATUS_PENDING]
+            results = await _sanitize_batch(todo, client)
+
+            with SessionLocal() as db:
+                job = db.get(MigrationJob, job_id)
+                if job is None or job.status != RUNNING:
+                    return  # cancelled while the batch was in flight
+                updated = 0
+                rewritten: list[str] = []
+                feeds: set[str | None] = set()
+                for row, (links, _) in zip(todo, results):
+                    if not links:
+                        continue
+                    sanitized = format_links(links)
+                    # Skip products edited since the batch was read
+                    guarded = (
+                        update(Product)
+                        .where(Product.id == row.id, Product.product_url == row.product_url)
+                        .values(product_url=sanitized)
+                    )
+                    if not db.execute(guarded).rowcount:
+                        continue
+                    # Rewritten even when the text is unchanged, to record original URLs and last_checked
+                    replace_product_links(db, row.id, links)
+                    rewritten.append(row.id)
+                    if sanitized != row.product_url:
+                        updated += 1
+                        feeds.add(row.feed)
+                if rewritten:
+                    bundle_ids: set[str] = set()
+                    for product_id in rewritten:
+                        bundle_ids.update(invalidate_bundles_for_product(db, product_id))
+                    refresh_bundle_read_models(db, bundle_ids)
+                    for feed in feeds:
+                        bump_feed_version(db, feed)
+                job.last_id = rows[-1].id
+                job.scanned += len(rows)
+                job.updated += updated
+                job.failed += sum(1 for _, failed in results if failed)
+                job.elapsed_seconds += time.perf_counter() - started
+                db.commit()
+    except asyncio.CancelledError:
+        raise  # shutdown: the job stays running and resumes from its checkpoint
+    except Exception as e:
+        print(f"Link migration {job_id} failed: {e}")
+        with SessionLocal() as db:
+            job = db.get(MigrationJob, job_id)
+            if job is not None and job.status == RUNNING:
+                job.status = FAILED
+                job.error = f"{type(e).__name__}: {e}"
+                job.finished_at = _utcnow()
+                db.commit()
+
+
+async def start() -> None:
+    """Resume link migrations left running by a previous process."""
+    with SessionLocal() as db:
+        running = db.execute(
+            select(MigrationJob.id).where(MigrationJob.status == RUNNING)
+        ).scalars().all()
+    for job_id in running:
+        _spawn(job_id)
+    if running:
+        print(f"Link migration: resuming {len(running)} job(s)")
+
+
+async def stop() -> None:
+    """Cancel this process's job tasks; their checkpoints stay for the next start()."""
+    loop = asyncio.get_running_loop()
+    tasks = [task for owner, task in _tasks.values() if owner is loop]
+    _tasks.clear()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -1,17 +1,19 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Table
+from sqlalchemy import Column, Integer, Float, String, Boolean, DateTime, Text, ForeignKey, Table
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, backref
 import uuid
 
 Base = declarative_base()
 
-# Association table for bundles and products
+# Association table for bundles and products.
+# The PK covers lookups by bundle_id; product_id gets its own index for reverse lookups.
+# Rows are removed by the database when either side is deleted (ON DELETE CASCADE).
 bundle_products = Table(
     'bundle_products',
     Base.metadata,
-    Column('bundle_id', String, ForeignKey('bundles.id'), primary_key=True),
-    Column('product_id', String, ForeignKey('products.id'), primary_key=True)
+    Column('bundle_id', String, ForeignKey('bundles.id', ondelete='CASCADE'), primary_key=True),
+    Column('product_id', String, ForeignKey('products.id', ondelete='CASCADE'), primary_key=True, index=True)
 )
 
 class Product(Base):
@@ -26,9 +28,55 @@ class Product(Base):
     is_published = Column(Boolean, default=False)
     # Optional feed key for future multi-feed support (currently single Eve feed)
     feed = Column(String, index=True, nullable=True)
+    # Background link sanitation (settings.link_sanitize_async): "pending" while
+    # product_url holds raw links with inferred labels, then "done" or "failed".
+    # NULL when links were sanitized inline.
+    sanitization_status = Column(String, index=True, nullable=True)
+    # Raw product_url input waiting for the background sanitizer (see link_worker.py)
+    raw_product_url = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    # Structured copy of product_url, one row per link (rewritten whenever product_url is)
+    links = relationship(
+        "ProductLink",
+        order_by="ProductLink.position",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+class ProductLink(Base):
+    """
+    One buy link of a product, in display order. product_url keeps the same links
+    as "Label | URL" text (what admins edit); these rows are what readers use.
+    Indexed by host and resolved URL to find the products linking to a site.
+    """
+    __tablename__ = "product_links"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    product_id = Column(String, ForeignKey('products.id', ondelete='CASCADE'), nullable=False, index=True)
+    position = Column(Integer, nullable=False)
+    label = Column(Text, nullable=False)
+    # As entered (e.g. a Channel 3 link) and after resolution
+    original_url = Column(Text, nullable=False)
+    resolved_url = Column(Text, nullable=False, index=True)
+    # Lowercase hostname of resolved_url
+    host = Column(String, index=True)
+    # When the link was last resolved/titled or health-checked over the network;
+    # NULL if only inferred offline. The link checker visits the oldest first.
+    last_checked = Column(DateTime(timezone=True), nullable=True, index=True)
+    # Link health (link_checker.py): "ok", "redirected" or "dead"; NULL until first checked
+    check_status = Column(String, nullable=True, index=True)
+    http_status = Column(Integer, nullable=True)
+    # Where resolved_url now lands, if it redirects elsewhere
+    redirect_url = Column(Text, nullable=True)
+    # Validators for conditional re-checks
+    etag = Column(Text, nullable=True)
+    last_modified = Column(Text, nullable=True)
+    # Consecutive failed checks (timeouts, 5xx, ...); the link is marked dead after
+    # settings.link_check_dead_after of them
+    check_failures = Column(Integer, nullable=False, default=0, server_default="0")
+
 class Bundle(Base):
     __tablename__ = "bundles"
     
@@ -42,8 +90,63 @@ class Bundle(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
-    # Many-to-many relationship with products
-    products = relationship("Product", secondary=bundle_products, backref="bundles")
+    # Many-to-many relationship with products (association rows cascade in the DB)
+    products = relationship(
+        "Product",
+        secondary=bundle_products,
+        backref=backref("bundles", passive_deletes=True),
+        passive_deletes=True,
+    )
+
+class BundleReadModel(Base):
+    """
+    Denormalized read model: the fully rendered public JSON of a published bundle.
+    Rewritten in the same transaction as any change to the bundle or its products
+    (see utils.refresh_bundle_read_models), so public reads are a single PK lookup.
+    """
+    __tablename__ = "bundle_read_models"
+
+    slug = Column(String, primary_key=True)
+    bundle_id = Column(String, ForeignKey('bundles.id', ondelete='CASCADE'), unique=True, nullable=False)
+    feed = Column(String, nullable=True)
+    product_count = Column(Integer, nullable=False, default=0)
+    # schemas.Bundle rendered to JSON text
+    payload = Column(Text, nullable=False)
+    # Copy of bundles.created_at so feed listings can be ordered without a join
+    bundle_created_at = Column(DateTime(timezone=True), index=True)
+    refreshed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class LinkCacheEntry(Base):
+    """Shared cache of outbound link results (see link_cache.py)."""
+    __tablename__ = "link_cache"
+
+    # Normalized input URL (link_cache.normalize_cache_key)
+    url = Column(Text, primary_key=True)
+    # "resolve" (Channel 3 unwrapping) or "title" (page title fetch)
+    kind = Column(String, primary_key=True)
+    final_url = Column(Text)
+    title = Column(Text)
+    # "ok", "empty" (fetched, nothing usable) or "error"; non-ok rows use the negative TTL
+    status = Column(String, nullable=False, default="ok")
+    fetched_at = Column(DateTime(timezone=True), nullable=False)
+
+class HttpCacheEntry(Base):
+    """Validators and parsed <head> metadata of fetched pages, for conditional refetches (see http_cache.py)."""
+    __tablename__ = "http_cache"
+
+    # Requested URL (url_canon.canonicalize)
+    url = Column(Text, primary_key=True)
+    # Where the request ended up after redirects
+    final_url = Column(Text)
+    status_code = Column(Integer, nullable=False)
+    content_type = Column(String)
+    etag = Column(Text)
+    last_modified = Column(Text)
+    # Cleaned page title (og:title > <title>); NULL if the page had no usable one
+    title = Column(Text)
+    fetched_at = Column(DateTime(timezone=True), nullable=False)
+    # End of the freshness lifetime from Cache-Control max-age / Expires
+    expires_at = Column(DateTime(timezone=True), nullable=False)
 
 class Settings(Base):
     __tablename__ = "settings"
@@ -59,3 +162,65 @@ class FeedSettings(Base):
     # Feed key e.g. "default" (single Eve feed, reserved for future expansion)
     feed = Column(String, primary_key=True)
     avatar_url = Column(Text)
+    # Incremented when feed content changes after the write that produced it
+    # (background link sanitation), so clients know to refetch
+    version = Column(Integer, nullable=False, default=0, server_default="0")
+
+class MigrationJob(Base):
+    """Progress and checkpoint of a resumable background job (see migration_jobs.py)."""
+    __tablename__ = "migration_jobs"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    # What the job does, e.g. "migrate_links"
+    kind = Column(String, nullable=False, index=True)
+    # "running", "done", "failed" or "cancelled"; running jobs are resumed on startup
+    status = Column(String, nullable=False, index=True)
+    batch_size = Column(Integer, nullable=False)
+    # Keyset checkpoint: every product with id <= last_id has been processed
+    last_id = Column(String, nullable=True)
+    # Products present when the job started (for progress/ETA)
+    total = Column(Integer, nullable=False, default=0)
+    scanned = Column(Integer, nullable=False, default=0)
+    updated = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    # Time spent processing batches, summed across restarts
+    elapsed_seconds = Column(Float, nullable=False, default=0.0)
+    error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+class IdempotencyKey(Base):
+    """A client-supplied Idempotency-Key and the response it produced (see idempotency.py)."""
+    __tablename__ = "idempotency_keys"
+
+    # Endpoint the key belongs to, e.g. "feed_items"
+    scope = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    # SHA-256 of the canonical request payload; a key reused with another payload is rejected
+    fingerprint = Column(String, nullable=False)
+    # "in_progress" while the first request runs, then "completed"
+    status = Column(String, nullable=False)
+    status_code = Column(Integer, nullable=True)
+    # JSON response body replayed for retries
+    response = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+
+class FeedItemJob(Base):
+    """A feed item accepted for asynchronous creation (see feed_jobs.py)."""
+    __tablename__ = "feed_item_jobs"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    # "queued", "running", "done" or "failed"; queued/running jobs are re-queued on startup
+    status = Column(String, nullable=False, index=True)
+    # Validated FeedItemCreate body, as JSON
+    payload = Column(Text, nullable=False)
+    # Set once done: the created bundle and its public page
+    item_id = Column(String, nullable=True)
+    public_url = Column(String, nullable=True)
+    error = Column(Text)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
@@ -3,9 +3,9 @@ from sqlalchemy.orm import Session
 from typing import List
 from database import get_db
 from deps import require_auth
-from models import Bundle, Product
-from schemas import BundleCreate, BundleUpdate, Bundle as BundleSchema
-from utils import create_slug
+from models import Bundle
+from schemas import BundleCreate, BundleUpdate, BundleMembershipUpdate, Bundle as BundleSchema
+from utils import generate_slug, commit_with_slug_retry, set_bundle_products, update_bundle_membership, refresh_bundle_read_models
 
 router = APIRouter(prefix="/admin/bundles", tags=["admin"])
 
@@ -24,26 +24,21 @@ async def create_bundle(
     user = Depends(require_auth)
 ):
     """Create a new bundle (admin only)"""
-    slug = create_slug(db, Bundle, bundle_data.title)
+    def build():
+        bundle = Bundle(
+            slug=generate_slug(),
+            title=bundle_data.title,
+            description=bundle_data.description,
+            is_published=bundle_data.is_published,
+            feed=bundle_data.feed
+        )
+        db.add(bundle)
+        # Attach products with one IN lookup + bulk insert of association rows
+        set_bundle_products(db, bundle, bundle_data.product_ids)
+        refresh_bundle_read_models(db, [bundle.id])
+        return bundle
     
-    # Get products for the bundle
-    products = []
-    for product_id in bundle_data.product_ids:
-        product = db.query(Product).filter(Product.id == product_id).first()
-        if product:
-            products.append(product)
-    
-    bundle = Bundle(
-        slug=slug,
-        title=bundle_data.title,
-        description=bundle_data.description,
-        is_published=bundle_data.is_published,
-        feed=bundle_data.feed,
-        products=products
-    )
-    
-    db.add(bundle)
-    db.commit()
+    bundle = commit_with_slug_retry(db, build)
     db.refresh(bundle)
     return bundle
 
@@ -75,14 +70,30 @@ async def update_bundle(
     for field, value in bundle_data.dict(exclude_unset=True, exclude={"product_ids"}).items():
         setattr(bundle, field, value)
     
-    # Update products if provided
+    # Update products if provided (only changed association rows are written)
     if bundle_data.product_ids is not None:
-        products = []
-        for product_id in bundle_data.product_ids:
-            product = db.query(Product).filter(Product.id == product_id).first()
-            if product:
-                products.append(product)
-        bundle.products = products
+        set_bundle_products(db, bundle, bundle_data.product_ids)
+    refresh_bundle_read_models(db, [bundle.id])
+    
+    db.commit()
+    db.refresh(bundle)
+    return bundle
+
+@router.patch("/{bundle_id}/products", response_model=BundleSchema)
+async def patch_bundle_products(
+    bundle_id: str,
+    membership: BundleMembershipUpdate,
+    db: Session = Depends(get_db),
+    user = Depends(require_auth)
+):
+    """Add and/or remove products from a bundle without resending the full list (admin only)"""
+    bundle = db.query(Bundle).filter(Bundle.id == bundle_id).first()
+    if not bundle:
+        raise HTTPException(status_code=404, detail="Bundle not found")
+    
+    added, removed = update_bundle_membership(db, bundle, add=membership.add, remove=membership.remove)
+    if added or removed:
+        refresh_bundle_read_models(db, [bundle.id])
     
     db.commit()
     db.refresh(bundle)
@@ -99,6 +110,7 @@ async def delete_bundle(
     if not bundle:
         raise HTTPException(status_code=404, detail="Bundle not found")
     
+    # Membership and read model rows are removed by ON DELETE CASCADE
     db.delete(bundle)
     db.commit()
     return {"success": True, "message": "Bundle deleted"}
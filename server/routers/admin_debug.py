@@ -1,16 +1,23 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 import os
 import time
 import urllib.parse
-import httpx
-import re
 from database import get_db
 from deps import require_auth
 from config import settings
 from models import Product
 from schemas import ResolveUrlsRequest, ResolveUrlsResponse
-from utils import sanitize_multiline_urls, resolve_channel3_if_needed
+from http_clients import get_client
+import bulkheads
+import host_health
+import http_cache
+import link_batch
+import link_checker
+import link_rules
+import migration_jobs
+from utils import resolve_channel3_if_needed, fetch_title
 
 
 router = APIRouter(prefix="/admin/debug", tags=["admin"])
@@ -82,7 +89,7 @@ async def resolve_urls(
     Resolve Channel 3 short links to their final destination URLs.
 
     - Resolves only known Channel3 hosts: buy.trychannel3.com, *.trychannel3.com, channel3.link, ch3.link
-    - Follows redirects (HEAD then GET fallback), with short timeouts
+    - Follows redirects (single streamed GET), with short timeouts
     - Preserves input order and length
     - Caps processing to 10 URLs
     - Never returns localhost in production (guarded in utils.resolve_channel3_if_needed)
@@ -90,64 +97,40 @@ async def resolve_urls(
     urls = list(payload.urls or [])[:10]
     resolved: list[str] = []
 
-    timeout = httpx.Timeout(3.0, connect=3.0, read=3.0, write=3.0)
-    headers = {
-        "User-Agent": "Channel3-LinkResolver/1.0 (+https://trychannel3.com)"
-    }
+    client = get_client("resolver")
+    for u in urls:
+        try:
+            parsed = urllib.parse.urlparse(u)
+            host = (parsed.hostname or "").lower()
+            is_ch3 = (
+                host == "buy.trychannel3.com" or
+                host.endswith(".trychannel3.com") or
+                host == "channel3.link" or
+                host == "ch3.link"
+            )
+            if not is_ch3:
+                # Not a Channel 3 URL, pass through unchanged
+                resolved.append(u)
+                continue
 
-    async with httpx.AsyncClient(follow_redirects=True, timeout=timeout, headers=headers) as client:
-        for u in urls:
+            # Use centralized resolver with safety guards (never returns localhost in prod)
             try:
-                parsed = urllib.parse.urlparse(u)
-                host = (parsed.hostname or "").lower()
-                is_ch3 = (
-                    host == "buy.trychannel3.com" or
-                    host.endswith(".trychannel3.com") or
-                    host == "channel3.link" or
-                    host == "ch3.link"
-                )
-                if not is_ch3:
-                    # Not a Channel 3 URL, pass through unchanged
-                    resolved.append(u)
-                    continue
-
-                # Use centralized resolver with safety guards (never returns localhost in prod)
-                try:
-                    final_url = await resolve_channel3_if_needed(u, client)
-                except Exception:
-                    final_url = u
-
-                if isinstance(final_url, str) and (final_url.startswith("http://") or final_url.startswith("https://")):
-                    resolved.append(final_url)
-                else:
-                    resolved.append(u)
+                final_url = await resolve_channel3_if_needed(u, client)
             except Exception:
+                final_url = u
+
+            if isinstance(final_url, str) and (final_url.startswith("http://") or final_url.startswith("https://")):
+                resolved.append(final_url)
+            else:
                 resolved.append(u)
+        except Exception:
+            resolved.append(u)
 
     return ResolveUrlsResponse(resolved=resolved)
 
 
 # ---------------------------- Fetch Page Titles ---------------------------- #
 
-_TITLE_RE = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
-_OG_TITLE_RE = re.compile(
-    r'<meta[^>]+property=["\']og:title["\'][^>]+content=["\'](.*?)["\']',
-    re.IGNORECASE | re.DOTALL,
-)
-
-def _extract_title(html: str) -> str | None:
-    if not html:
-        return None
-    # Prefer og:title if present
-    m = _OG_TITLE_RE.search(html)
-    if m:
-        return m.group(1).strip()
-    # Fallback to <title>
-    m = _TITLE_RE.search(html)
-    if m:
-        return m.group(1).strip()
-    return None
-
 @router.post("/fetch-titles")
 async def fetch_titles(
     payload: ResolveUrlsRequest,  # reuse same shape: { urls: [...] }
@@ -156,81 +139,169 @@ async def fetch_titles(
     """
     Fetch page titles for a batch of URLs.
     - Input capped to 10
-    - http(s) only; follows redirects; short timeouts
+    - http(s) only; follows redirects; short timeouts; cached via link_cache
     - Returns aligned list of titles (string or null) in { titles: [...] }
     """
     urls = list(payload.urls or [])[:10]
-    timeout = httpx.Timeout(3.0, connect=3.0, read=3.0, write=3.0)
-    headers = {
-        "User-Agent": "Channel3-TitleFetcher/1.0 (+https://trychannel3.com)"
-    }
-
     titles: list[str | None] = []
 
-    async with httpx.AsyncClient(follow_redirects=True, timeout=timeout, headers=headers) as client:
-        for u in urls:
-            title: str | None = None
-            try:
-                parsed = urllib.parse.urlparse(u)
-                if parsed.scheme not in ("http", "https"):
-                    titles.append(None)
-                    continue
-
-                # GET final content
-                resp = await client.get(u)
-                content_type = resp.headers.get("content-type", "").lower()
-                if "text/html" in content_type:
-                    text = resp.text
-                    title = _extract_title(text)
-            except Exception:
-                title = None
-            titles.append(title)
+    client = get_client("title_fetcher")
+    for u in urls:
+        # Shared fetcher: reads through the link cache, cleans and unescapes titles
+        titles.append(await fetch_title(u, client))
 
     return {"titles": titles}
 
 
-@router.post("/migrate-links")
+@router.post("/resolve-urls/stream")
+async def resolve_urls_stream(
+    payload: ResolveUrlsRequest,
+    user = Depends(require_auth)
+):
+    """
+    Resolve and title a batch of URLs concurrently, streaming NDJSON lines as each finishes.
+    - Up to settings.link_batch_max_urls URLs (422 beyond that)
+    - Every link is resolved like the sanitizer does and titled (manual labels are the caller's job)
+    - One {index, url, final_url, title, ms, error} line per URL, then {done, count, ms}
+    """
+    try:
+        urls = link_batch.batch_urls(payload.urls)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return StreamingResponse(
+        link_batch.ndjson_lines(urls, get_client("resolver"), titles_for_all=True),
+        media_type=link_batch.MEDIA_TYPE,
+    )
+
+
+@router.post("/migrate-links", status_code=202)
 async def migrate_links(
-    db: Session = Depends(get_db),
+    batch_size: int | None = None,
     user = Depends(require_auth)
 ):
     """
-    Admin-only: migrate existing products to:
+    Admin-only: start a background job that migrates existing products to:
       - Resolve Channel3 links to final destinations
       - Ensure each line is in 'Label | URL' format (label = manual > title > inferred)
-    Returns a summary of scanned/updated counts.
+    Products are processed in primary-key batches, each committed with a
+    checkpoint, so the job survives timeouts and restarts (see migration_jobs.py).
+    Returns the job status; if a migration is already running, that job is returned.
+    Poll GET /migrate-links/status for progress and ETA.
     """
-    import asyncio
+    job = await migration_jobs.start_job(batch_size)
+    return migration_jobs.status(job)
 
-    products = db.query(Product).all()
-    
-    timeout = httpx.Timeout(5.0, connect=3.0, read=3.0, write=3.0)
-    headers = {"User-Agent": "Channel3-Migrator/1.0 (+https://trychannel3.com)"}
 
-    # Concurrency limit to avoid overwhelming external servers or our own
-    sem = asyncio.Semaphore(10)
-    
-    async def process_product(p, client):
-        original = p.product_url or ""
-        try:
-            async with sem:
-                sanitized = await sanitize_multiline_urls(original, client)
-        except Exception:
-            sanitized = original
-            
-        if sanitized and sanitized != original:
-            p.product_url = sanitized
-            return 1 # updated
-        return 0 # not updated
+@router.get("/migrate-links/status")
+async def migrate_links_status(
+    user = Depends(require_auth)
+):
+    """Progress, rate and ETA of the most recent link migration."""
+    job = migration_jobs.get_job()
+    if job is None:
+        raise HTTPException(status_code=404, detail="No link migration has been started")
+    return migration_jobs.status(job)
 
-    async with httpx.AsyncClient(follow_redirects=True, timeout=timeout, headers=headers) as client:
-        tasks = [process_product(p, client) for p in products]
-        results = await asyncio.gather(*tasks)
 
-    scanned = len(products)
-    updated = sum(results)
+@router.get("/migrate-links/{job_id}")
+async def migrate_links_job(
+    job_id: str,
+    user = Depends(require_auth)
+):
+    job = migration_jobs.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Migration job not found")
+    return migration_jobs.status(job)
 
-    if updated:
-        db.commit()
 
-    return {"scanned": scanned, "updated": updated}
+@router.post("/migrate-links/{job_id}/cancel")
+async def cancel_migrate_links(
+    job_id: str,
+    user = Depends(require_auth)
+):
+    """Stop a running migration after its current batch (already committed batches are kept)."""
+    job = migration_jobs.cancel_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Migration job not found")
+    return migration_jobs.status(job)
+
+
+# ---------------------------- Link health checks ---------------------------- #
+
+@router.get("/link-health")
+async def link_health(
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    user = Depends(require_auth)
+):
+    """
+    Scheduled link checks (see link_checker.py): schedule and per-tick quota,
+    published links by status (ok / redirected / dead / unchecked), checker
+    counters and up to `limit` dead or redirected links with their products.
+    """
+    return link_checker.summary(db, problems_limit=max(0, min(limit, 1000)))
+
+
+@router.post("/link-health/check")
+async def link_health_check(
+    limit: int | None = None,
+    user = Depends(require_auth)
+):
+    """Run one check tick now: the next `limit` due links (default: the scheduled per-tick quota)."""
+    return await link_checker.run_tick(None if limit is None else max(0, min(limit, 1000)))
+
+
+# ---------------------------- Outbound host health ---------------------------- #
+
+@router.get("/host-health")
+async def host_health_status(
+    user = Depends(require_auth)
+):
+    """
+    Per-host state of outbound fetches (see host_health.py): circuit state,
+    in-flight requests, remaining backoff and request/failure/rejection counters.
+    """
+    return {
+        "per_host_concurrency": settings.outbound_per_host_concurrency,
+        "failure_threshold": settings.host_failure_threshold,
+        "circuit_open_seconds": settings.host_circuit_open_seconds,
+        "hosts": host_health.registry.snapshot(),
+    }
+
+
+@router.get("/bulkheads")
+async def bulkhead_status(
+    user = Depends(require_auth)
+):
+    """
+    Outbound fetch pools (see bulkheads.py): limits, requests in flight and
+    queued, admitted/rejected counts and queue wait times (mean, p50, p99, max).
+    """
+    return {"pools": bulkheads.snapshot()}
+
+
+@router.get("/http-cache")
+async def http_cache_stats(
+    user = Depends(require_auth)
+):
+    """
+    Conditional page cache counters since process start (see http_cache.py):
+    pages served while fresh, revalidated with a 304, fetched in full, and entries stored.
+    """
+    return {
+        "enabled": settings.http_cache_enabled,
+        "max_age_seconds": settings.http_cache_max_age_seconds,
+        **http_cache.stats,
+    }
+
+
+@router.get("/resolver-stats")
+async def resolver_stats(
+    user = Depends(require_auth)
+):
+    """
+    Offline link rule usage since process start (see link_rules.py): Channel 3
+    lookups, how many were decoded locally, per-rule hits/hit rate, and how many
+    still needed the HTTP resolver.
+    """
+    return link_rules.stats()
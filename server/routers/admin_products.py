@@ -1,23 +1,42 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy import or_
+from sqlalchemy.orm import Session, selectinload
+from typing import List, Optional
 from database import get_db
 from deps import require_auth
-from models import Product
-from schemas import ProductCreate, ProductUpdate, Product as ProductSchema
-from utils import create_slug, sanitize_multiline_urls
-import httpx
+from models import Product, ProductLink
+from schemas import ProductCreate, ProductUpdate, Product as ProductSchema, BundleSummary
+from http_clients import get_client
+from utils import generate_slug, commit_with_slug_retry, get_bundles_for_product, invalidate_bundles_for_product, refresh_bundle_read_models
+import link_worker
 import json
 
 router = APIRouter(prefix="/admin/products", tags=["admin"])
 
 @router.get("/", response_model=List[ProductSchema])
 async def list_products(
+    host: Optional[str] = None,
+    link_status: Optional[str] = None,
     db: Session = Depends(get_db),
     user = Depends(require_auth)
 ):
-    """Get all products (admin only)"""
-    return db.query(Product).order_by(Product.created_at.desc()).all()
+    """
+    Get all products (admin only).
+    With ?host=example.com, only products linking to that host or its subdomains.
+    With ?link_status=dead (or redirected), only products with such a link (see link_checker.py).
+    """
+    q = db.query(Product).options(selectinload(Product.links))
+    if host:
+        host = host.strip().lower()
+        linking = (
+            db.query(ProductLink.product_id)
+            .filter(or_(ProductLink.host == host, ProductLink.host.like(f"%.{host}")))
+        )
+        q = q.filter(Product.id.in_(linking))
+    if link_status:
+        flagged = db.query(ProductLink.product_id).filter(ProductLink.check_status == link_status.strip().lower())
+        q = q.filter(Product.id.in_(flagged))
+    return q.order_by(Product.created_at.desc()).all()
 
 @router.post("/", response_model=ProductSchema)
 async def create_product(
@@ -26,27 +45,26 @@ async def create_product(
     user = Depends(require_auth)
 ):
     """Create a new product (admin only)"""
-    slug = create_slug(db, Product, product_data.title)
+    # Sanitize incoming product_url lines (resolve Channel 3 + label with titles),
+    # or store inferred labels now and sanitize in the background
+    link_fields = await link_worker.prepare_product_links(product_data.product_url)
     
-    # Sanitize incoming product_url lines (resolve Channel 3 + label with titles)
-    timeout = httpx.Timeout(3.0, connect=3.0, read=3.0, write=3.0)
-    headers = {"User-Agent": "Channel3-LinkSanitizer/1.0 (+https://trychannel3.com)"}
-    async with httpx.AsyncClient(follow_redirects=True, timeout=timeout, headers=headers) as client:
-        sanitized_urls = await sanitize_multiline_urls(product_data.product_url, client)
+    def build():
+        product = Product(
+            slug=generate_slug(),
+            title=product_data.title,
+            description=product_data.description,
+            image_url=product_data.image_url,
+            is_published=product_data.is_published,
+            feed=product_data.feed,
+            **link_fields
+        )
+        db.add(product)
+        return product
     
-    product = Product(
-        slug=slug,
-        title=product_data.title,
-        description=product_data.description,
-        image_url=product_data.image_url,
-        product_url=sanitized_urls,
-        is_published=product_data.is_published,
-        feed=product_data.feed
-    )
-    
-    db.add(product)
-    db.commit()
+    product = commit_with_slug_retry(db, build)
     db.refresh(product)
+    link_worker.enqueue_if_pending(product)
     return product
 
 @router.get("/{product_id}", response_model=ProductSchema)
@@ -75,18 +93,33 @@ async def update_product(
     
     data = product_data.dict(exclude_unset=True)
     if "product_url" in data and data["product_url"] is not None:
-        timeout = httpx.Timeout(3.0, connect=3.0, read=3.0, write=3.0)
-        headers = {"User-Agent": "Channel3-LinkSanitizer/1.0 (+https://trychannel3.com)"}
-        async with httpx.AsyncClient(follow_redirects=True, timeout=timeout, headers=headers) as client:
-            data["product_url"] = await sanitize_multiline_urls(data["product_url"], client)
+        # Also supersedes any background sanitation still pending for the old links
+        data.update(await link_worker.prepare_product_links(data.pop("product_url")))
 
     for field, value in data.items():
         setattr(product, field, value)
     
+    # Only the bundles that contain this product render differently now
+    if data:
+        refresh_bundle_read_models(db, invalidate_bundles_for_product(db, product.id))
+    
     db.commit()
     db.refresh(product)
+    link_worker.enqueue_if_pending(product)
     return product
 
+@router.get("/{product_id}/bundles", response_model=List[BundleSummary])
+async def list_product_bundles(
+    product_id: str,
+    db: Session = Depends(get_db),
+    user = Depends(require_auth)
+):
+    """List bundles containing a product (admin only)"""
+    product = db.query(Product).filter(Product.id == product_id).first()
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return get_bundles_for_product(db, product_id)
+
 @router.delete("/{product_id}")
 async def delete_product(
     product_id: str,
@@ -98,7 +131,10 @@ async def delete_product(
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     
+    # Membership rows are removed by ON DELETE CASCADE; collect the affected bundles first
+    bundle_ids = invalidate_bundles_for_product(db, product.id)
     db.delete(product)
+    refresh_bundle_read_models(db, bundle_ids)
     db.commit()
     return {"success": True, "message": "Product deleted"}
 
@@ -126,26 +162,26 @@ async def generate_details(
 - "description": a short, punchy, and enticing product description suitable for an Instagram-style post. Focus on the key benefit. Keep it under 30 words."""
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent?key={settings.gemini_api_key}",
-                json={
-                    "contents": [{"parts": [{"text": prompt}]}],
-                    "generationConfig": {"response_mime_type": "application/json"}
-                },
-                timeout=10.0
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            # Extract JSON from response
-            text = data["candidates"][0]["content"]["parts"][0]["text"]
-            result = json.loads(text)
-            
-            return {
-                "title": result.get("title", "Curated Product"),
-                "description": result.get("description", "A great addition to your look.")
-            }
+        client = get_client("gemini")
+        response = await client.post(
+            f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent?key={settings.gemini_api_key}",
+            json={
+                "contents": [{"parts": [{"text": prompt}]}],
+                "generationConfig": {"response_mime_type": "application/json"}
+            },
+            timeout=10.0
+        )
+        response.raise_for_status()
+        data = response.json()
+        
+        # Extract JSON from response
+        text = data["candidates"][0]["content"]["parts"][0]["text"]
+        result = json.loads(text)
+        
+        return {
+            "title": result.get("title", "Curated Product"),
+            "description": result.get("description", "A great addition to your look.")
+        }
     except Exception as e:
         print(f"Gemini API error: {e}")
         # Fallback on error
@@ -1,14 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, Header, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Header, status
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Any, Dict, List, Optional
 from database import get_db
 from config import settings
-from models import Product, Bundle
-from schemas import FeedItemCreate, FeedItemResponse
-from utils import create_slug, sanitize_multiline_urls
-import httpx
+from pydantic import ValidationError
+from schemas import FeedItemBatchResponse, FeedItemBatchResult, FeedItemCreate, FeedItemJobStatus, FeedItemResponse
+from utils import commit_with_slug_retry, refresh_bundle_read_models
+import asyncio
+import feed_items
+import feed_jobs
+import idempotency
+import link_worker
 import logging
-from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
@@ -22,82 +26,134 @@ async def verify_api_key(x_eve_api_key: str = Header(...)):
         )
     return x_eve_api_key
 
-@router.post("", response_model=FeedItemResponse)
+IDEMPOTENCY_SCOPE = "feed_items"
+BATCH_IDEMPOTENCY_SCOPE = "feed_items_batch"
+ASYNC_IDEMPOTENCY_SCOPE = "feed_items_async"
+
+async def _run_idempotent(scope: str, key: Optional[str], request_body, run, status_code: int = 200):
+    """
+    Run `run()` (returning a pydantic response, sent with `status_code`) at most
+    once per Idempotency-Key: retries of the same request get the original
+    response back (header Idempotent-Replayed: true) and a retry arriving while
+    the original still runs waits for it (see idempotency.py). Without a key,
+    just run it.
+    """
+    if not key:
+        return _respond(await run(), status_code)
+
+    if len(key) > idempotency.MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail="Idempotency-Key is too long")
+    digest = idempotency.fingerprint(request_body)
+    try:
+        stored = await idempotency.begin(scope, key, digest)
+    except idempotency.IdempotencyKeyReused as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except idempotency.IdempotencyKeyInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e), headers={"Retry-After": "1"})
+    if stored is not None:
+        logger.info(f"Replaying {scope} response for Idempotency-Key {key}")
+        return JSONResponse(content=stored.body, status_code=stored.status_code,
+                            headers={"Idempotent-Replayed": "true"})
+
+    try:
+        response = await run()
+    except BaseException:
+        idempotency.release(scope, key)
+        raise
+    idempotency.complete(scope, key, status_code, response.model_dump(mode="json", by_alias=True))
+    return _respond(response, status_code)
+
+def _respond(response, status_code: int):
+    if status_code == 200:
+        return response
+    # 202 job responses point at the job to poll
+    headers = {"Location": response.status_url} if isinstance(response, FeedItemJobStatus) else None
+    return JSONResponse(content=response.model_dump(mode="json", by_alias=True), status_code=status_code,
+                        headers=headers)
+
+@router.post("", response_model=FeedItemResponse, responses={202: {"model": FeedItemJobStatus}})
 async def create_feed_item(
     payload: FeedItemCreate,
     db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    prefer: Optional[str] = Header(None),
     _ = Depends(verify_api_key)
 ):
     """
     Create a new feed item (bundle of products) directly via API.
     Used by Eve app for automation.
+    With `Prefer: respond-async` (or settings.feed_ingest_async) the item is only
+    validated and queued: 202 with a job to poll at GET /api/feed-items/jobs/{id}
+    (see feed_jobs.py).
+    With an Idempotency-Key header, retries of the same request return the original
+    response instead of creating another item.
     """
+    logger.info(f"POST /api/feed-items hit")
+    body = payload.model_dump(mode="json")
+    if settings.feed_ingest_async or "respond-async" in (prefer or "").lower():
+        return await _run_idempotent(ASYNC_IDEMPOTENCY_SCOPE, idempotency_key, body,
+                                     lambda: _submit_feed_item(payload), status_code=202)
+    return await _run_idempotent(IDEMPOTENCY_SCOPE, idempotency_key, body,
+                                 lambda: _create_feed_item(payload, db))
+
+@router.get("/jobs/{job_id}", response_model=FeedItemJobStatus)
+async def get_feed_item_job(job_id: str, _ = Depends(verify_api_key)):
+    """Status of an asynchronously created feed item; `publicUrl` is set once it is done."""
+    job = feed_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_status(job)
+
+@router.post("/batch", response_model=FeedItemBatchResponse)
+async def create_feed_items_batch(
+    items: List[Dict[str, Any]] = Body(...),
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    _ = Depends(verify_api_key)
+):
+    """
+    Create many feed items at once (e.g. backfilling Eve content).
+    Request body: an array of feed items, each shaped like the POST /api/feed-items
+    body (up to settings.feed_batch_max_items). Items are validated one by one, the
+    links of every item are prepared concurrently, and all valid items are inserted
+    in one transaction. The response has one result per item, in request order;
+    an invalid item fails on its own instead of failing the batch.
+    Idempotency-Key works as for single items.
+    """
+    logger.info(f"POST /api/feed-items/batch hit with {len(items)} item(s)")
+    if not items:
+        raise HTTPException(status_code=422, detail="At least one item is required")
+    if len(items) > settings.feed_batch_max_items:
+        raise HTTPException(status_code=422, detail=f"At most {settings.feed_batch_max_items} items per batch")
+    return await _run_idempotent(BATCH_IDEMPOTENCY_SCOPE, idempotency_key, items,
+                                 lambda: _create_feed_items(items, db))
+
+def _job_status(job) -> FeedItemJobStatus:
+    return FeedItemJobStatus(
+        job_id=job.id,
+        status=job.status,
+        status_url=f"/api/feed-items/jobs/{job.id}",
+        item_id=job.item_id,
+        public_feed_url=job.public_url,
+        error=job.error,
+        created_at=job.created_at,
+        finished_at=job.finished_at,
+    )
+
+async def _submit_feed_item(payload: FeedItemCreate) -> FeedItemJobStatus:
+    # Default title is taken now, when the look was submitted
+    feed_items.apply_defaults(payload)
+    return _job_status(feed_jobs.submit(payload))
+
+async def _create_feed_item(payload: FeedItemCreate, db: Session) -> FeedItemResponse:
     try:
-        # Add request logging as specified
-        logger.info(f"POST /api/feed-items hit")
-        
-        # Generate default title if not provided
-        if payload.title is None:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            payload.title = f"Eve Look - {timestamp}"
-            logger.info(f"Generated default title: {payload.title}")
-        else:
-            logger.info(f"Creating feed item: {payload.title} with {len(payload.links)} links")
-        
-        # 1. Create Products
-        products = []
-        timeout = httpx.Timeout(3.0, connect=3.0, read=3.0, write=3.0)
-        headers = {"User-Agent": "Channel3-LinkSanitizer/1.0 (+https://trychannel3.com)"}
-        
-        async with httpx.AsyncClient(follow_redirects=True, timeout=timeout, headers=headers) as client:
-            # Join all links into a single multiline string
-            raw_links = "\n".join(payload.links)
-            
-            # Sanitize the multiline string (resolves Channel 3 links, fetches titles, etc.)
-            sanitized_urls = await sanitize_multiline_urls(raw_links, client)
-            
-            # Create a SINGLE product containing all links
-            slug = create_slug(db, Product, payload.title)
-            product = Product(
-                slug=slug,
-                title=payload.title,
-                image_url=payload.image_url,
-                product_url=sanitized_urls, # Store all links here
-                is_published=True, # Publish this single card
-                feed=payload.feed
-            )
-            db.add(product)
-            products.append(product)
-        
-        # 2. Create Bundle
-        bundle_slug = create_slug(db, Bundle, payload.title)
-        
-        default_description = "Curated Must‑Have\n\nPopular\nA perfect pick for your look. Stylish, versatile, and ready to wear."
-        final_description = payload.description if payload.description else default_description
-        
-        bundle = Bundle(
-            slug=bundle_slug,
-            title=payload.title,
-            description=final_description,
-            is_published=True,
-            feed=payload.feed,
-            products=products
-        )
-        db.add(bundle)
-        
-        db.commit()
-        db.refresh(bundle)
-        
-        # 3. Return response
-        # Assuming public feed URL format: /public/bundle/{slug}/page
-        # Adjust based on actual frontend routing
-        public_url = f"/public/bundle/{bundle.slug}/page"
+        bundle = await feed_items.create(db, payload)
         
         # Create response using field names (not aliases)
         # With allow_population_by_field_name=True, this should work
         response_data = {
             "item_id": bundle.id,
-            "public_feed_url": public_url,
+            "public_feed_url": feed_items.public_url(bundle),
             "success": True,
             "message": "Feed item created successfully"
         }
@@ -109,3 +165,91 @@ async def create_feed_item(
         logger.error(f"Error creating feed item: {e}", exc_info=True)
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc']) or 'item'}: {e['msg']}" for e in error.errors()
+    )
+
+async def _prepare_batch_links(payloads: List[FeedItemCreate]) -> list[tuple[Optional[dict], Optional[str]]]:
+    """
+    (link fields or None, error or None) per payload; order matches payloads.
+    Items are prepared concurrently, so a link shared by several items is resolved
+    and titled once: concurrent lookups of the same URL coalesce in link_cache.
+    """
+    sem = asyncio.Semaphore(max(1, settings.feed_batch_concurrency))
+
+    async def one(payload: FeedItemCreate):
+        try:
+            async with sem:
+                return await link_worker.prepare_product_links("\n".join(payload.links)), None
+        except Exception as e:
+            logger.error(f"Preparing links for batch item failed: {e}", exc_info=True)
+            return None, str(e) or type(e).__name__
+
+    return await asyncio.gather(*(one(payload) for payload in payloads))
+
+def _insert_feed_items(db: Session, staged: list[tuple[int, FeedItemCreate, dict]]) -> list[tuple[int, str, str, list[str]]]:
+    """
+    Insert staged items in one transaction (slugs allocated up front, a collision
+    re-stages them all). Returns (index, bundle id, public URL, pending product ids).
+    """
+    def build():
+        bundles = [(index, feed_items.stage(db, payload, link_fields)) for index, payload, link_fields in staged]
+        db.flush()  # assigns ids
+        refresh_bundle_read_models(db, [bundle.id for _, bundle in bundles])
+        return [
+            (index, bundle.id, feed_items.public_url(bundle),
+             [p.id for p in bundle.products if p.sanitization_status == link_worker.STATUS_PENDING])
+            for index, bundle in bundles
+        ]
+
+    return commit_with_slug_retry(db, build)
+
+async def _create_feed_items(items: List[Dict[str, Any]], db: Session) -> FeedItemBatchResponse:
+    results: dict[int, FeedItemBatchResult] = {}
+
+    # 1. Validate each item on its own so one bad item doesn't sink the batch
+    valid: list[tuple[int, FeedItemCreate]] = []
+    for index, item in enumerate(items):
+        try:
+            payload = FeedItemCreate.model_validate(item)
+        except ValidationError as e:
+            results[index] = FeedItemBatchResult(index=index, success=False, error=_validation_message(e))
+            continue
+        feed_items.apply_defaults(payload)
+        valid.append((index, payload))
+
+    # 2. Links of all items at once (network work happens before any rows are staged)
+    prepared = await _prepare_batch_links([payload for _, payload in valid])
+    staged: list[tuple[int, FeedItemCreate, dict]] = []
+    for (index, payload), (link_fields, error) in zip(valid, prepared):
+        if error is not None:
+            results[index] = FeedItemBatchResult(index=index, success=False, error=error)
+        else:
+            staged.append((index, payload, link_fields))
+
+    # 3. One transaction for the batch; if it fails, insert item by item to isolate the culprit
+    created: list[tuple[int, str, str, list[str]]] = []
+    if staged:
+        try:
+            created = _insert_feed_items(db, staged)
+        except Exception as e:
+            logger.error(f"Batch insert failed, retrying item by item: {e}", exc_info=True)
+            db.rollback()
+            for entry in staged:
+                try:
+                    created.extend(_insert_feed_items(db, [entry]))
+                except Exception as item_error:
+                    db.rollback()
+                    results[entry[0]] = FeedItemBatchResult(index=entry[0], success=False, error=str(item_error))
+
+    for index, item_id, public_url, pending_ids in created:
+        results[index] = FeedItemBatchResult(index=index, success=True, item_id=item_id, public_feed_url=public_url)
+        for product_id in pending_ids:
+            link_worker.enqueue(product_id)
+
+    ordered = [results[index] for index in range(len(items))]
+    succeeded = sum(1 for result in ordered if result.success)
+    logger.info(f"Batch feed items: {succeeded} created, {len(ordered) - succeeded} failed")
+    return FeedItemBatchResponse(created=succeeded, failed=len(ordered) - succeeded, results=ordered)
@@ -1,16 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List
 from database import get_db
-from deps import require_public_feed_enabled
+from deps import require_public_feed_enabled, require_public_fetch_capacity
 from models import Product, Bundle
 from schemas import PublicFeed, Product as ProductSchema, Bundle as BundleSchema
-from utils import get_published_products, get_published_bundles, get_product_by_slug, get_bundle_by_slug, get_settings, get_feed_settings
-from utils import resolve_channel3_if_needed, fetch_title
+from utils import get_published_products, get_published_bundle_payloads, get_product_by_slug, get_bundle_payload_by_slug, get_settings, get_feed_settings
+from config import settings
+from http_clients import get_client
+from utils import resolve_link, fetch_title
+import link_batch
 import urllib.parse
-import httpx
 import os
 import json
 
@@ -24,12 +26,13 @@ async def get_public_feed(
 ):
     """Get public feed (published products and bundles)"""
     products = get_published_products(db)
-    bundles = get_published_bundles(db)
+    bundles = get_published_bundle_payloads(db)
     fs = get_feed_settings(db, "default")
     return {
         "products": products,
         "bundles": bundles,
-        "influencer_avatar": fs.avatar_url
+        "influencer_avatar": fs.avatar_url,
+        "feed_version": fs.version or 0
     }
 
 @router.get("/feed")
@@ -40,7 +43,7 @@ async def public_feed_page(
 ):
     """Render public feed page"""
     products = get_published_products(db)
-    bundles = get_published_bundles(db)
+    bundles = get_published_bundle_payloads(db)
     return templates.TemplateResponse(
         "public/feed.html", 
         {
@@ -88,11 +91,11 @@ async def get_public_bundle(
     db: Session = Depends(get_db),
     _ = Depends(require_public_feed_enabled)
 ):
-    """Get a published bundle by slug"""
-    bundle = get_bundle_by_slug(db, slug)
-    if not bundle:
+    """Get a published bundle by slug (pre-rendered JSON from the bundle read model)"""
+    payload = get_bundle_payload_by_slug(db, slug)
+    if payload is None:
         raise HTTPException(status_code=404, detail="Bundle not found")
-    return bundle
+    return Response(content=payload, media_type="application/json")
 
 @router.get("/bundle/{slug}/page")
 async def public_bundle_page(
@@ -102,9 +105,10 @@ async def public_bundle_page(
     _ = Depends(require_public_feed_enabled)
 ):
     """Render public bundle page"""
-    bundle = get_bundle_by_slug(db, slug)
-    if not bundle:
+    payload = get_bundle_payload_by_slug(db, slug)
+    if payload is None:
         raise HTTPException(status_code=404, detail="Bundle not found")
+    bundle = json.loads(payload)
     
     return templates.TemplateResponse(
         "public/bundle_detail.html", 
@@ -114,36 +118,37 @@ async def public_bundle_page(
         }
     )
 
-@router.post("/resolve-urls")
+@router.post("/resolve-urls", dependencies=[Depends(require_public_fetch_capacity)])
 async def public_resolve_urls(payload: dict):
     """
     Public-safe resolver: resolves only buy.trychannel3.com URLs to their destinations.
-    Other domains are returned unchanged. No auth required, short timeouts.
+    Other domains are returned unchanged. No auth required, short timeouts, and a
+    503 while the public outbound pool is saturated (see bulkheads.py).
     Request body: { "urls": string[] }
     Response: { "resolved": string[], "titles": (string|null)[] }
     """
     urls = list(payload.get("urls", []) or [])[:10]
-    timeout = httpx.Timeout(3.0, connect=3.0, read=3.0, write=3.0)
-    headers = {"User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"}
     resolved: list[str] = []
     titles: list[str | None] = []
-    async with httpx.AsyncClient(follow_redirects=True, timeout=timeout, headers=headers) as client:
-        for u in urls:
-            try:
-                parsed = urllib.parse.urlparse(u)
-                host = (parsed.hostname or "").lower()
-                if "trychannel3.com" in host:
-                    final_url = await resolve_channel3_if_needed(u, client)
-                    resolved.append(final_url)
-                    # Try to fetch a title for the destination page
-                    title = await fetch_title(final_url, client)
-                    titles.append(title)
+    client = get_client("public")
+    for u in urls:
+        try:
+            parsed = urllib.parse.urlparse(u)
+            host = (parsed.hostname or "").lower()
+            if "trychannel3.com" in host:
+                resolution = await resolve_link(u, client)
+                resolved.append(resolution.final_url)
+                # Reuse the title read during resolution, else fetch the destination page
+                if resolution.title_checked:
+                    titles.append(resolution.title)
                 else:
-                    resolved.append(u)
-                    titles.append(None)
-            except Exception:
+                    titles.append(await fetch_title(resolution.final_url, client))
+            else:
                 resolved.append(u)
                 titles.append(None)
+        except Exception:
+            resolved.append(u)
+            titles.append(None)
     return {"resolved": resolved, "titles": titles}
 
 
@@ -164,3 +169,29 @@ async def public_version():
         data = {"built_at": "unknown", "commit": "unknown"}
     # no-store so mobile clients don't cache this response
     return JSONResponse(content=data, headers={"Cache-Control": "no-store, max-age=0"})
+
+@router.post("/resolve-urls/stream", dependencies=[Depends(require_public_fetch_capacity)])
+async def public_resolve_urls_stream(payload: dict):
+    """
+    Streamed batch form of /resolve-urls for pages with many links.
+    Request body: { "urls": string[] } (Channel 3 links only, up to
+    settings.public_link_batch_max_urls; anything else is a 422)
+    Response: NDJSON, one line per URL in completion order:
+      { "index", "url", "final_url", "title", "ms", "error" }
+    followed by { "done": true, "count", "ms" }.
+    """
+    urls = payload.get("urls", [])
+    if not isinstance(urls, list):
+        raise HTTPException(status_code=422, detail="urls must be a list")
+    try:
+        urls = link_batch.batch_urls(urls, settings.public_link_batch_max_urls)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    # No auth here, so this must not become a general-purpose URL fetcher
+    rejected = [i for i, u in enumerate(urls) if not link_batch.is_channel3_url(u)]
+    if rejected:
+        raise HTTPException(status_code=422, detail=f"Only Channel 3 links can be resolved (rejected indexes: {rejected})")
+    return StreamingResponse(
+        link_batch.ndjson_lines(urls, get_client("public"), titles_for_all=False),
+        media_type=link_batch.MEDIA_TYPE,
+    )
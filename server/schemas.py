@@ -22,9 +22,29 @@ class ProductUpdate(BaseModel):
   is_published: Optional[bool] = None
   feed: Optional[str] = None
 
+class ProductLink(BaseModel):
+  position: int
+  label: str
+  # Destination shoppers should be sent to; original_url is the link as entered
+  resolved_url: str
+  original_url: str
+  host: Optional[str] = None
+  # Null if the link was only labelled offline (not fetched yet)
+  last_checked: Optional[datetime] = None
+  # Health check result: "ok", "redirected" (see redirect_url) or "dead"; null until checked
+  check_status: Optional[str] = None
+  redirect_url: Optional[str] = None
+
+  class Config:
+    from_attributes = True
+
 class Product(ProductBase):
   id: str
   slug: str
+  # product_url as structured rows, in display order
+  links: List[ProductLink] = []
+  # "pending" while links are sanitized in the background, then "done"/"failed"; null if sanitized inline
+  sanitization_status: Optional[str] = None
   created_at: datetime
   updated_at: Optional[datetime] = None
   
@@ -47,6 +67,10 @@ class BundleUpdate(BaseModel):
   product_ids: Optional[List[str]] = None
   feed: Optional[str] = None
 
+class BundleMembershipUpdate(BaseModel):
+  add: List[str] = []
+  remove: List[str] = []
+
 class Bundle(BundleBase):
   id: str
   slug: str
@@ -57,10 +81,23 @@ class Bundle(BundleBase):
   class Config:
     from_attributes = True
 
+class BundleSummary(BaseModel):
+  id: str
+  slug: str
+  title: str
+  is_published: bool = False
+  feed: Optional[str] = None
+  updated_at: Optional[datetime] = None
+  
+  class Config:
+    from_attributes = True
+
 class PublicFeed(BaseModel):
   products: List[Product] = []
   bundles: List[Bundle] = []
   influencer_avatar: Optional[str] = None
+  # Bumped when feed content changes after the fact (e.g. background link sanitation)
+  feed_version: int = 0
 
   class Config:
     from_attributes = True
@@ -109,3 +146,33 @@ class FeedItemResponse(BaseModel):
 
     class Config:
         validate_by_name = True
+
+class FeedItemJobStatus(BaseModel):
+    # Asynchronous feed item creation (202 from POST /api/feed-items, then polled)
+    job_id: str = Field(..., alias="jobId")
+    status: str  # "queued", "running", "done" or "failed"
+    status_url: str = Field(..., alias="statusUrl")
+    item_id: Optional[str] = Field(None, alias="itemId")
+    public_feed_url: Optional[str] = Field(None, alias="publicUrl")
+    error: Optional[str] = None
+    created_at: Optional[datetime] = Field(None, alias="createdAt")
+    finished_at: Optional[datetime] = Field(None, alias="finishedAt")
+
+    class Config:
+        validate_by_name = True
+
+class FeedItemBatchResult(BaseModel):
+    # One entry per submitted item, in request order
+    index: int
+    success: bool
+    item_id: Optional[str] = Field(None, alias="itemId")
+    public_feed_url: Optional[str] = Field(None, alias="publicUrl")
+    error: Optional[str] = None
+
+    class Config:
+        validate_by_name = True
+
+class FeedItemBatchResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[FeedItemBatchResult]
@@ -0,0 +1,88 @@
+import asyncio
+
+import httpx
+import pytest
+
+import bulkheads
+import host_health
+import http_clients
+
+
+@pytest.fixture(autouse=True)
+def _fresh_pools(monkeypatch):
+    monkeypatch.setattr(bulkheads.settings, "bulkhead_public_concurrency", 1)
+    monkeypatch.setattr(bulkheads.settings, "bulkhead_public_queue", 1)
+    bulkheads.reset()
+    host_health.registry.reset()
+    yield
+    bulkheads.reset()
+    host_health.registry.reset()
+
+
+def _held_upstream():
+    """Transport whose responses wait for `release` to be set"""
+    release = asyncio.Event()
+    started: list[str] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        started.append(request.url.path)
+        if request.url.path.startswith("/hold"):
+            await release.wait()
+        return httpx.Response(200, text="ok")
+
+    return httpx.MockTransport(handler), release, started
+
+
+@pytest.mark.asyncio
+async def test_saturated_pool_rejects_fast_and_records_queue_wait():
+    transport, release, started = _held_upstream()
+    async with http_clients.build_client("public", transport=transport) as client:
+        first = asyncio.create_task(client.get("https://shop.example/hold/1"))
+        second = asyncio.create_task(client.get("https://shop.example/hold/2"))
+        await asyncio.sleep(0.01)
+        pool = bulkheads.pools[bulkheads.PUBLIC]
+        assert (pool.in_flight, pool.queued) == (1, 1)
+        assert pool.saturated()
+
+        with pytest.raises(bulkheads.BulkheadFull):
+            await client.get("https://shop.example/hold/3")
+
+        release.set()
+        assert [r.status_code for r in await asyncio.gather(first, second)] == [200, 200]
+
+    stats = pool.snapshot()
+    assert (stats["admitted"], stats["rejected"], stats["in_flight"], stats["queued"]) == (2, 1, 0, 0)
+    assert stats["wait_ms_max"] > 0
+    assert started == ["/hold/1", "/hold/2"]
+
+
+@pytest.mark.asyncio
+async def test_admin_fetches_are_not_starved_by_public_traffic(monkeypatch):
+    # One slot per host: without per-pool host slots the public request would hold it
+    monkeypatch.setattr(host_health.settings, "outbound_per_host_concurrency", 1)
+    transport, release, _ = _held_upstream()
+    async with http_clients.build_client("public", transport=transport) as public, \
+            http_clients.build_client("sanitizer", transport=transport) as admin:
+        held = [asyncio.create_task(public.get(f"https://shop.example/hold/{n}")) for n in range(2)]
+        await asyncio.sleep(0.01)
+        assert bulkheads.pools[bulkheads.PUBLIC].saturated()
+
+        response = await asyncio.wait_for(admin.get("https://shop.example/p/1"), timeout=1)
+        assert response.status_code == 200
+        assert bulkheads.pools[bulkheads.ADMIN].snapshot()["admitted"] == 1
+
+        release.set()
+        await asyncio.gather(*held)
+
+
+def test_public_endpoints_answer_503_while_saturated(monkeypatch):
+    from fastapi.testclient import TestClient
+    from main import app
+
+    monkeypatch.setattr(bulkheads.pools[bulkheads.PUBLIC], "saturated", lambda: True)
+    client = TestClient(app)
+    for path in ("/api/public/resolve-urls", "/api/public/resolve-urls/stream"):
+        response = client.post(path, json={"urls": ["https://buy.trychannel3.com/r/x"]})
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+    assert bulkheads.pools[bulkheads.PUBLIC].rejected == 2
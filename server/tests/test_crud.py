@@ -152,3 +152,158 @@ def test_create_bundle():
     # Check that our specific bundle is in the list
     bundle_titles = [b["title"] for b in public_data["bundles"]]
     assert "Test Bundle" in bundle_titles
+
+def test_bundle_membership_patch_and_update():
+    """Test add/remove membership endpoint and diff-based full updates"""
+    login()
+    
+    ids = []
+    for i in range(3):
+        response = client.post("/api/admin/products/", json={
+            "title": f"Membership Product {i}",
+            "product_url": f"https://example.com/m{i}",
+            "is_published": True
+        })
+        assert response.status_code == 200
+        ids.append(response.json()["id"])
+    
+    response = client.post("/api/admin/bundles/", json={
+        "title": "Membership Bundle",
+        "product_ids": [ids[0], ids[1], "missing-id"],
+        "is_published": True
+    })
+    assert response.status_code == 200
+    bundle_id = response.json()["id"]
+    assert {p["id"] for p in response.json()["products"]} == {ids[0], ids[1]}
+    
+    # Add one, remove one; unknown ids are ignored
+    response = client.patch(f"/api/admin/bundles/{bundle_id}/products", json={
+        "add": [ids[2], "missing-id"],
+        "remove": [ids[0]]
+    })
+    assert response.status_code == 200
+    assert {p["id"] for p in response.json()["products"]} == {ids[1], ids[2]}
+    
+    # Full replacement still works through PUT
+    response = client.put(f"/api/admin/bundles/{bundle_id}", json={"product_ids": [ids[0]]})
+    assert response.status_code == 200
+    assert [p["id"] for p in response.json()["products"]] == [ids[0]]
+    
+    response = client.patch("/api/admin/bundles/nonexistent/products", json={"add": [ids[0]]})
+    assert response.status_code == 404
+
+def test_product_bundles_and_cascading_delete():
+    """Test reverse membership lookup and cleanup when a product is deleted"""
+    login()
+    
+    response = client.post("/api/admin/products/", json={
+        "title": "Cascade Product",
+        "product_url": "https://example.com/cascade",
+        "is_published": True
+    })
+    product_id = response.json()["id"]
+    
+    response = client.post("/api/admin/bundles/", json={
+        "title": "Cascade Bundle",
+        "product_ids": [product_id],
+        "is_published": True
+    })
+    bundle_id = response.json()["id"]
+    assert response.json()["updated_at"] is None
+    
+    response = client.get(f"/api/admin/products/{product_id}/bundles")
+    assert response.status_code == 200
+    assert [b["id"] for b in response.json()] == [bundle_id]
+    
+    response = client.delete(f"/api/admin/products/{product_id}")
+    assert response.status_code == 200
+    
+    # Association row is gone and the containing bundle was marked as changed
+    response = client.get(f"/api/admin/bundles/{bundle_id}")
+    assert response.json()["products"] == []
+    assert response.json()["updated_at"] is not None
+    
+    response = client.get(f"/api/admin/products/{product_id}/bundles")
+    assert response.status_code == 404
+
+def test_bundle_read_model_refreshed_on_write():
+    """Test public bundle JSON tracks bundle and member product changes"""
+    login()
+    
+    response = client.post("/api/admin/products/", json={
+        "title": "Read Model Product",
+        "product_url": "https://example.com/read-model",
+        "is_published": True
+    })
+    product_id = response.json()["id"]
+    
+    response = client.post("/api/admin/bundles/", json={
+        "title": "Read Model Bundle",
+        "product_ids": [product_id],
+        "is_published": True
+    })
+    slug = response.json()["slug"]
+    bundle_id = response.json()["id"]
+    
+    response = client.get(f"/api/public/bundle/{slug}")
+    assert response.status_code == 200
+    assert response.json()["products"][0]["title"] == "Read Model Product"
+    
+    # Editing a member product re-renders the bundle
+    client.put(f"/api/admin/products/{product_id}", json={"title": "Renamed Product"})
+    response = client.get(f"/api/public/bundle/{slug}")
+    assert response.json()["products"][0]["title"] == "Renamed Product"
+    
+    # Unpublishing the bundle removes it from public reads
+    client.put(f"/api/admin/bundles/{bundle_id}", json={"is_published": False})
+    response = client.get(f"/api/public/bundle/{slug}")
+    assert response.status_code == 404
+    bundle_titles = [b["title"] for b in client.get("/api/public/").json()["bundles"]]
+    assert "Read Model Bundle" not in bundle_titles
+
+def test_background_link_sanitization(monkeypatch):
+    """Test async mode stores inferred labels immediately and the worker applies the real ones"""
+    import asyncio
+    import link_worker
+    from utils import SanitizedLink
+    
+    queued = []
+    
+    async def fake_sanitize(raw, _client):
+        return [SanitizedLink(label="Real Title", url="https://shop.example.com/real",
+                              original_url="https://buy.trychannel3.com/blue-linen-shirt")]
+    
+    monkeypatch.setattr(link_worker.settings, "link_sanitize_async", True)
+    monkeypatch.setattr(link_worker, "enqueue", queued.append)
+    monkeypatch.setattr(link_worker, "sanitize_links", fake_sanitize)
+    monkeypatch.setattr(link_worker, "get_client", lambda purpose: None)
+    
+    response = client.post("/api/feed-items", json={
+        "name": "Async Look",
+        "links": ["https://buy.trychannel3.com/blue-linen-shirt"],
+        "imageUrl": "https://example.com/look.jpg"
+    }, headers={"X-EVE-API-KEY": link_worker.settings.eve_api_key})
+    assert response.status_code == 200
+    slug = response.json()["publicUrl"].split("/")[3]
+    
+    bundle = client.get(f"/api/public/bundle/{slug}").json()
+    product = bundle["products"][0]
+    assert product["sanitization_status"] == "pending"
+    assert product["product_url"] == "Blue Linen Shirt | https://buy.trychannel3.com/blue-linen-shirt"
+    assert product["links"][0]["resolved_url"] == "https://buy.trychannel3.com/blue-linen-shirt"
+    assert product["links"][0]["last_checked"] is None
+    assert queued == [product["id"]]
+    version = client.get("/api/public/").json()["feed_version"]
+    
+    assert asyncio.run(link_worker.sanitize_product(product["id"])) is True
+    # Already applied: a second run is a no-op
+    assert asyncio.run(link_worker.sanitize_product(product["id"])) is False
+    
+    product = client.get(f"/api/public/bundle/{slug}").json()["products"][0]
+    assert product["sanitization_status"] == "done"
+    assert product["product_url"] == "Real Title | https://shop.example.com/real"
+    link = product["links"][0]
+    assert (link["label"], link["resolved_url"], link["host"]) == ("Real Title", "https://shop.example.com/real", "shop.example.com")
+    assert link["original_url"] == "https://buy.trychannel3.com/blue-linen-shirt"
+    assert link["last_checked"] is not None
+    assert client.get("/api/public/").json()["feed_version"] == version + 1
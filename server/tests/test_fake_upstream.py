@@ -0,0 +1,72 @@
+import pytest
+
+import host_health
+import http_clients
+import link_cache
+from benchmarks.bench_sanitizer import percentile, run_posts
+from benchmarks.fake_upstream import FakeUpstream, mixed_links
+from utils import sanitize_multiline_urls
+
+
+@pytest.fixture(autouse=True)
+def _isolated(monkeypatch):
+    monkeypatch.setattr(link_cache.settings, "link_cache_enabled", False)
+    link_cache.memory.clear()
+    host_health.registry.reset()
+    yield
+    host_health.registry.reset()
+
+
+def _fake() -> FakeUpstream:
+    return FakeUpstream(slow_seconds=0.01, timeout_seconds=0.01)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("scenario,requests", [
+    ("chain", 4),  # buy.trychannel3.com, two go.trychannel3.com hops, the shop page
+    ("meta", 2),
+    ("js", 2),
+    ("canonical", 2),
+    ("slow", 2),
+    ("giant", 2),
+    ("direct", 1),
+])
+async def test_sanitizer_resolves_each_scenario(scenario, requests):
+    fake = _fake()
+    async with http_clients.build_client("sanitizer", transport=fake) as client:
+        out = await sanitize_multiline_urls(fake.link(scenario, "blue-scarf"), client)
+    assert out == f"Product blue-scarf | {fake.destination(scenario, 'blue-scarf')}"
+    # the destination title comes from the resolving GET, not a second fetch
+    assert fake.requests == requests
+
+
+@pytest.mark.asyncio
+async def test_timeouts_keep_the_original_link():
+    fake = _fake()
+    link = fake.link("timeout", "blue-scarf")
+    async with http_clients.build_client("sanitizer", transport=fake) as client:
+        assert await sanitize_multiline_urls(link, client) == f"Blue Scarf | {link}"
+    assert fake.requests_by_host["hang.example"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_giant_pages_are_read_only_up_to_the_head_cap(monkeypatch):
+    fake = _fake()
+    monkeypatch.setattr(link_cache.settings, "html_head_max_bytes", 64 * 1024)
+    async with http_clients.build_client("sanitizer", transport=fake) as client:
+        await sanitize_multiline_urls(fake.link("giant", "big-coat"), client)
+    assert fake.bytes_sent <= 64 * 1024 + 16 * 1024
+    assert fake.bytes_sent < fake.giant_bytes // 10
+
+
+@pytest.mark.asyncio
+async def test_benchmark_runner_sanitizes_every_post():
+    fake = _fake()
+    links = mixed_links(fake, 16)
+    posts = ["\n".join(links[i:i + 4]) for i in range(0, 16, 4)]
+    async with http_clients.build_client("sanitizer", transport=fake) as client:
+        wall, latencies = await run_posts(client, posts, concurrency=2)
+    assert len(latencies) == 4 and wall > 0
+    assert fake.requests_by_host["buy.trychannel3.com"] >= 12
+    assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.0
+    assert percentile([float(i) for i in range(1, 101)], 99) == 99.0
@@ -0,0 +1,254 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+import link_worker
+from database import SessionLocal
+from main import app
+from models import Bundle
+from utils import SanitizedLink
+
+client = TestClient(app)
+
+
+def _headers(key: str | None = None) -> dict:
+    headers = {"X-EVE-API-KEY": link_worker.settings.eve_api_key}
+    if key:
+        headers["Idempotency-Key"] = key
+    return headers
+
+
+def _look(name: str = "Idempotent Look") -> dict:
+    return {"name": name, "links": ["https://shop.example/p/1"], "imageUrl": "https://example.com/look.jpg"}
+
+
+def _bundle_count(title: str) -> int:
+    with SessionLocal() as db:
+        return db.execute(select(func.count(Bundle.id)).where(Bundle.title == title)).scalar_one()
+
+
+@pytest.fixture
+def sanitizer_calls(monkeypatch):
+    calls: list[str] = []
+
+    async def fake_sanitize(raw, _client):
+        calls.append(raw)
+        await asyncio.sleep(0.05)
+        return [SanitizedLink(label="Shirt", url=raw, original_url=raw)]
+
+    monkeypatch.setattr(link_worker, "sanitize_links", fake_sanitize)
+    return calls
+
+
+def test_retry_with_same_key_replays_the_original_response(sanitizer_calls):
+    key = str(uuid.uuid4())
+    title = f"Look {key}"
+    first = client.post("/api/feed-items", json=_look(title), headers=_headers(key))
+    retry = client.post("/api/feed-items", json=_look(title), headers=_headers(key))
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+    assert len(sanitizer_calls) == 1
+    assert _bundle_count(title) == 1
+
+
+def test_key_reused_with_another_payload_is_rejected(sanitizer_calls):
+    key = str(uuid.uuid4())
+    assert client.post("/api/feed-items", json=_look("First"), headers=_headers(key)).status_code == 200
+    response = client.post("/api/feed-items", json=_look("Second"), headers=_headers(key))
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicates_wait_for_the_original(sanitizer_calls):
+    key = str(uuid.uuid4())
+    title = f"Look {key}"
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        responses = await asyncio.gather(*(
+            http.post("/api/feed-items", json=_look(title), headers=_headers(key)) for _ in range(3)
+        ))
+    assert {r.status_code for r in responses} == {200}
+    assert len({r.json()["itemId"] for r in responses}) == 1
+    assert sum(r.headers.get("idempotent-replayed") == "true" for r in responses) == 2
+    assert len(sanitizer_calls) == 1
+    assert _bundle_count(title) == 1
+
+
+def test_failed_request_releases_its_key(monkeypatch):
+    attempts: list[int] = []
+
+    async def flaky_sanitize(raw, _client):
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("upstream exploded")
+        return [SanitizedLink(label="Shirt", url=raw, original_url=raw)]
+
+    monkeypatch.setattr(link_worker, "sanitize_links", flaky_sanitize)
+    key = str(uuid.uuid4())
+    assert client.post("/api/feed-items", json=_look(), headers=_headers(key)).status_code == 500
+    retry = client.post("/api/feed-items", json=_look(), headers=_headers(key))
+    assert retry.status_code == 200
+    assert "idempotent-replayed" not in retry.headers
+    assert len(attempts) == 2
+
+
+def test_batch_creates_valid_items_and_reports_invalid_ones(monkeypatch):
+    import http_clients
+
+    fetched: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        fetched.append(str(request.url))
+        return httpx.Response(200, headers={"Content-Type": "text/html"},
+                              text="<html><head><title>Linen Shirt</title></head></html>")
+
+    sanitizer = http_clients.build_client("sanitizer", transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(link_worker, "get_client", lambda purpose: sanitizer)
+    shared = f"https://shop.example/p/{uuid.uuid4().hex}"
+    tag = uuid.uuid4().hex
+    items = [
+        {"name": f"A {tag}", "links": [shared], "imageUrl": "https://example.com/a.jpg"},
+        {"name": f"B {tag}", "links": [shared]},  # no imageUrl
+        {"name": f"C {tag}", "links": [shared, "https://other.example/q"], "imageUrl": "https://example.com/c.jpg"},
+    ]
+
+    response = client.post("/api/feed-items/batch", json=items, headers=_headers())
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["created"], body["failed"]) == (2, 1)
+    first, invalid, third = body["results"]
+    assert [r["index"] for r in body["results"]] == [0, 1, 2]
+    assert first["success"] and third["success"] and first["itemId"] != third["itemId"]
+    assert third["publicUrl"].startswith("/public/bundle/")
+    assert not invalid["success"] and "imageUrl" in invalid["error"]
+    assert _bundle_count(f"A {tag}") == _bundle_count(f"C {tag}") == 1
+    # The link shared by both items was titled once
+    assert fetched.count(shared) == 1
+
+
+def test_batch_isolates_items_whose_links_fail(monkeypatch):
+    async def picky_prepare(raw):
+        if "broken" in raw:
+            raise RuntimeError("sanitizer exploded")
+        return {"product_url": raw, "links": [], "sanitization_status": None, "raw_product_url": None}
+
+    monkeypatch.setattr(link_worker, "prepare_product_links", picky_prepare)
+    items = [
+        {"name": "Fine", "links": ["https://shop.example/fine"], "imageUrl": "https://example.com/f.jpg"},
+        {"name": "Broken", "links": ["https://shop.example/broken"], "imageUrl": "https://example.com/b.jpg"},
+    ]
+    body = client.post("/api/feed-items/batch", json=items, headers=_headers()).json()
+    assert [r["success"] for r in body["results"]] == [True, False]
+    assert body["results"][1]["error"] == "sanitizer exploded"
+
+
+def test_batch_rejects_oversized_requests(monkeypatch):
+    monkeypatch.setattr(link_worker.settings, "feed_batch_max_items", 2)
+    response = client.post("/api/feed-items/batch", json=[_look()] * 3, headers=_headers())
+    assert response.status_code == 422
+    assert client.post("/api/feed-items/batch", json=[], headers=_headers()).status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_async_ingestion_returns_a_job_to_poll(sanitizer_calls):
+    import feed_jobs
+
+    title = f"Async {uuid.uuid4()}"
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        headers = {**_headers(), "Prefer": "respond-async"}
+        accepted = await http.post("/api/feed-items", json=_look(title), headers=headers)
+        assert accepted.status_code == 202
+        job = accepted.json()
+        assert job["status"] == "queued" and job["publicUrl"] is None
+        assert accepted.headers["location"] == job["statusUrl"] == f"/api/feed-items/jobs/{job['jobId']}"
+
+        await feed_jobs.drain()
+        done = (await http.get(job["statusUrl"], headers=_headers())).json()
+        assert done["status"] == "done"
+        assert done["publicUrl"].startswith("/public/bundle/")
+        assert (await http.get("/api/feed-items/jobs/nope", headers=_headers())).status_code == 404
+    assert _bundle_count(title) == 1
+    assert len(sanitizer_calls) == 1
+    await feed_jobs.stop()
+
+
+def _running_job(title: str, started_ago: timedelta, attempts: int = 1) -> str:
+    from models import FeedItemJob
+    from schemas import FeedItemCreate
+    import feed_jobs
+
+    payload = FeedItemCreate.model_validate(_look(title))
+    with SessionLocal() as db:
+        job = FeedItemJob(status=feed_jobs.RUNNING, payload=payload.model_dump_json(), attempts=attempts,
+                          started_at=datetime.now(timezone.utc) - started_ago)
+        db.add(job)
+        db.commit()
+        return job.id
+
+
+@pytest.mark.asyncio
+async def test_only_jobs_past_their_lease_are_resumed(sanitizer_calls, monkeypatch):
+    import feed_jobs
+
+    monkeypatch.setattr(feed_jobs.settings, "feed_job_lease_seconds", 60)
+    crashed_title, live_title = f"Crashed {uuid.uuid4()}", f"Live {uuid.uuid4()}"
+    crashed_id = _running_job(crashed_title, timedelta(minutes=5))
+    live_id = _running_job(live_title, timedelta(seconds=1))  # another process is still on it
+
+    await feed_jobs.start()
+    await feed_jobs.drain()
+    assert not await feed_jobs.process(crashed_id)  # already done
+    assert not await feed_jobs.process(live_id)  # still leased
+    await feed_jobs.stop()
+
+    crashed, live = feed_jobs.get(crashed_id), feed_jobs.get(live_id)
+    assert (crashed.status, crashed.attempts) == (feed_jobs.DONE, 2)
+    assert (live.status, live.attempts) == (feed_jobs.RUNNING, 1)
+    assert _bundle_count(crashed_title) == 1
+    assert _bundle_count(live_title) == 0
+
+
+@pytest.mark.asyncio
+async def test_job_taken_over_mid_run_creates_nothing(sanitizer_calls, monkeypatch):
+    """The item is inserted in the transaction that marks the job done, fenced on the claim"""
+    import feed_jobs
+    from models import FeedItemJob
+    from sqlalchemy import update
+
+    title = f"Taken over {uuid.uuid4()}"
+    job_id = _running_job(title, timedelta(hours=1))
+
+    async def slow_prepare(raw):
+        # Meanwhile another worker claims the job
+        with SessionLocal() as db:
+            db.execute(update(FeedItemJob).where(FeedItemJob.id == job_id)
+                       .values(attempts=FeedItemJob.attempts + 1, started_at=datetime.now(timezone.utc)))
+            db.commit()
+        return {"product_url": raw, "links": [], "sanitization_status": None, "raw_product_url": None}
+
+    monkeypatch.setattr(link_worker, "prepare_product_links", slow_prepare)
+    assert not await feed_jobs.process(job_id)
+    assert feed_jobs.get(job_id).status == feed_jobs.RUNNING
+    assert _bundle_count(title) == 0
+
+
+def test_item_is_not_reported_failed_when_storing_its_response_fails(sanitizer_calls, monkeypatch):
+    import idempotency
+
+    def broken_update(*_args):
+        raise RuntimeError("database went away")
+
+    monkeypatch.setattr(idempotency, "update", broken_update)  # only complete() updates
+    title = f"Unrecorded {uuid.uuid4()}"
+    response = client.post("/api/feed-items", json=_look(title), headers=_headers(str(uuid.uuid4())))
+    assert response.status_code == 200
+    assert _bundle_count(title) == 1
@@ -0,0 +1,54 @@
+import pytest
+
+from benchmarks.html_corpus import LEGACY_PATTERNS, legacy_scan, load_fixtures, synthetic_page
+from html_hints import REDIRECT_HINTS, TITLE_HINTS, scan_html_hints
+from utils import _cleanup_title, _extract_title
+
+FIXTURES = load_fixtures()
+
+
+@pytest.mark.parametrize("name", sorted(FIXTURES))
+def test_scanner_matches_legacy_regexes_on_corpus(name):
+    text = FIXTURES[name]
+    assert scan_html_hints(text) == legacy_scan(text)
+
+
+@pytest.mark.parametrize("text", [
+    synthetic_page(tags=50, script_kb=4),
+    synthetic_page(tags=50, script_kb=4, with_hints=False),
+    # lowercasing 'İ' changes the string length, forcing the case-insensitive fallback
+    "<p>İstanbul</p>" + FIXTURES["channel3_meta_refresh.html"] + "<META PROPERTY='og:title' CONTENT='Çay'>",
+    "<meta property='og:title' content='never closed",
+    "",
+])
+def test_scanner_matches_legacy_regexes_on_edge_cases(text):
+    assert scan_html_hints(text) == legacy_scan(text)
+
+
+def test_scanner_preserves_legacy_quirks():
+    hints = scan_html_hints(FIXTURES["legacy_markup_quirks.html"])
+    # content= before property= is not recognised, and the value stops at the first quote of either kind
+    assert hints.og_title == "Tom"
+    assert hints.title.strip() == "Classic Loafer -- Family Shoe Co."
+    assert hints.canonical == "http://family-shoes.example/loafer.asp?id=7"
+    assert hints.js_assign == "http://family-shoes.example/cart.asp"
+
+
+def test_until_stops_without_changing_the_deciding_hint():
+    text = FIXTURES["channel3_meta_refresh.html"]
+    hints = scan_html_hints(text, want=REDIRECT_HINTS, until="meta_refresh")
+    assert hints.meta_refresh == LEGACY_PATTERNS["meta_refresh"].search(text).group(1)
+    # the JS redirect later in the page is never reached
+    assert hints.js_href is None
+
+    title_only = scan_html_hints(FIXTURES["shopify_product.html"], want=TITLE_HINTS, until="og_title")
+    assert title_only.page_title == "The Exercise Dress – Outdoor Voices"
+    assert title_only.canonical is None
+
+
+@pytest.mark.parametrize("name", sorted(FIXTURES))
+def test_extract_title_matches_legacy(name):
+    text = FIXTURES[name]
+    m = LEGACY_PATTERNS["og_title"].search(text) or LEGACY_PATTERNS["title"].search(text)
+    expected = _cleanup_title(m.group(1).strip()) if m else None
+    assert _extract_title(text) == expected
@@ -0,0 +1,91 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+import http_cache
+import link_cache
+from utils import fetch_title
+
+PAGE = "<html><head><title>Blue Scarf</title></head><body>" + "x" * 50_000 + "</body></html>"
+
+
+@pytest.fixture(autouse=True)
+def _no_link_cache(monkeypatch):
+    # Every fetch_title call reaches the page fetch, where http_cache applies
+    monkeypatch.setattr(link_cache.settings, "link_cache_enabled", False)
+    monkeypatch.setattr(link_cache.memory, "max_entries", 0)
+    link_cache.memory.clear()
+
+
+def _origin(headers: dict):
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.headers.get("if-none-match") == headers.get("ETag"):
+            return httpx.Response(304, headers=headers)
+        return httpx.Response(200, headers={"Content-Type": "text/html", **headers}, text=PAGE)
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler)), requests
+
+
+def _url() -> str:
+    return f"https://shop.example/p/{uuid.uuid4().hex[:8]}?utm_source=test"
+
+
+@pytest.mark.asyncio
+async def test_unchanged_page_is_revalidated_with_a_304():
+    client, requests = _origin({"ETag": '"abc"', "Cache-Control": "no-cache"})
+    url = _url()
+    async with client:
+        assert await fetch_title(url, client) == "Blue Scarf"
+        before = dict(http_cache.stats)
+        assert await fetch_title(url, client) == "Blue Scarf"
+    assert len(requests) == 2
+    assert "if-none-match" not in requests[0].headers
+    assert requests[1].headers["if-none-match"] == '"abc"'
+    assert http_cache.stats["revalidated"] == before["revalidated"] + 1
+
+
+@pytest.mark.asyncio
+async def test_max_age_is_honored():
+    client, requests = _origin({"ETag": '"abc"', "Cache-Control": "public, max-age=300"})
+    url = _url()
+    async with client:
+        assert await fetch_title(url, client) == "Blue Scarf"
+        assert await fetch_title(url, client) == "Blue Scarf"
+    assert len(requests) == 1
+    page = http_cache.lookup(url)
+    assert page.is_fresh() and not page.is_fresh(datetime.now(timezone.utc) + timedelta(seconds=301))
+
+
+@pytest.mark.asyncio
+async def test_no_store_and_validatorless_pages_are_not_kept():
+    for headers in ({"ETag": '"abc"', "Cache-Control": "no-store"}, {}):
+        client, requests = _origin(headers)
+        url = _url()
+        async with client:
+            await fetch_title(url, client)
+            await fetch_title(url, client)
+        assert len(requests) == 2
+        assert all("if-none-match" not in r.headers for r in requests)
+        assert http_cache.lookup(url) is None
+
+
+def test_freshness_lifetime():
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    def lifetime(headers: dict) -> timedelta | None:
+        return http_cache.freshness(httpx.Headers(headers), now)
+
+    cap = timedelta(seconds=http_cache.settings.http_cache_max_age_seconds)
+    assert lifetime({"Cache-Control": "max-age=60"}) == timedelta(seconds=60)
+    assert lifetime({"Cache-Control": "max-age=60", "Age": "50"}) == timedelta(seconds=10)
+    assert lifetime({"Cache-Control": "max-age=999999999"}) == cap
+    assert lifetime({"Cache-Control": "private, no-cache"}) == timedelta(0)
+    assert lifetime({"Cache-Control": "no-store"}) is None
+    assert lifetime({"Expires": "Thu, 01 Jan 2026 00:10:00 GMT", "Date": "Thu, 01 Jan 2026 00:00:00 GMT"}) == timedelta(minutes=10)
+    assert lifetime({"Expires": "0"}) == timedelta(0)
+    assert lifetime({}) == timedelta(0)
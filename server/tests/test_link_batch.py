@@ -0,0 +1,122 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import link_batch
+import link_cache
+from main import app
+from routers import public
+
+
+def _upstream(delays: dict[str, float]):
+    """Channel 3 links redirect to shop.example.com/<path>; the shop page sleeps delays[path]"""
+    state = {"active": 0, "peak": 0}
+
+    async def handler(request):
+        if request.url.host.endswith("trychannel3.com"):
+            return httpx.Response(302, headers={"location": f"https://shop.example.com{request.url.path}"})
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        try:
+            await asyncio.sleep(delays.get(request.url.path, 0))
+        finally:
+            state["active"] -= 1
+        return httpx.Response(200, headers={"content-type": "text/html"},
+                              text=f"<title>Item {request.url.path[1:]}</title>")
+
+    return handler, state
+
+
+@pytest.fixture(autouse=True)
+def _no_link_cache(monkeypatch):
+    monkeypatch.setattr(link_cache.settings, "link_cache_enabled", False)
+    link_cache.memory.clear()
+
+
+@pytest.mark.asyncio
+async def test_results_stream_in_completion_order_with_bounded_concurrency():
+    handler, state = _upstream({"/slow": 0.3})
+    urls = ["https://buy.trychannel3.com/slow"] + [f"https://buy.trychannel3.com/i{n}" for n in range(12)]
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler), follow_redirects=True) as client:
+        results = [r async for r in link_batch.iter_results(urls, client, titles_for_all=False, concurrency=4)]
+
+    assert len(results) == len(urls)
+    # the slow link was started first but is reported last
+    assert results[-1]["index"] == 0
+    assert results[-1]["final_url"] == "https://shop.example.com/slow"
+    assert results[-1]["title"] == "Item slow"
+    assert results[-1]["ms"] >= 300
+    by_index = {r["index"]: r for r in results}
+    assert by_index[5]["final_url"] == "https://shop.example.com/i4"
+    assert state["peak"] <= 4
+
+
+@pytest.mark.asyncio
+async def test_public_batch_leaves_other_links_alone():
+    calls = []
+
+    def handler(request):
+        calls.append(str(request.url))
+        return httpx.Response(200, headers={"content-type": "text/html"}, text="<title>x</title>")
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        results = [r async for r in link_batch.iter_results(
+            ["https://brand.example/p/1", "not a url"], client, titles_for_all=False)]
+
+    by_index = {r["index"]: r for r in results}
+    assert by_index[0] == {"index": 0, "url": "https://brand.example/p/1", "final_url": "https://brand.example/p/1",
+                           "title": None, "ms": by_index[0]["ms"], "error": None}
+    assert by_index[1]["error"] == "invalid_url"
+    assert calls == []
+
+
+def test_public_stream_endpoint_returns_ndjson(monkeypatch):
+    handler, _ = _upstream({})
+    mock_client = httpx.AsyncClient(transport=httpx.MockTransport(handler), follow_redirects=True)
+    monkeypatch.setattr(public, "get_client", lambda name: mock_client)
+    urls = [f"https://buy.trychannel3.com/s{n}" for n in range(20)]
+
+    client = TestClient(app)
+    response = client.post("/api/public/resolve-urls/stream", json={"urls": urls})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+
+    assert lines[-1]["done"] is True and lines[-1]["count"] == 20
+    rows = sorted(lines[:-1], key=lambda r: r["index"])
+    assert [r["final_url"] for r in rows] == [f"https://shop.example.com/s{n}" for n in range(20)]
+    assert rows[7]["title"] == "Item s7"
+
+
+def test_public_stream_endpoint_rejects_large_or_non_channel3_batches(monkeypatch):
+    calls = []
+
+    def handler(request):
+        calls.append(str(request.url))
+        return httpx.Response(200, headers={"content-type": "text/html"}, text="<title>x</title>")
+
+    mock_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(public, "get_client", lambda name: mock_client)
+    client = TestClient(app)
+
+    # The public cap applies, not the (larger) admin one
+    too_many = [f"https://buy.trychannel3.com/s{n}" for n in range(21)]
+    assert client.post("/api/public/resolve-urls/stream", json={"urls": too_many}).status_code == 422
+
+    mixed = ["https://buy.trychannel3.com/s1", "https://brand.example/p/1", "https://trychannel3.com.evil.example/x"]
+    response = client.post("/api/public/resolve-urls/stream", json={"urls": mixed})
+    assert response.status_code == 422
+    assert "[1, 2]" in response.json()["detail"]
+    assert calls == []
+
+    monkeypatch.setattr(link_batch.settings, "public_link_batch_max_urls", 5)
+    assert client.post("/api/public/resolve-urls/stream", json={"urls": too_many[:6]}).status_code == 422
+
+    # Authenticated batches keep the larger link_batch_max_urls cap
+    monkeypatch.setattr(link_batch.settings, "link_batch_max_urls", 50)
+    assert len(link_batch.batch_urls(too_many)) == 21
+    with pytest.raises(ValueError):
+        link_batch.batch_urls(too_many * 3)
@@ -0,0 +1,153 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+from sqlalchemy import select, update
+
+import host_health
+import http_clients
+import link_checker
+from database import SessionLocal
+from models import FeedSettings, Product, ProductLink
+
+
+def _link(position: int, url: str) -> ProductLink:
+    return ProductLink(position=position, label=f"Link {position}", original_url=url, resolved_url=url,
+                       host=httpx.URL(url).host, last_checked=datetime.now(timezone.utc) - timedelta(days=30))
+
+
+def _create_product(urls: list[str], published: bool = True) -> str:
+    """A product with the given links, in a feed of its own (named after it)"""
+    product_id = f"chk-{uuid.uuid4().hex[:8]}"
+    with SessionLocal() as db:
+        db.add(Product(id=product_id, slug=product_id, title=product_id, feed=product_id,
+                       is_published=published, product_url="\n".join(urls),
+                       links=[_link(n, url) for n, url in enumerate(urls)]))
+        db.commit()
+    return product_id
+
+
+def _links(product_id: str) -> list[ProductLink]:
+    with SessionLocal() as db:
+        return db.execute(
+            select(ProductLink).where(ProductLink.product_id == product_id).order_by(ProductLink.position)
+        ).scalars().all()
+
+
+def _feed_version(feed: str) -> int:
+    with SessionLocal() as db:
+        row = db.get(FeedSettings, feed)
+        return row.version if row else 0
+
+
+def _age_links(product_id: str) -> None:
+    with SessionLocal() as db:
+        db.execute(update(ProductLink).where(ProductLink.product_id == product_id)
+                   .values(last_checked=datetime.now(timezone.utc) - timedelta(days=30)))
+        db.commit()
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    host_health.registry.reset()
+    seen: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        path = request.url.path
+        if path.startswith("/gone"):
+            return httpx.Response(404)
+        if path.startswith("/flaky"):
+            return httpx.Response(503)
+        if path.startswith("/moved"):
+            return httpx.Response(301, headers={"Location": "https://shop-new.example/p/1?utm_source=x"})
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304, headers={"ETag": '"v1"'})
+        return httpx.Response(200, headers={"ETag": '"v1"'}, text="<html></html>")
+
+    client = http_clients.build_client("checker", transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(link_checker, "get_client", lambda purpose: client)
+    return seen
+
+
+def test_tick_size_covers_the_catalog_once_per_window(monkeypatch):
+    monkeypatch.setattr(link_checker.settings, "link_check_window_hours", 24)
+    monkeypatch.setattr(link_checker.settings, "link_check_interval_seconds", 60)
+    monkeypatch.setattr(link_checker.settings, "link_check_max_per_tick", 200)
+    assert link_checker.tick_size(0) == 0
+    assert link_checker.tick_size(10) == 1
+    assert link_checker.tick_size(14400) == 10  # 1440 ticks a day
+    assert link_checker.tick_size(10_000_000) == 200
+
+
+@pytest.mark.asyncio
+async def test_tick_records_dead_and_redirected_links(upstream, monkeypatch):
+    monkeypatch.setattr(link_checker.settings, "link_check_dead_after", 2)
+    product_id = feed = _create_product([
+        "https://shop.example/p/ok",
+        "https://shop.example/moved/1",
+        "https://shop.example/gone/1",
+        "https://shop.example/flaky/1",
+    ])
+    hidden_id = _create_product(["https://shop.example/gone/2"], published=False)
+
+    await link_checker.run_tick(limit=1000)
+
+    ok, moved, gone, flaky = _links(product_id)
+    assert (ok.check_status, ok.http_status, ok.etag) == ("ok", 200, '"v1"')
+    assert (moved.check_status, moved.redirect_url) == ("redirected", "https://shop-new.example/p/1")
+    assert (gone.check_status, gone.http_status) == ("dead", 404)
+    # one failure is not enough to call a link dead
+    assert (flaky.check_status, flaky.check_failures, flaky.http_status) == (None, 1, 503)
+    assert _links(hidden_id)[0].check_status is None
+    assert _feed_version(feed) == 1
+
+    # Freshly checked links are not due again
+    upstream.clear()
+    await link_checker.run_tick(limit=1000)
+    assert not any(r.url.path.startswith(("/p/ok", "/flaky")) for r in upstream)
+
+    _age_links(product_id)
+    upstream.clear()
+    await link_checker.run_tick(limit=1000)
+    ok, _moved, _gone, flaky = _links(product_id)
+    conditional = [r for r in upstream if r.url.path == "/p/ok"]
+    assert conditional and conditional[0].headers["if-none-match"] == '"v1"'
+    assert (ok.check_status, ok.http_status) == ("ok", 200)
+    assert (flaky.check_status, flaky.check_failures) == ("dead", 2)
+    assert _feed_version(feed) == 2  # only the flaky link changed
+
+
+@pytest.mark.asyncio
+async def test_unchanged_links_only_move_last_checked(upstream):
+    product_id = feed = _create_product(["https://shop.example/p/ok"])
+    await link_checker.run_tick(limit=1000)
+    first = _links(product_id)[0]
+    _age_links(product_id)
+
+    await link_checker.run_tick(limit=1000)
+    second = _links(product_id)[0]
+    assert second.check_status == first.check_status == "ok"
+    assert second.last_checked > first.last_checked
+    assert _feed_version(feed) == 1
+
+
+def test_link_health_summary_lists_problems():
+    import os
+    from fastapi.testclient import TestClient
+    from main import app
+
+    product_id = _create_product(["https://shop.example/gone/3"])
+    with SessionLocal() as db:
+        db.execute(update(ProductLink).where(ProductLink.product_id == product_id)
+                   .values(check_status="dead", http_status=404))
+        db.commit()
+
+    client = TestClient(app)
+    client.post("/api/login", json={"password": os.environ["ADMIN_PASSWORD"]})
+    body = client.get("/api/admin/debug/link-health").json()
+    assert body["by_status"]["dead"] >= 1
+    assert any(p["product_id"] == product_id for p in body["problems"])
+    listed = client.get("/api/admin/products/", params={"link_status": "dead"}).json()
+    assert product_id in {p["id"] for p in listed}
@@ -0,0 +1,96 @@
+import json
+import os
+import urllib.parse
+
+import httpx
+import pytest
+
+import link_rules
+import utils
+
+with open(os.path.join(os.path.dirname(__file__), "fixtures", "link_rules.json")) as f:
+    CASES = json.load(f)
+
+
+@pytest.mark.parametrize("case", CASES, ids=[f"{c['rule']}:{c['url'][:60]}" for c in CASES])
+def test_rule_fixtures(case):
+    hit = link_rules.decode(case["url"])
+    if case["expected"] is None:
+        assert hit is None
+    else:
+        assert hit == (case["rule"], case["expected"])
+
+
+def test_every_rule_has_a_fixture():
+    covered = {c["rule"] for c in CASES}
+    assert {rule.name for rule in link_rules.RULES} <= covered
+
+
+def test_nested_wrappers_are_unwrapped():
+    inner = "https://click.linksynergy.com/deeplink?id=a&murl=https%3A%2F%2Fwww.saks.example%2Fp%2F1"
+    outer = "https://buy.trychannel3.com/r/x?url=" + urllib.parse.quote(inner, safe="")
+    assert link_rules.unwrap(outer) == ("https://www.saks.example/p/1", ["channel3_query", "rakuten"])
+
+
+@pytest.mark.asyncio
+async def test_resolve_link_decodes_offline_and_counts_rule_hits(monkeypatch):
+    """Encoded destinations skip the network; other Channel 3 links still use the HTTP resolver"""
+    import link_cache
+
+    monkeypatch.setattr(link_cache.settings, "link_cache_enabled", False)
+    link_cache.memory.clear()
+    link_rules.reset_stats()
+    calls = []
+
+    def handler(request):
+        calls.append(str(request.url))
+        if request.url.host == "buy.trychannel3.com":
+            return httpx.Response(302, headers={"location": "https://shop.example.com/fallback-item"})
+        return httpx.Response(200, headers={"content-type": "text/html"}, text="<title>Fallback</title>")
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler), follow_redirects=True) as client:
+        decoded = await utils.resolve_link(
+            "https://buy.trychannel3.com/r/a?url=https%3A%2F%2Fbrand.example%2Fp%2Fcoat", client
+        )
+        assert decoded.final_url == "https://brand.example/p/coat"
+        assert calls == []
+
+        fallback = await utils.resolve_link("https://buy.trychannel3.com/r/rules-fallback", client)
+        assert fallback.final_url == "https://shop.example.com/fallback-item"
+        assert len(calls) == 2
+
+    stats = link_rules.stats()
+    assert stats["lookups"] == 2 and stats["hits"] == 1 and stats["fallbacks"] == 1
+    assert stats["hit_rate"] == 0.5
+    by_rule = {row["name"]: row for row in stats["rules"]}
+    assert by_rule["channel3_query"]["hits"] == 1
+    assert by_rule["skimlinks"]["hits"] == 0
+
+
+@pytest.mark.asyncio
+async def test_pasted_affiliate_links_are_kept_as_is():
+    """Only Channel 3 links are rewritten: a creator's own affiliate links keep their attribution"""
+    calls = []
+
+    def handler(request):
+        calls.append(str(request.url))
+        return httpx.Response(200, headers={"content-type": "text/html"}, text="<title>Wrapper</title>")
+
+    wrappers = [
+        "https://click.linksynergy.com/deeplink?id=a&mid=1&murl=https%3A%2F%2Fshop.example%2Fp%2F1",
+        "https://go.skimresources.com/?id=123X456&xs=1&url=https%3A%2F%2Fshop.example%2Fp%2F1",
+        "https://www.awin1.com/cread.php?awinmid=1&awinaffid=2&ued=https%3A%2F%2Fshop.example%2Fp%2F1",
+    ]
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        for wrapper in wrappers:
+            assert (await utils.resolve_link(wrapper, client)).final_url == wrapper
+        links = await utils.sanitize_links(f"Shirt | {wrappers[0]}", client)
+    assert [(link.label, link.url, link.original_url) for link in links] == [("Shirt", wrappers[0], wrappers[0])]
+    assert calls == []
+
+
+def test_channel3_hosts_match_exactly_or_by_suffix():
+    assert utils._is_channel3_host("trychannel3.com")
+    assert utils._is_channel3_host("buy.TryChannel3.com")
+    assert not utils._is_channel3_host("buy.trychannel3.com.evil.example")
+    assert not utils._is_channel3_host("nottrychannel3.com")
@@ -0,0 +1,107 @@
+import uuid
+
+import pytest
+from sqlalchemy import func, select
+
+import host_health
+import http_clients
+import link_cache
+import migration_jobs
+from benchmarks.fake_upstream import FakeUpstream
+from database import SessionLocal
+from models import MigrationJob, Product, ProductLink
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    monkeypatch.setattr(link_cache.settings, "link_cache_enabled", False)
+    link_cache.memory.clear()
+    host_health.registry.reset()
+    upstream = FakeUpstream()
+    client = http_clients.build_client("migrator", transport=upstream)
+    monkeypatch.setattr(migration_jobs, "get_client", lambda purpose: client)
+    return upstream
+
+
+def _create_products(fake: FakeUpstream, count: int) -> list[str]:
+    prefix = f"mig-{uuid.uuid4().hex[:8]}"
+    ids = [f"{prefix}-{n:03d}" for n in range(count)]
+    with SessionLocal() as db:
+        for product_id in ids:
+            db.add(Product(id=product_id, slug=product_id, title=product_id,
+                           product_url=fake.link("meta", product_id)))
+        db.commit()
+    return ids
+
+
+def _urls(ids: list[str]) -> dict[str, str]:
+    with SessionLocal() as db:
+        rows = db.execute(select(Product.id, Product.product_url).where(Product.id.in_(ids))).all()
+    return dict(rows)
+
+
+@pytest.mark.asyncio
+async def test_migration_job_commits_batches_and_reports_progress(fake):
+    ids = _create_products(fake, 12)
+    job = await migration_jobs.start_job(batch_size=5)
+    assert (await migration_jobs.start_job()).id == job.id  # one migration at a time
+    await migration_jobs._tasks[job.id][1]
+
+    urls = _urls(ids)
+    for product_id in ids:
+        assert urls[product_id] == f"Product {product_id} | {fake.shop_url(product_id)}"
+    with SessionLocal() as db:
+        link = db.execute(select(ProductLink).where(ProductLink.product_id == ids[0])).scalar_one()
+    assert (link.original_url, link.resolved_url) == (fake.link("meta", ids[0]), fake.shop_url(ids[0]))
+    assert link.last_checked is not None
+
+    done = migration_jobs.status(migration_jobs.get_job(job.id))
+    assert done["status"] == migration_jobs.DONE
+    assert done["scanned"] == done["total"] >= 12
+    assert done["updated"] >= 12
+    assert done["progress"] == 1.0 and done["eta_seconds"] is None
+    assert done["last_id"] is not None
+
+
+@pytest.mark.asyncio
+async def test_migration_job_resumes_from_checkpoint(fake):
+    ids = _create_products(fake, 10)
+    with SessionLocal() as db:
+        # As left by a process that stopped after committing the batch ending at ids[3]
+        job = MigrationJob(kind=migration_jobs.KIND_MIGRATE_LINKS, status=migration_jobs.RUNNING,
+                           batch_size=4, last_id=ids[3], total=20, scanned=4, updated=4, failed=0,
+                           elapsed_seconds=2.0)
+        db.add(job)
+        db.commit()
+        job_id = job.id
+        remaining = db.execute(select(func.count(Product.id)).where(Product.id > ids[3])).scalar_one()
+
+    running = migration_jobs.status(migration_jobs.get_job(job_id))
+    assert running["progress"] == 0.2
+    assert running["products_per_second"] == 2.0 and running["eta_seconds"] == 8.0
+
+    await migration_jobs.run_job(job_id)
+
+    urls = _urls(ids)
+    assert all(urls[i] == fake.link("meta", i) for i in ids[:4])
+    assert all(urls[i].startswith(f"Product {i} | ") for i in ids[4:])
+    job = migration_jobs.get_job(job_id)
+    assert job.status == migration_jobs.DONE
+    assert job.scanned == 4 + remaining
+    assert fake.requests_by_host["buy.trychannel3.com"] >= 6
+
+
+@pytest.mark.asyncio
+async def test_cancelled_job_stops_before_next_batch(fake):
+    ids = _create_products(fake, 3)
+    with SessionLocal() as db:
+        job = MigrationJob(kind=migration_jobs.KIND_MIGRATE_LINKS, status=migration_jobs.RUNNING,
+                           batch_size=2, total=3, scanned=0, updated=0, failed=0, elapsed_seconds=0.0)
+        db.add(job)
+        db.commit()
+        job_id = job.id
+    assert migration_jobs.cancel_job(job_id).status == migration_jobs.CANCELLED
+
+    await migration_jobs.run_job(job_id)
+    assert fake.requests == 0
+    assert all(url == fake.link("meta", i) for i, url in _urls(ids).items())
@@ -0,0 +1,75 @@
+import httpx
+import pytest
+
+import link_cache
+import url_canon
+from url_canon import canonicalize
+from utils import infer_links, sanitize_links
+
+
+@pytest.mark.parametrize("url,expected", [
+    ("HTTPS://Shop.Example.COM:443/Products/Blue-Scarf/?utm_source=ig&utm_medium=social#reviews",
+     "https://shop.example.com/Products/Blue-Scarf"),
+    ("https://shop.example.com/p/1?fbclid=abc&gclid=def", "https://shop.example.com/p/1"),
+    ("https://shop.example.com/p/1?size=m&color=blue", "https://shop.example.com/p/1?color=blue&size=m"),
+    ("https://shop.example.com/p/1?q=a%20b&utm_id=1", "https://shop.example.com/p/1?q=a%20b"),
+    ("http://shop.example.com:8080", "http://shop.example.com:8080/"),
+    ("https://www.amazon.com/dp/B0TEST/ref=sr_1_1?tag=aff-20&qid=123&sr=8-1&keywords=scarf",
+     "https://www.amazon.com/dp/B0TEST/ref=sr_1_1?tag=aff-20"),
+    ("https://www.target.com/p/scarf/-/A-123?preselect=9&afid=creator&clkid=abc123&lnk=rec",
+     "https://www.target.com/p/scarf/-/A-123?afid=creator&clkid=abc123"),
+    ("mailto:hello@example.com", "mailto:hello@example.com"),
+    ("not a url", "not a url"),
+])
+def test_canonicalize(url, expected):
+    assert canonicalize(url) == expected
+
+
+def test_extra_params_from_settings(monkeypatch):
+    monkeypatch.setattr(url_canon.settings, "url_canon_extra_params", "ref, shop.example.com:variant")
+    assert canonicalize("https://a.example/p?ref=x&id=1") == "https://a.example/p?id=1"
+    assert canonicalize("https://www.shop.example.com/p?variant=2&id=1") == "https://www.shop.example.com/p?id=1"
+    assert canonicalize("https://other.example/p?variant=2") == "https://other.example/p?variant=2"
+
+
+def test_disabled_keeps_urls(monkeypatch):
+    monkeypatch.setattr(url_canon.settings, "url_canonicalize", False)
+    assert canonicalize(" https://Shop.example/p/?utm_source=x ") == "https://Shop.example/p/?utm_source=x"
+
+
+def test_tracking_variants_share_a_cache_key():
+    keys = {link_cache.normalize_cache_key(u) for u in (
+        "https://shop.example/p/1",
+        "https://SHOP.example/p/1/",
+        "https://shop.example/p/1?utm_source=newsletter",
+        "https://shop.example/p/1?fbclid=xyz#top",
+    )}
+    assert keys == {"https://shop.example/p/1"}
+
+
+def test_infer_links_dedupes_canonical_variants():
+    links = infer_links("https://shop.example/p/1?utm_source=a\nhttps://Shop.example/p/1/\nhttps://shop.example/p/2")
+    assert [link.url for link in links] == ["https://shop.example/p/1", "https://shop.example/p/2"]
+    assert [link.original_url for link in links] == ["https://shop.example/p/1?utm_source=a", "https://shop.example/p/2"]
+
+
+@pytest.mark.asyncio
+async def test_sanitize_links_stores_canonical_destinations(monkeypatch):
+    monkeypatch.setattr(link_cache.settings, "link_cache_enabled", False)
+    link_cache.memory.clear()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, html="<title>Blue Scarf</title>")
+
+    multiline = (
+        "Scarf | https://shop.example/p/1?utm_source=ig\n"
+        "https://SHOP.example/p/1/?fbclid=1\n"
+        "https://shop.example/p/2?b=2&a=1&gclid=x"
+    )
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        links = await sanitize_links(multiline, client)
+    assert [(link.label, link.url) for link in links] == [
+        ("Scarf", "https://shop.example/p/1"),
+        ("Blue Scarf", "https://shop.example/p/2?a=1&b=2"),
+    ]
+    assert links[0].original_url == "https://shop.example/p/1?utm_source=ig"
@@ -0,0 +1,383 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+import utils
+from database import SessionLocal
+from models import Product
+
+@pytest.fixture
+def empty_link_caches():
+    """Forget link lookups cached by earlier tests or runs (the tables live in the shared DB)"""
+    import link_cache
+    from models import HttpCacheEntry, LinkCacheEntry
+
+    with SessionLocal() as db:
+        db.query(LinkCacheEntry).delete()
+        db.query(HttpCacheEntry).delete()
+        db.commit()
+    link_cache.memory.clear()
+
+def _make_product(db, title):
+    product = Product(
+        slug=utils.generate_slug(),
+        title=title,
+        product_url="https://example.com/slug-test",
+    )
+    db.add(product)
+    return product
+
+def test_commit_with_slug_retry_recovers_from_collision(monkeypatch):
+    """A slug taken by another writer is re-allocated instead of failing the request"""
+    db = SessionLocal()
+    try:
+        taken = utils.generate_slug()
+        monkeypatch.setattr(utils, "generate_slug", lambda: taken)
+        utils.commit_with_slug_retry(db, lambda: _make_product(db, "Slug Owner"))
+
+        candidates = iter([taken, taken, "fresh-" + taken])
+        monkeypatch.setattr(utils, "generate_slug", lambda: next(candidates))
+        product = utils.commit_with_slug_retry(db, lambda: _make_product(db, "Slug Racer"))
+        assert product.slug == "fresh-" + taken
+    finally:
+        db.close()
+
+def test_commit_with_slug_retry_gives_up(monkeypatch):
+    """Persistent collisions surface the IntegrityError after the attempt budget"""
+    db = SessionLocal()
+    try:
+        taken = utils.generate_slug()
+        monkeypatch.setattr(utils, "generate_slug", lambda: taken)
+        utils.commit_with_slug_retry(db, lambda: _make_product(db, "Slug Owner 2"))
+        with pytest.raises(IntegrityError):
+            utils.commit_with_slug_retry(db, lambda: _make_product(db, "Slug Loser"), attempts=2)
+    finally:
+        db.close()
+
+def _slow_upstream(delay: float, calls: list):
+    """MockTransport handler: Channel 3 links 302 to the retailer path; retailer pages have a title."""
+    import asyncio
+    import httpx
+
+    async def handler(request: httpx.Request):
+        calls.append((request.method, str(request.url)))
+        await asyncio.sleep(delay)
+        if request.url.host == "buy.trychannel3.com":
+            dest = "https://shop.example.com" + request.url.path
+            return httpx.Response(302, headers={"location": dest})
+        name = request.url.path.strip("/") or "home"
+        html = f"<html><head><title>{name.upper()} | Shop</title></head></html>"
+        return httpx.Response(200, headers={"content-type": "text/html"}, text=html)
+
+    return handler
+
+@pytest.mark.asyncio
+async def test_sanitize_multiline_urls_concurrent_order_dedupe_and_cap():
+    """Links resolve concurrently while output order, dedupe and the 10-link cap are preserved"""
+    import time
+    import httpx
+
+    calls = []
+    transport = httpx.MockTransport(_slow_upstream(0.2, calls))
+    lines = ["https://buy.trychannel3.com/a", "Manual | https://shop.example.com/b"]
+    lines += ["https://buy.trychannel3.com/a"]  # duplicate after resolution
+    lines += [f"https://shop.example.com/p{i}" for i in range(12)]
+    async with httpx.AsyncClient(transport=transport, follow_redirects=True) as client:
+        started = time.perf_counter()
+        out = await utils.sanitize_multiline_urls("\n".join(lines), client)
+        elapsed = time.perf_counter() - started
+
+    out_lines = out.splitlines()
+    assert len(out_lines) == 10
+    assert out_lines[0] == "A | https://shop.example.com/a"
+    assert out_lines[1] == "Manual | https://shop.example.com/b"
+    assert out_lines[2] == "P0 | https://shop.example.com/p0"
+    assert out_lines[-1] == "P7 | https://shop.example.com/p7"
+    # Sequential processing would take well over 10 x 0.2s
+    assert elapsed < 2.0
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("empty_link_caches")
+async def test_link_cache_shares_resolution_and_titles():
+    """Repeated links are served from the link_cache table with no upstream requests"""
+    import httpx
+    import link_cache
+
+    calls = []
+    transport = httpx.MockTransport(_slow_upstream(0, calls))
+    text = "https://buy.trychannel3.com/cached-item"
+    async with httpx.AsyncClient(transport=transport, follow_redirects=True) as client:
+        first = await utils.sanitize_multiline_urls(text, client)
+        upstream_calls = len(calls)
+        second = await utils.sanitize_multiline_urls(text, client)
+
+    assert first == second == "CACHED-ITEM | https://shop.example.com/cached-item"
+    assert upstream_calls > 0
+    assert len(calls) == upstream_calls
+
+    entry = link_cache.lookup(link_cache.KIND_RESOLVE, "HTTPS://BUY.trychannel3.com/cached-item#frag")
+    assert entry is not None and entry.final_url == "https://shop.example.com/cached-item"
+
+@pytest.mark.asyncio
+async def test_link_cache_negative_entries_expire(monkeypatch):
+    """Failures are cached with the negative TTL only"""
+    import httpx
+    import link_cache
+
+    def failing(request):
+        raise httpx.ConnectError("down", request=request)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(failing)) as client:
+        assert await utils.fetch_title("https://down.example.com/x", client) is None
+
+    entry = link_cache.lookup(link_cache.KIND_TITLE, "https://down.example.com/x")
+    assert entry is not None and entry.status == link_cache.STATUS_ERROR
+    monkeypatch.setattr(link_cache.settings, "link_cache_negative_ttl_seconds", 0)
+    assert link_cache.lookup(link_cache.KIND_TITLE, "https://down.example.com/x") is None
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("empty_link_caches")
+async def test_concurrent_title_fetches_are_coalesced():
+    """N simultaneous requests for one uncached URL cause exactly one upstream fetch"""
+    import asyncio
+    import httpx
+
+    calls = []
+    transport = httpx.MockTransport(_slow_upstream(0.1, calls))
+    async with httpx.AsyncClient(transport=transport) as client:
+        titles = await asyncio.gather(
+            *(utils.fetch_title("https://shop.example.com/single-flight", client) for _ in range(20))
+        )
+    assert set(titles) == {"SINGLE-FLIGHT"}
+    assert len(calls) == 1
+
+def test_memory_cache_respects_entry_and_byte_caps():
+    """The in-process LRU evicts least recently used entries past its caps"""
+    import link_cache
+
+    result = link_cache.CachedResult(status=link_cache.STATUS_OK, title="x", fetched_at=link_cache._utcnow())
+    cache = link_cache.MemoryCache(max_entries=2, max_bytes=10_000)
+    cache.put(("title", "a"), result)
+    cache.put(("title", "b"), result)
+    assert cache.get(("title", "a")) is result  # refresh "a"
+    cache.put(("title", "c"), result)
+    assert cache.get(("title", "b")) is None
+    assert len(cache) == 2
+
+    small = link_cache.MemoryCache(max_entries=100, max_bytes=600)
+    for i in range(10):
+        small.put(("title", f"https://example.com/{i}"), result)
+    assert small.bytes_used <= 600
+    assert 0 < len(small) < 10
+
+@pytest.mark.asyncio
+async def test_shared_http_clients_are_reused_and_closed():
+    """One client per purpose for the app lifetime, closed on shutdown"""
+    import http_clients
+
+    client = http_clients.get_client("sanitizer")
+    assert http_clients.get_client("sanitizer") is client
+    assert http_clients.get_client("public") is not client
+    assert client.headers["User-Agent"].startswith("Channel3-LinkSanitizer")
+
+    await http_clients.close_all()
+    assert client.is_closed
+    assert http_clients.get_client("sanitizer") is not client
+    await http_clients.close_all()
+
+@pytest.mark.asyncio
+async def test_close_all_leaves_other_loops_clients_alone():
+    """Clients owned by another event loop stay registered (and open) for that loop to close"""
+    import asyncio
+    import http_clients
+
+    other_loop = asyncio.new_event_loop()
+    foreign = http_clients.build_client("sanitizer")
+    http_clients._clients["sanitizer"] = (other_loop, foreign)
+    try:
+        await http_clients.close_all()
+        assert http_clients._clients["sanitizer"] == (other_loop, foreign)
+        assert not foreign.is_closed
+    finally:
+        del http_clients._clients["sanitizer"]
+        await foreign.aclose()
+        other_loop.close()
+
+@pytest.mark.asyncio
+async def test_fetch_title_stops_reading_after_head():
+    """Giant pages are streamed only until the <head> hints are found"""
+    import httpx
+
+    sent = []
+
+    async def body():
+        chunks = [b"<html><head><meta property=\"og:title\" content=\"Big Page | Shop\"></head>"]
+        chunks += [b"<p>" + b"x" * 65536 + b"</p>"] * 200  # ~13 MB of body
+        for chunk in chunks:
+            sent.append(len(chunk))
+            yield chunk
+
+    def handler(request):
+        return httpx.Response(200, headers={"content-type": "text/html; charset=utf-8"}, content=body())
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        title = await utils._fetch_title_uncached("https://big.example.com/page", client)
+    assert title == "Big Page"
+    assert sum(sent) < 200_000
+
+@pytest.mark.asyncio
+async def test_read_html_prefix_respects_byte_cap():
+    """Without a stop marker, reading ends at the byte cap"""
+    import httpx
+
+    def handler(request):
+        return httpx.Response(200, headers={"content-type": "text/html"}, content=b"a" * 100_000)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        async with client.stream("GET", "https://cap.example.com/") as r:
+            text = await utils._read_html_prefix(r, max_bytes=1000)
+    assert len(text) == 1000
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("empty_link_caches")
+async def test_resolution_response_is_reused_for_the_title():
+    """A Channel 3 link costs one redirect chain: the destination head yields the title"""
+    import httpx
+
+    calls = []
+    transport = httpx.MockTransport(_slow_upstream(0, calls))
+    async with httpx.AsyncClient(transport=transport, follow_redirects=True) as client:
+        resolution = await utils.resolve_link("https://buy.trychannel3.com/reuse-item", client)
+        assert resolution.final_url == "https://shop.example.com/reuse-item"
+        assert resolution.title_checked and resolution.title == "REUSE-ITEM"
+
+        out = await utils.sanitize_multiline_urls("https://buy.trychannel3.com/reuse-item-2", client)
+    assert out == "REUSE-ITEM-2 | https://shop.example.com/reuse-item-2"
+    # 302 + destination GET per link; no separate title fetch
+    assert [m for m, _ in calls] == ["GET", "GET", "GET", "GET"]
+
+@pytest.mark.asyncio
+async def test_per_host_concurrency_cap():
+    """Requests to one host never exceed the per-host cap; other hosts are unaffected"""
+    import asyncio
+    import httpx
+    import host_health
+
+    host_health.registry.reset()
+    active: dict[str, int] = {}
+    peak: dict[str, int] = {}
+
+    async def handler(request):
+        host = request.url.host
+        active[host] = active.get(host, 0) + 1
+        peak[host] = max(peak.get(host, 0), active[host])
+        await asyncio.sleep(0.02)
+        active[host] -= 1
+        return httpx.Response(200, text="ok")
+
+    cap = host_health.settings.outbound_per_host_concurrency
+    transport = host_health.HostLimitedTransport(httpx.MockTransport(handler))
+    async with httpx.AsyncClient(transport=transport) as client:
+        urls = [f"https://busy.example.com/{i}" for i in range(cap * 3)] + ["https://quiet.example.com/"]
+        responses = await asyncio.gather(*(client.get(u) for u in urls))
+    assert all(r.status_code == 200 for r in responses)
+    assert peak["busy.example.com"] == cap
+    assert peak["quiet.example.com"] == 1
+    assert host_health.registry.get("busy.example.com").in_flight == 0
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_fails_fast_to_inferred_label(monkeypatch):
+    """After repeated failures a host is skipped (label inferred) until a probe succeeds"""
+    import httpx
+    import host_health
+    import link_cache
+
+    host_health.registry.reset()
+    link_cache.memory.clear()
+    monkeypatch.setattr(link_cache.settings, "link_cache_enabled", False)
+    monkeypatch.setattr(host_health.settings, "host_failure_threshold", 2)
+    monkeypatch.setattr(host_health.settings, "host_circuit_open_seconds", 60.0)
+    calls = []
+    healthy = False
+
+    def handler(request):
+        calls.append(str(request.url))
+        if healthy:
+            return httpx.Response(200, headers={"content-type": "text/html"}, text="<title>Back | Shop</title>")
+        return httpx.Response(500)
+
+    transport = host_health.HostLimitedTransport(httpx.MockTransport(handler))
+    async with httpx.AsyncClient(transport=transport) as client:
+        for i in range(2):
+            await client.get(f"https://flaky.example.com/warmup-{i}")
+        state = host_health.registry.get("flaky.example.com")
+        assert state.state == host_health.OPEN
+
+        out = await utils.sanitize_multiline_urls("https://flaky.example.com/wool-coat", client)
+        assert out == "Wool Coat | https://flaky.example.com/wool-coat"
+        assert len(calls) == 2 and state.rejected == 1
+
+        # Once the open period is over, one probe is let through and closes the circuit
+        healthy = True
+        state.open_until = 0
+        assert await utils.fetch_title("https://flaky.example.com/wool-coat", client) == "Back"
+        assert state.state == host_health.CLOSED
+    snapshot = {row["host"]: row for row in host_health.registry.snapshot()}
+    assert snapshot["flaky.example.com"]["failures"] == 2
+
+@pytest.mark.asyncio
+async def test_throttled_host_backs_off(monkeypatch):
+    """429 with Retry-After makes later requests fail fast instead of waiting out timeouts"""
+    import httpx
+    import host_health
+
+    host_health.registry.reset()
+    monkeypatch.setattr(host_health.settings, "host_backoff_max_wait_seconds", 0.5)
+    calls = []
+
+    def handler(request):
+        calls.append(str(request.url))
+        return httpx.Response(429, headers={"retry-after": "30"})
+
+    transport = host_health.HostLimitedTransport(httpx.MockTransport(handler))
+    async with httpx.AsyncClient(transport=transport) as client:
+        assert (await client.get("https://limited.example.com/a")).status_code == 429
+        with pytest.raises(host_health.HostUnavailable):
+            await client.get("https://limited.example.com/b")
+    assert len(calls) == 1
+    row = host_health.registry.snapshot()[0]
+    assert row["throttled"] == 1 and 29 < row["backoff_remaining_seconds"] <= 30
+
+def test_backfill_product_links_and_host_lookup():
+    """Products saved as text only get product_links rows that can be queried by host"""
+    import os
+    import uuid
+    from fastapi.testclient import TestClient
+    from main import app
+    from models import ProductLink
+
+    host = f"{uuid.uuid4().hex[:8]}.example"
+    db = SessionLocal()
+    try:
+        product = _make_product(db, "Backfill Me")
+        product.product_url = f"Wool Coat | https://www.{host}/coat\nhttps://brand.example/p/felt-hat"
+        db.commit()
+        product_id = product.id
+
+        assert utils.backfill_product_links(db, batch_size=2) >= 1
+        rows = db.query(ProductLink).filter(ProductLink.product_id == product_id).order_by(ProductLink.position).all()
+        assert [(r.position, r.label, r.resolved_url, r.host) for r in rows] == [
+            (0, "Wool Coat", f"https://www.{host}/coat", f"www.{host}"),
+            (1, "Felt Hat", "https://brand.example/p/felt-hat", "brand.example"),
+        ]
+        assert rows[0].last_checked is None
+        # Already filled: a second run leaves the product alone
+        utils.backfill_product_links(db)
+        assert db.query(ProductLink).filter(ProductLink.product_id == product_id).count() == 2
+    finally:
+        db.close()
+
+    client = TestClient(app)
+    assert client.post("/api/login", json={"password": os.environ["ADMIN_PASSWORD"]}).status_code == 200
+    response = client.get(f"/api/admin/products/?host={host}")
+    assert response.status_code == 200
+    assert [p["id"] for p in response.json()] == [product_id]
+    assert response.json()[0]["links"][1]["label"] == "Felt Hat"
@@ -2,6 +2,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from config import settings
 from models import Bundle
+from utils import refresh_bundle_read_models
 
 # Setup DB connection
 engine = create_engine(settings.database_url)
@@ -18,6 +19,7 @@ try:
 
         new_description = "Curated Must‑Have\n\nPopular\nA perfect pick for your look. Stylish, versatile, and ready to wear."
         latest_bundle.description = new_description
+        refresh_bundle_read_models(db, [latest_bundle.id])
         
         db.commit()
         print(f"New description: {latest_bundle.description}")
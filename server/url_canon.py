@@ -0,0 +1,156 @@
+"""
+URL canonicalization for link caching, dedupe and storage.
+
+canonicalize() maps the variants of one product URL to a single form:
+- scheme and host lowercased, default ports and the fragment dropped;
+- an empty path becomes "/", a trailing slash on any other path is removed;
+- tracking parameters (utm_*, fbclid, gclid, ...) removed, plus whatever the
+  host's HostRule drops; remaining parameters keep their values and are
+  sorted by name so their order doesn't matter.
+
+Affiliate parameters (Amazon `tag`, impact `irclickid`, ...) are not tracking
+parameters here and are always kept. Per-host rules live in HOST_RULES
+(register() adds one); URL_CANON_EXTRA_PARAMS adds parameters to drop
+everywhere ("param") or on one host and its subdomains ("host:param").
+A trailing "*" in a name matches a prefix.
+
+Used for link_cache keys and by the sanitizer before dedupe, so tracking and
+case variants share one cache entry and one stored link.
+"""
+from dataclasses import dataclass
+import urllib.parse
+
+from config import settings
+
+# Dropped on every host
+TRACKING_PARAMS = (
+    "utm_*", "fbclid", "gclid", "gclsrc", "dclid", "gbraid", "wbraid", "msclkid", "yclid",
+    "mc_cid", "mc_eid", "_ga", "_gl", "igshid", "ttclid", "twclid", "li_fat_id", "epik",
+    "_hsenc", "_hsmi", "mkt_tok", "oly_anon_id", "oly_enc_id", "vero_id", "s_kwcid", "ef_id",
+)
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+@dataclass(frozen=True)
+class HostRule:
+    # Host roots the rule applies to (exact host or any subdomain)
+    hosts: tuple[str, ...]
+    # Extra parameters to drop on these hosts
+    drop: tuple[str, ...] = ()
+    # If set, only these parameters are kept (everything else is dropped)
+    keep_only: tuple[str, ...] | None = None
+    description: str = ""
+
+    def applies_to(self, host: str) -> bool:
+        return any(host == root or host.endswith("." + root) for root in self.hosts)
+
+
+HOST_RULES: list[HostRule] = []
+
+
+def register(rule: HostRule) -> HostRule:
+    HOST_RULES.append(rule)
+    return rule
+
+
+def _matches(name: str, patterns) -> bool:
+    for pattern in patterns:
+        if pattern.endswith("*"):
+            if name.startswith(pattern[:-1]):
+                return True
+        elif name == pattern:
+            return True
+    return False
+
+
+def _extra_params(host: str) -> list[str]:
+    out = []
+    for item in (settings.url_canon_extra_params or "").split(","):
+        item = item.strip().lower()
+        if not item:
+            continue
+        if ":" in item:
+            rule_host, _, param = item.partition(":")
+            if host == rule_host or host.endswith("." + rule_host):
+                out.append(param)
+        else:
+            out.append(item)
+    return out
+
+
+def _keep_param(name: str, host: str, rules: list[HostRule], extra: list[str]) -> bool:
+    lowered = name.lower()
+    if _matches(lowered, TRACKING_PARAMS) or _matches(lowered, extra):
+        return False
+    for rule in rules:
+        if rule.keep_only is not None and not _matches(lowered, rule.keep_only):
+            return False
+        if _matches(lowered, rule.drop):
+            return False
+    return True
+
+
+def canonicalize(url: str) -> str:
+    """Canonical form of an http(s) URL; anything else is returned trimmed but unchanged."""
+    url = (url or "").strip()
+    if not settings.url_canonicalize:
+        return url
+    try:
+        parts = urllib.parse.urlsplit(url)
+        scheme = parts.scheme.lower()
+        host = (parts.hostname or "").lower()
+        port = parts.port
+    except ValueError:
+        return url
+    if scheme not in _DEFAULT_PORTS or not host:
+        return url
+
+    netloc = host if ":" not in host else f"[{host}]"
+    if port is not None and port != _DEFAULT_PORTS[scheme]:
+        netloc = f"{netloc}:{port}"
+    if parts.username or parts.password:
+        userinfo = parts.username or ""
+        if parts.password:
+            userinfo = f"{userinfo}:{parts.password}"
+        netloc = f"{userinfo}@{netloc}"
+
+    path = parts.path or "/"
+    if len(path) > 1 and path.endswith("/"):
+        path = path.rstrip("/") or "/"
+
+    query = parts.query
+    if query:
+        rules = [rule for rule in HOST_RULES if rule.applies_to(host)]
+        extra = _extra_params(host)
+        pairs = urllib.parse.parse_qsl(query, keep_blank_values=True)
+        kept = [(k, v) for k, v in pairs if _keep_param(k, host, rules, extra)]
+        if len(kept) == len(pairs) and not rules and not extra and "+" not in query:
+            # Nothing to drop: keep the original encoding, only order the parameters
+            raw = query.split("&")
+            query = "&".join(sorted((p for p in raw if p), key=lambda p: p.split("=", 1)[0]))
+        else:
+            query = urllib.parse.urlencode(sorted(kept, key=lambda kv: kv[0]), quote_via=urllib.parse.quote)
+
+    return urllib.parse.urlunsplit((scheme, netloc, path, query, ""))
+
+
+# ---------------------------- Built-in host rules ---------------------------- #
+
+register(HostRule(
+    ("amazon.com", "amazon.co.uk", "amazon.ca", "amazon.de", "amazon.fr", "amazon.it", "amazon.es", "amazon.com.au"),
+    drop=("ref", "ref_", "pf_rd_*", "pd_rd_*", "qid", "sr", "sprefix", "crid", "keywords", "content-id", "dib", "dib_tag"),
+    description="Amazon search/recommendation breadcrumbs; the affiliate `tag` is kept",
+))
+register(HostRule(
+    ("nordstrom.com",), drop=("breadcrumb", "origin", "searchterm"),
+    description="Nordstrom navigation context",
+))
+register(HostRule(
+    ("etsy.com",), drop=("click_key", "click_sum", "ref", "pro", "sts", "organic_search_click", "frs"),
+    description="Etsy listing click tracking",
+))
+register(HostRule(
+    ("target.com",), drop=("preselect", "lnk"),
+    description="Target recommendation tags; the affiliate `afid`/`clkid` are kept",
+))
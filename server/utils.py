@@ -1,7 +1,13 @@
 from nanoid import generate
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from models import Product, Bundle, Settings, FeedSettings
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import or_, select, update, delete, insert, func
+from sqlalchemy.exc import IntegrityError
+from models import Product, ProductLink, Bundle, BundleReadModel, Settings, FeedSettings, bundle_products
+from schemas import Bundle as BundleSchema
+from config import settings
+import json
+from dataclasses import dataclass
+from datetime import datetime, timezone
 
 # New imports for URL sanitation
 import httpx
@@ -9,38 +15,56 @@ import urllib.parse
 import re
 import html as html_mod
 import os
+import asyncio
+import codecs
+import http_cache
+import link_cache
+import link_rules
+from host_health import HostUnavailable
+from html_hints import META_REFRESH_RE, REDIRECT_HINTS, TITLE_HINTS, scan_html_hints
+from url_canon import canonicalize
 
 def generate_slug():
-    """Generate a unique slug for products and bundles"""
+    """
+    Generate a candidate slug for products and bundles.
+    No SELECT is issued: uniqueness is enforced by the unique index on `slug`,
+    and commit_with_slug_retry() re-allocates on the (rare) collision.
+    """
     return generate(size=10)
 
-def create_slug(db: Session, model_class, title: str):
-    """Create a unique slug for a model instance"""
-    base_slug = generate_slug()
-    slug = base_slug
-    counter = 1
-    
-    # Check if slug already exists
-    while db.query(model_class).filter(model_class.slug == slug).first():
-        slug = f"{base_slug}-{counter}"
-        counter += 1
-    
-    return slug
+SLUG_MAX_ATTEMPTS = 5
+
+def _is_slug_conflict(exc: IntegrityError) -> bool:
+    """True if an IntegrityError was raised by a unique slug index (SQLite or Postgres wording)."""
+    msg = str(getattr(exc, "orig", exc)).lower()
+    return "slug" in msg and ("unique" in msg or "duplicate" in msg)
+
+def commit_with_slug_retry(db: Session, build, attempts: int = SLUG_MAX_ATTEMPTS):
+    """
+    Run build() to stage new rows (it must allocate slugs via generate_slug), then commit.
+    If another request/worker won the race for a slug, the unique index rejects the
+    insert: roll back, call build() again for fresh slugs, and retry.
+    The common path costs exactly the INSERTs + COMMIT, with no slug lookups.
+    Returns whatever build() returned on the successful attempt.
+    """
+    for attempt in range(attempts):
+        try:
+            # build() may flush (e.g. to write association rows), so it is inside the try
+            result = build()
+            db.commit()
+            return result
+        except IntegrityError as e:
+            db.rollback()
+            if not _is_slug_conflict(e) or attempt == attempts - 1:
+                raise
 
 def get_published_products(db: Session, feed: str | None = None):
     """Get all published products for the primary feed (Eve)."""
-    q = db.query(Product).filter(Product.is_published == True)
+    q = db.query(Product).options(selectinload(Product.links)).filter(Product.is_published == True)
     # Default feed: either NULL or 'default'
     q = q.filter(or_(Product.feed == None, Product.feed == "default"))
     return q.order_by(Product.created_at.desc()).all()
 
-def get_published_bundles(db: Session, feed: str | None = None):
-    """Get all published bundles for the primary feed (Eve)."""
-    q = db.query(Bundle).filter(Bundle.is_published == True)
-    # Default feed: either NULL or 'default'
-    q = q.filter(or_(Bundle.feed == None, Bundle.feed == "default"))
-    return q.order_by(Bundle.created_at.desc()).all()
-
 def get_product_by_slug(db: Session, slug: str, feed: str | None = None):
     """Get a published product by slug for the primary feed (Eve)."""
     q = db.query(Product).filter(Product.slug == slug, Product.is_published == True)
@@ -55,6 +79,29 @@ def get_bundle_by_slug(db: Session, slug: str, feed: str | None = None):
     q = q.filter(or_(Bundle.feed == None, Bundle.feed == "default"))
     return q.first()
 
+def _is_default_feed(feed: str | None) -> bool:
+    return feed is None or feed == "default"
+
+def get_published_bundle_payloads(db: Session) -> list[dict]:
+    """Published bundles for the primary feed (Eve), read from the materialized read model."""
+    q = db.query(BundleReadModel.payload)
+    q = q.filter(or_(BundleReadModel.feed == None, BundleReadModel.feed == "default"))
+    return [json.loads(row[0]) for row in q.order_by(BundleReadModel.bundle_created_at.desc())]
+
+def get_bundle_payload_by_slug(db: Session, slug: str) -> str | None:
+    """
+    Rendered JSON text of a published bundle for the primary feed (Eve).
+    Single-row PK lookup on the read model; falls back to rendering live if the
+    row has not been materialized yet (e.g. before the startup backfill ran).
+    """
+    row = db.get(BundleReadModel, slug)
+    if row is not None:
+        return row.payload if _is_default_feed(row.feed) else None
+    bundle = get_bundle_by_slug(db, slug)
+    if not bundle:
+        return None
+    return BundleSchema.model_validate(bundle).model_dump_json()
+
 def get_settings(db: Session) -> Settings:
     """Fetch global settings row; create if missing."""
     settings = db.query(Settings).filter(Settings.id == "global").first()
@@ -75,23 +122,197 @@ def get_feed_settings(db: Session, feed: str) -> FeedSettings:
         db.refresh(fs)
     return fs
 
+def bump_feed_version(db: Session, feed: str | None) -> None:
+    """Increment the feed's content version (staged in the caller's transaction)."""
+    key = "default" if _is_default_feed(feed) else feed
+    res = db.execute(
+        update(FeedSettings)
+        .where(FeedSettings.feed == key)
+        .values(version=FeedSettings.version + 1)
+    )
+    if res.rowcount == 0:
+        db.add(FeedSettings(feed=key, avatar_url=None, version=1))
+
+# ---------------------------- Bundle membership helpers ---------------------------- #
+
+def _existing_product_ids(db: Session, product_ids) -> set[str]:
+    """Return the subset of product_ids that exist, using a single IN lookup."""
+    wanted = {pid for pid in product_ids or [] if pid}
+    if not wanted:
+        return set()
+    rows = db.execute(select(Product.id).where(Product.id.in_(wanted)))
+    return {row[0] for row in rows}
+
+def _current_bundle_product_ids(db: Session, bundle_id: str, among=None) -> set[str]:
+    """Current member ids of a bundle, optionally restricted to the ids in `among`."""
+    q = select(bundle_products.c.product_id).where(bundle_products.c.bundle_id == bundle_id)
+    if among is not None:
+        if not among:
+            return set()
+        q = q.where(bundle_products.c.product_id.in_(among))
+    return {row[0] for row in db.execute(q)}
+
+def _apply_bundle_membership(db: Session, bundle: Bundle, to_add: set[str], to_remove: set[str]):
+    """Insert/delete only the changed bundle_products rows and expire the stale collection."""
+    if to_add:
+        db.execute(
+            bundle_products.insert(),
+            [{"bundle_id": bundle.id, "product_id": pid} for pid in sorted(to_add)],
+        )
+    if to_remove:
+        db.execute(
+            bundle_products.delete().where(
+                bundle_products.c.bundle_id == bundle.id,
+                bundle_products.c.product_id.in_(to_remove),
+            )
+        )
+    if to_add or to_remove:
+        db.expire(bundle, ["products"])
+
+def set_bundle_products(db: Session, bundle: Bundle, product_ids) -> tuple[set[str], set[str]]:
+    """
+    Make the bundle's membership equal to product_ids (unknown ids are ignored).
+    Diffs against the current rows so only changed associations are written.
+    Returns (added, removed).
+    """
+    db.flush()  # bundle row must exist before association rows reference it
+    wanted = _existing_product_ids(db, product_ids)
+    current = _current_bundle_product_ids(db, bundle.id)
+    to_add, to_remove = wanted - current, current - wanted
+    _apply_bundle_membership(db, bundle, to_add, to_remove)
+    return to_add, to_remove
+
+def update_bundle_membership(db: Session, bundle: Bundle, add=None, remove=None) -> tuple[set[str], set[str]]:
+    """
+    Add and/or remove products from a bundle without touching untouched rows.
+    An id present in both lists is treated as an add. Returns (added, removed).
+    """
+    db.flush()
+    add_ids = _existing_product_ids(db, add)
+    remove_ids = {pid for pid in remove or [] if pid} - add_ids
+    current = _current_bundle_product_ids(db, bundle.id, among=add_ids | remove_ids)
+    to_add, to_remove = add_ids - current, remove_ids & current
+    _apply_bundle_membership(db, bundle, to_add, to_remove)
+    return to_add, to_remove
+
+def bundle_ids_for_product(db: Session, product_id: str) -> list[str]:
+    """Ids of bundles containing a product (served by the product_id index)."""
+    rows = db.execute(
+        select(bundle_products.c.bundle_id).where(bundle_products.c.product_id == product_id)
+    )
+    return [row[0] for row in rows]
+
+def get_bundles_for_product(db: Session, product_id: str):
+    """Bundles containing a product, newest first, via one indexed join."""
+    return (
+        db.query(Bundle)
+        .join(bundle_products, bundle_products.c.bundle_id == Bundle.id)
+        .filter(bundle_products.c.product_id == product_id)
+        .order_by(Bundle.created_at.desc())
+        .all()
+    )
+
+def invalidate_bundles_for_product(db: Session, product_id: str) -> list[str]:
+    """
+    Mark only the bundles that contain product_id as changed (bumps updated_at).
+    Call before deleting a product, since the cascade removes its membership rows.
+    Returns the affected bundle ids.
+    """
+    bundle_ids = bundle_ids_for_product(db, product_id)
+    if bundle_ids:
+        db.execute(
+            update(Bundle)
+            .where(Bundle.id.in_(bundle_ids))
+            .values(updated_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+    return bundle_ids
+
+# ---------------------------- Bundle read model ---------------------------- #
+
+def refresh_bundle_read_models(db: Session, bundle_ids) -> None:
+    """
+    Re-render the read model rows for the given bundles inside the caller's transaction.
+    Published bundles get their schemas.Bundle JSON + product count; unpublished
+    (or deleted) bundles lose their row. Call after staging changes, before commit.
+    """
+    ids = {bid for bid in bundle_ids or [] if bid}
+    if not ids:
+        return
+    db.flush()  # session uses autoflush=False; make pending changes visible to the reload
+    bundles = (
+        db.query(Bundle)
+        .options(selectinload(Bundle.products).selectinload(Product.links))
+        .filter(Bundle.id.in_(ids))
+        .populate_existing()
+        .all()
+    )
+    db.execute(delete(BundleReadModel).where(BundleReadModel.bundle_id.in_(ids)))
+    rows = []
+    for bundle in bundles:
+        if not bundle.is_published:
+            continue
+        rows.append({
+            "slug": bundle.slug,
+            "bundle_id": bundle.id,
+            "feed": bundle.feed,
+            "product_count": len(bundle.products),
+            "payload": BundleSchema.model_validate(bundle).model_dump_json(),
+            "bundle_created_at": bundle.created_at,
+        })
+    if rows:
+        db.execute(insert(BundleReadModel), rows)
+
+def backfill_bundle_read_models(db: Session) -> int:
+    """Materialize read model rows for published bundles that lack one. Returns the count."""
+    missing = db.execute(
+        select(Bundle.id)
+        .outerjoin(BundleReadModel, BundleReadModel.bundle_id == Bundle.id)
+        .where(Bundle.is_published == True, BundleReadModel.bundle_id == None)
+    )
+    ids = [row[0] for row in missing]
+    if ids:
+        refresh_bundle_read_models(db, ids)
+        db.commit()
+    return len(ids)
+
 # ---------------------------- Link sanitation helpers ---------------------------- #
 
-_TITLE_RE = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
-_OG_TITLE_RE = re.compile(
-    r'<meta[^>]+property=["\']og:title["\'][^>]+content=["\'](.*?)["\']',
-    re.IGNORECASE | re.DOTALL,
-)
-_META_REFRESH_RE = re.compile(
-    r'<meta[^>]+http-equiv=["\']refresh["\'][^>]+content=["\']\s*\d+\s*;\s*url=([^"\']+)["\']',
-    re.IGNORECASE,
-)
-
-# Additional redirect hints in HTML
-_JS_HREF_RE = re.compile(r'window\.location(?:\.href)?\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE)
-_JS_REPLACE_RE = re.compile(r'location\.replace\(\s*["\']([^"\']+)["\']\s*\)', re.IGNORECASE)
-_JS_ASSIGN_RE = re.compile(r'location\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE)
-_CANONICAL_RE = re.compile(r'<link[^>]+rel=["\']canonical["\'][^>]+href=["\']([^"\']+)["\']', re.IGNORECASE)
+# End of the document head (or start of body when </head> is omitted)
+_HEAD_END_RE = re.compile(r"</head\s*>|<body[\s>]", re.IGNORECASE)
+# Characters carried between chunks so a marker split across chunk boundaries still matches
+_STREAM_OVERLAP_CHARS = 2048
+
+async def _read_html_prefix(r: httpx.Response, stop_re: re.Pattern | None = None,
+                            max_bytes: int | None = None) -> str:
+    """
+    Incrementally read and decode a streamed HTML response.
+    Stops as soon as stop_re matches the text read so far, or after max_bytes
+    (settings.html_head_max_bytes by default), so large pages are never fully
+    downloaded or decoded just to inspect their <head>.
+    """
+    cap = max_bytes if max_bytes is not None else settings.html_head_max_bytes
+    try:
+        decoder = codecs.getincrementaldecoder(r.encoding or "utf-8")(errors="replace")
+    except (LookupError, TypeError):
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    parts: list[str] = []
+    received = 0
+    tail = ""
+    async for chunk in r.aiter_bytes():
+        if received + len(chunk) > cap:
+            chunk = chunk[:cap - received]
+        received += len(chunk)
+        piece = decoder.decode(chunk)
+        parts.append(piece)
+        if stop_re is not None and stop_re.search(tail + piece):
+            break
+        tail = (tail + piece)[-_STREAM_OVERLAP_CHARS:]
+        if received >= cap:
+            break
+    parts.append(decoder.decode(b"", final=True))
+    return "".join(parts)
 
 def _is_local_host(h: str) -> bool:
     """Check if hostname is localhost or 127.0.0.1"""
@@ -124,12 +345,9 @@ def _safe_return(url: str, fallback: str) -> str:
 def _extract_title(html: str) -> str | None:
     if not html:
         return None
-    m = _OG_TITLE_RE.search(html)
-    if m:
-        return _cleanup_title(m.group(1).strip())
-    m = _TITLE_RE.search(html)
-    if m:
-        return _cleanup_title(m.group(1).strip())
+    title = scan_html_hints(html, want=TITLE_HINTS, until="og_title").page_title
+    if title is not None:
+        return _cleanup_title(title.strip())
     return None
 
 def _cleanup_title(title: str) -> str:
@@ -154,128 +372,234 @@ def infer_label_from_url_py(u: str) -> str:
     except Exception:
         return u
 
-async def resolve_channel3_if_needed(u: str, client: httpx.AsyncClient) -> str:
+_CHANNEL3_ROOTS = link_rules.CHANNEL3_ROOTS
+
+def _is_channel3_host(host: str) -> bool:
+    host = (host or "").lower()
+    return any(host == root or host.endswith("." + root) for root in _CHANNEL3_ROOTS)
+
+@dataclass
+class LinkResolution:
     """
-    Resolve Channel3 redirects robustly:
-    - HEAD then GET
-    - meta refresh
-    - JS redirects (window.location / location.replace / assignment)
-    - <link rel="canonical">
-    Follows a few hops with guards. Never returns localhost in production.
-    Only unwraps for known Channel3 hostnames.
+    Result of resolving one link.
+    title_checked is True when the destination page's <head> was read during
+    resolution; title is then the page title (or None if it had no usable one)
+    and callers need not fetch the page again.
     """
-    try:
-        current = u
-        visited = set()
-        for _ in range(3):  # follow up to 3 hops
-            parsed = urllib.parse.urlparse(current)
-            host = (parsed.hostname or "").lower()
-            # Only unwrap redirects for Channel 3 hosts
-            allowed_roots = ("trychannel3.com", "ch3.link", "channel3.link")
-            if not any(root in host for root in allowed_roots):
-                return _safe_return(current, u)
-            if current in visited:
-                break
-            visited.add(current)
-
-            # Prefer HEAD first
-            try:
-                r_head = await client.head(current)
-                head_url = str(r_head.url)
-                if head_url and head_url != current:
-                    current = head_url
-                    continue
-            except Exception:
-                pass
+    final_url: str
+    title: str | None = None
+    title_checked: bool = False
+    status_code: int | None = None
+    content_type: str | None = None
+
+def _title_from_html(text: str) -> str | None:
+    """Cleaned, unescaped page title from HTML, or None if missing or a bot-block page."""
+    raw = _extract_title(text)
+    if not raw:
+        return None
+    # Decode HTML entities and sanitize common bot-block titles
+    title = html_mod.unescape(raw).strip()
+    blocked = [
+        "access denied",
+        "forbidden",
+        "unauthorized",
+        "robot check",
+        "restricted",
+        "blocked",
+        "not found",
+        "captcha",
+    ]
+    tl = title.lower()
+    if any(b in tl for b in blocked):
+        return None
+    return title
+
+async def _follow_channel3_hops(u: str, client: httpx.AsyncClient) -> LinkResolution:
+    """Network part of resolve_link; raises on transport errors."""
+    current = u
+    visited = set()
+    for _ in range(3):  # follow up to 3 hops
+        parsed = urllib.parse.urlparse(current)
+        host = (parsed.hostname or "").lower()
+        # Only unwrap redirects for Channel 3 hosts
+        if not _is_channel3_host(host):
+            return LinkResolution(final_url=_safe_return(current, u))
+        if current in visited:
+            break
+        visited.add(current)
 
-            # Then GET and inspect
-            r_get = await client.get(current)
+        # One streamed GET follows the HTTP redirect chain; the body is read only as far as needed
+        async with client.stream("GET", current) as r_get:
             final_url = str(r_get.url) if r_get is not None else current
-            text = r_get.text or ""
             ctype = (r_get.headers.get("content-type", "") or "").lower()
 
-            # HTML-based hints
-            if "text/html" in ctype:
-                # meta refresh
-                m = _META_REFRESH_RE.search(text)
-                if m:
-                    candidate = urllib.parse.urljoin(final_url, m.group(1).strip())
-                    if candidate and candidate != current:
-                        current = candidate
-                        continue
-                # JS redirects
-                for rx in (_JS_HREF_RE, _JS_REPLACE_RE, _JS_ASSIGN_RE):
-                    jm = rx.search(text)
-                    if jm:
-                        target = urllib.parse.urljoin(final_url, jm.group(1).strip())
-                        if target and target != current:
-                            current = target
-                            break
-                else:
-                    # canonical link as last resort
-                    cm = _CANONICAL_RE.search(text)
-                    if cm:
-                        canon = urllib.parse.urljoin(final_url, cm.group(1).strip())
-                        if canon and canon != current:
-                            current = canon
-                            continue
-                    # no change from HTML hints
-                    current = final_url
+            if not _is_channel3_host((urllib.parse.urlparse(final_url).hostname or "")):
+                # Landed on the destination: read its <head> once so the title comes for free
+                safe_url = _safe_return(final_url, u)
+                if "text/html" not in ctype or safe_url != final_url:
+                    return LinkResolution(final_url=safe_url, status_code=r_get.status_code, content_type=ctype)
+                text = await _read_html_prefix(r_get, stop_re=_HEAD_END_RE)
+                title = _title_from_html(text)
+                # Later title refetches of the destination can then revalidate instead of downloading
+                http_cache.store(final_url, r_get, title=title)
+                return LinkResolution(
+                    final_url=final_url,
+                    title=title,
+                    title_checked=True,
+                    status_code=r_get.status_code,
+                    content_type=ctype,
+                )
+
+            # Still on a Channel 3 interstitial: read up to the first meta refresh or the byte cap
+            text = await _read_html_prefix(r_get, stop_re=META_REFRESH_RE) if "text/html" in ctype else ""
+
+        # HTML-based hints
+        if "text/html" in ctype:
+            hints = scan_html_hints(text, want=REDIRECT_HINTS, until="meta_refresh")
+            # meta refresh
+            if hints.meta_refresh is not None:
+                candidate = urllib.parse.urljoin(final_url, hints.meta_refresh.strip())
+                if candidate and candidate != current:
+                    current = candidate
                     continue
+            # JS redirects
+            for target in (hints.js_href, hints.js_replace, hints.js_assign):
+                if target is not None:
+                    target = urllib.parse.urljoin(final_url, target.strip())
+                    if target and target != current:
+                        current = target
+                        break
             else:
-                # Non-HTML: trust the final URL from GET
+                # canonical link as last resort
+                if hints.canonical is not None:
+                    canon = urllib.parse.urljoin(final_url, hints.canonical.strip())
+                    if canon and canon != current:
+                        current = canon
+                        continue
+                # no change from HTML hints
                 current = final_url
                 continue
+        else:
+            # Non-HTML: trust the final URL from GET
+            current = final_url
+            continue
 
-        return _safe_return(current, u)
+    return LinkResolution(final_url=_safe_return(current, u))
+
+async def resolve_link(u: str, client: httpx.AsyncClient) -> LinkResolution:
+    """
+    Resolve Channel3 redirects robustly:
+    - GET following HTTP redirects (streamed, body read only as far as needed)
+    - meta refresh
+    - JS redirects (window.location / location.replace / assignment)
+    - <link rel="canonical">
+    Follows a few hops with guards. Never returns localhost in production.
+    Only unwraps for known Channel3 hostnames; everything else (including affiliate
+    links pasted directly, which carry the creator's attribution) is returned as is.
+    Channel3 links whose destination is encoded in the URL itself are decoded
+    offline by link_rules, with no network call.
+    When the destination page is reached, its title is extracted from the same
+    response and primed into the title cache, so no second GET is needed.
+    Results (including failures, with a shorter TTL) are read through link_cache
+    (in-process LRU + single-flight, then the link_cache table).
+    """
+    try:
+        host = (urllib.parse.urlparse(u).hostname or "").lower()
+        if not _is_channel3_host(host):
+            return LinkResolution(final_url=_safe_return(u, u))
+
+        # Known wrapper patterns first; the network is only needed if a Channel 3 link remains
+        decoded, applied = link_rules.unwrap(u)
+        if applied and not _is_channel3_host(urllib.parse.urlparse(decoded).hostname or ""):
+            return LinkResolution(final_url=_safe_return(decoded, u))
+        link_rules.record_fallback()
+        start = decoded
+
+        fresh: LinkResolution | None = None
+
+        async def fetch() -> link_cache.CachedResult:
+            nonlocal fresh
+            try:
+                fresh = await _follow_channel3_hops(start, client)
+            except HostUnavailable:
+                raise  # refused locally (host backing off / circuit open): nothing to cache
+            except Exception:
+                return link_cache.CachedResult(status=link_cache.STATUS_ERROR, final_url=u)
+            if fresh.title_checked:
+                status = link_cache.STATUS_OK if fresh.title else link_cache.STATUS_EMPTY
+                link_cache.prime(
+                    link_cache.KIND_TITLE,
+                    fresh.final_url,
+                    link_cache.CachedResult(status=status, final_url=fresh.final_url, title=fresh.title),
+                )
+            return link_cache.CachedResult(status=link_cache.STATUS_OK, final_url=fresh.final_url)
+
+        result = await link_cache.read_through(link_cache.KIND_RESOLVE, u, fetch)
+        if fresh is not None:
+            return fresh
+        return LinkResolution(final_url=_safe_return(result.final_url or u, u))
     except Exception:
-        return u
+        return LinkResolution(final_url=u)
+
+async def resolve_channel3_if_needed(u: str, client: httpx.AsyncClient) -> str:
+    """Resolve a link to its destination URL (see resolve_link for details)."""
+    return (await resolve_link(u, client)).final_url
+
+async def _fetch_title_uncached(u: str, client: httpx.AsyncClient) -> str | None:
+    """
+    Network part of fetch_title; raises on transport errors. Pages seen before
+    are not downloaded again while fresh, and are revalidated with a conditional
+    GET once stale (see http_cache.py).
+    """
+    cached = http_cache.lookup(u)
+    if cached is not None and cached.is_fresh():
+        http_cache.record("fresh")
+        return cached.title
+    headers = cached.conditional_headers() if cached is not None else None
+    async with client.stream("GET", u, headers=headers) as r:
+        if r.status_code == 304 and cached is not None:
+            http_cache.record("revalidated")
+            http_cache.revalidated(cached, r)
+            return cached.title
+        http_cache.record("fetched")
+        if "text/html" not in r.headers.get("content-type", "").lower():
+            http_cache.store(u, r, title=None)
+            return None
+        # Title hints live in <head>; stop reading there instead of downloading the page
+        text = await _read_html_prefix(r, stop_re=_HEAD_END_RE)
+        title = _title_from_html(text)
+        http_cache.store(u, r, title=title)
+    return title
 
 async def fetch_title(u: str, client: httpx.AsyncClient) -> str | None:
+    """Fetch a cleaned page title (og:title > <title>), read through link_cache (memory, then table)."""
     try:
         parsed = urllib.parse.urlparse(u)
         if parsed.scheme not in ("http", "https"):
             return None
-        r = await client.get(u)
-        if "text/html" in r.headers.get("content-type", "").lower():
-            raw = _extract_title(r.text or "")
-            if not raw:
-                return None
-            # Decode HTML entities and sanitize common bot-block titles
-            title = html_mod.unescape(raw).strip()
-            blocked = [
-                "access denied",
-                "forbidden",
-                "unauthorized",
-                "robot check",
-                "restricted",
-                "blocked",
-                "not found",
-                "captcha",
-            ]
-            tl = title.lower()
-            if any(b in tl for b in blocked):
-                return None
-            return title
-        return None
+
+        async def fetch() -> link_cache.CachedResult:
+            try:
+                title = await _fetch_title_uncached(u, client)
+            except HostUnavailable:
+                raise  # refused locally (host backing off / circuit open): nothing to cache
+            except Exception:
+                return link_cache.CachedResult(status=link_cache.STATUS_ERROR)
+            status = link_cache.STATUS_OK if title else link_cache.STATUS_EMPTY
+            return link_cache.CachedResult(status=status, final_url=u, title=title)
+
+        result = await link_cache.read_through(link_cache.KIND_TITLE, u, fetch)
+        return result.title
     except Exception:
         return None
 
-async def sanitize_multiline_urls(multiline: str, client: httpx.AsyncClient) -> str:
+SANITIZE_MAX_LINKS = 10
+
+def _split_link_candidates(multiline: str) -> list[tuple[str | None, str]]:
     """
-    Accepts a multiline string of entries that may be:
-      - "Label | URL"
-      - "URL"
-      - Multiple URLs on one line (comma-separated or glued)
-    Returns a normalized multiline string in "Label | URL" form with:
-      - Channel 3 URLs resolved to destination
-      - Labels filled by: manual > fetched title > inferred from URL
-      - Does not drop lines on failures; falls back to original URL + inferred label
-      - Caps to the first 10 unique URLs (dedupe by full normalized URL)
+    Normalize pasted text and return (manual_label, url) candidates in input order.
+    Only http(s) URLs are returned; nothing is deduped or capped here.
     """
-    if not multiline:
-        return multiline
-
     s = multiline
 
     # 1) Decode common percent-encoded newlines from mobile copy/paste
@@ -298,13 +622,9 @@ async def sanitize_multiline_urls(multiline: str, client: httpx.AsyncClient) ->
     s = re.sub(r"\n{2,}", "\n", s).strip()
 
     lines = [l.strip() for l in s.splitlines() if l.strip()]
-    out_lines: list[str] = []
-    seen: set[str] = set()
+    candidates: list[tuple[str | None, str]] = []
 
     for raw_line in lines:
-        if len(out_lines) >= 10:
-            break
-
         line = raw_line
         manual_label: str | None = None
 
@@ -325,9 +645,6 @@ async def sanitize_multiline_urls(multiline: str, client: httpx.AsyncClient) ->
             matches = [line]
         
         for link in matches:
-            if len(out_lines) >= 10:
-                break
-
             # Validate URL
             try:
                 parsed = urllib.parse.urlparse(link)
@@ -335,42 +652,213 @@ async def sanitize_multiline_urls(multiline: str, client: httpx.AsyncClient) ->
                     continue
             except Exception:
                 continue
+            candidates.append((manual_label, link))
 
-            final_url: str = link
-            try:
-                # Resolve Channel 3 if necessary
-                final_url = await resolve_channel3_if_needed(link, client)
-            except Exception:
-                # Keep original link if resolution fails
-                final_url = link
+    return candidates
 
-            # Extra safety: never allow localhost in production; fall back to original
-            try:
-                host = (urllib.parse.urlparse(final_url).hostname or "").lower()
-                if _is_local_host(host) and not _is_dev():
-                    final_url = link
-            except Exception:
-                final_url = link
+async def _gather_bounded(func, items, limit: int) -> list:
+    """Run func(item) for every item with at most `limit` in flight; results keep input order."""
+    sem = asyncio.Semaphore(max(1, limit))
 
-            # Dedupe by final normalized URL
-            try:
-                norm = str(urllib.parse.urlparse(final_url).geturl())
-            except Exception:
-                norm = final_url
+    async def run(item):
+        async with sem:
+            return await func(item)
+
+    return await asyncio.gather(*(run(item) for item in items))
+
+async def _resolve_for_sanitize(link: str, client: httpx.AsyncClient) -> LinkResolution:
+    try:
+        # Resolve Channel 3 if necessary
+        resolution = await resolve_link(link, client)
+    except Exception:
+        # Keep original link if resolution fails
+        resolution = LinkResolution(final_url=link)
+
+    # Extra safety: never allow localhost in production; fall back to original
+    try:
+        host = (urllib.parse.urlparse(resolution.final_url).hostname or "").lower()
+        if _is_local_host(host) and not _is_dev():
+            resolution = LinkResolution(final_url=link)
+    except Exception:
+        resolution = LinkResolution(final_url=link)
+    return resolution
+
+async def _label_for(resolution: LinkResolution, client: httpx.AsyncClient) -> str:
+    if resolution.title_checked:
+        # The resolver already read this page's <head>; don't GET it again
+        title = resolution.title
+    else:
+        try:
+            title = await fetch_title(resolution.final_url, client)
+        except Exception:
+            title = None
+    return title or infer_label_from_url_py(resolution.final_url)
+
+@dataclass
+class SanitizedLink:
+    """One output line of the sanitizer, before it is formatted as "Label | URL"."""
+    label: str
+    url: str  # resolved destination
+    original_url: str
+    # False when labelled offline from the URL (nothing was fetched)
+    checked: bool = True
+
+def format_links(links: list[SanitizedLink]) -> str:
+    return "\n".join(f"{link.label} | {link.url}" for link in links)
+
+def infer_links(multiline: str) -> list[SanitizedLink]:
+    """
+    Offline counterpart of sanitize_links: same parsing, dedupe and cap, and
+    links stored in canonical form, but nothing is resolved and labels are
+    manual > inferred from URL.
+    Used to store a product immediately while the real sanitation runs later.
+    """
+    if not multiline:
+        return []
+
+    out: list[SanitizedLink] = []
+    seen: set[str] = set()
+    for manual_label, link in _split_link_candidates(multiline):
+        if len(out) >= SANITIZE_MAX_LINKS:
+            break
+        norm = canonicalize(link)
+        if norm in seen:
+            continue
+        seen.add(norm)
+        out.append(SanitizedLink(label=manual_label or infer_label_from_url_py(link), url=norm,
+                                 original_url=link, checked=False))
+    return out
+
+def parse_stored_links(product_url: str | None) -> list[SanitizedLink]:
+    """
+    Read back links stored as "Label | URL" lines (as written by the sanitizer),
+    e.g. to backfill product_links. No network, no dedupe or cap.
+    """
+    out: list[SanitizedLink] = []
+    for manual_label, link in _split_link_candidates(product_url or ""):
+        out.append(SanitizedLink(label=manual_label or infer_label_from_url_py(link), url=link,
+                                 original_url=link, checked=False))
+    return out
 
+async def sanitize_multiline_urls(multiline: str, client: httpx.AsyncClient) -> str:
+    """sanitize_links() formatted as "Label | URL" lines (the Product.product_url format)."""
+    if not multiline:
+        return multiline
+    return format_links(await sanitize_links(multiline, client))
+
+async def sanitize_links(multiline: str, client: httpx.AsyncClient) -> list[SanitizedLink]:
+    """
+    Accepts a multiline string of entries that may be:
+      - "Label | URL"
+      - "URL"
+      - Multiple URLs on one line (comma-separated or glued)
+    Returns the links in input order, each with its label, destination and original URL:
+      - Channel 3 URLs resolved to destination
+      - Labels filled by: manual > fetched title > inferred from URL
+      - Does not drop lines on failures; falls back to original URL + inferred label
+      - Destinations canonicalized (url_canon.canonicalize: tracking params, host case,
+        trailing slash) and capped to the first 10 unique ones
+    Resolution and title fetches run concurrently (bounded by
+    settings.link_sanitize_concurrency); output order matches input order.
+    """
+    if not multiline:
+        return []
+
+    candidates = _split_link_candidates(multiline)
+    limit = settings.link_sanitize_concurrency
+    accepted: list[tuple[str | None, str, LinkResolution, str]] = []
+    seen: set[str] = set()
+    pos = 0
+
+    # Resolve in rounds of just enough candidates to fill the cap. Duplicates are only
+    # known after resolution, so a later round runs only if earlier ones produced dupes.
+    while len(accepted) < SANITIZE_MAX_LINKS and pos < len(candidates):
+        window = candidates[pos:pos + SANITIZE_MAX_LINKS - len(accepted)]
+        pos += len(window)
+        resolutions = await _gather_bounded(lambda c: _resolve_for_sanitize(c[1], client), window, limit)
+
+        for (manual_label, link), resolution in zip(window, resolutions):
+            # Dedupe by canonical final URL, which is also the URL stored
+            norm = canonicalize(resolution.final_url)
             if norm in seen:
                 continue
             seen.add(norm)
+            accepted.append((manual_label, link, resolution, norm))
 
-            # Build label: manual > fetched title > inferred from URL
-            use_label: str | None = manual_label
-            if not use_label:
-                try:
-                    title = await fetch_title(final_url, client)
-                except Exception:
-                    title = None
-                use_label = title or infer_label_from_url_py(final_url)
+    # Build labels: manual > fetched title > inferred from URL
+    needs_title = [resolution for manual_label, _link, resolution, _url in accepted if not manual_label]
+    fetched = await _gather_bounded(lambda r: _label_for(r, client), needs_title, limit)
+    fetched_iter = iter(fetched)
 
-            out_lines.append(f"{use_label} | {final_url}")
+    return [
+        SanitizedLink(label=manual_label or next(fetched_iter), url=url, original_url=link)
+        for manual_label, link, _resolution, url in accepted
+    ]
 
-    return "\n".join(out_lines)
+# ---------------------------- Product links ---------------------------- #
+
+def _link_host(url: str) -> str | None:
+    try:
+        return (urllib.parse.urlparse(url).hostname or "").lower() or None
+    except ValueError:
+        return None
+
+def _product_link_values(links: list[SanitizedLink]) -> list[dict]:
+    checked_at = datetime.now(timezone.utc)
+    return [
+        {
+            "position": position,
+            "label": link.label,
+            "original_url": link.original_url,
+            "resolved_url": link.url,
+            "host": _link_host(link.url),
+            "last_checked": checked_at if link.checked else None,
+        }
+        for position, link in enumerate(links)
+    ]
+
+def product_link_rows(links: list[SanitizedLink]) -> list[ProductLink]:
+    """ProductLink objects for assigning to Product.links (positions follow list order)."""
+    return [ProductLink(**values) for values in _product_link_values(links)]
+
+def replace_product_links(db: Session, product_id: str, links: list[SanitizedLink]) -> None:
+    """
+    Rewrite a product's product_links rows inside the caller's transaction.
+    For callers that update products by id (background jobs); ORM callers assign
+    product_link_rows() to Product.links instead.
+    """
+    db.execute(delete(ProductLink).where(ProductLink.product_id == product_id))
+    values = _product_link_values(links)
+    if values:
+        db.execute(insert(ProductLink), [{"product_id": product_id, **v} for v in values])
+
+def backfill_product_links(db: Session, batch_size: int = 500) -> int:
+    """
+    Create product_links rows from product_url text for products that have none
+    (rows written before the table existed), in committed primary-key batches,
+    and re-render the bundles they belong to. Returns the number of products filled.
+    """
+    has_links = select(ProductLink.id).where(ProductLink.product_id == Product.id).exists()
+    filled = 0
+    after = None
+    while True:
+        query = select(Product.id, Product.product_url).where(~has_links)
+        if after is not None:
+            query = query.where(Product.id > after)
+        rows = db.execute(query.order_by(Product.id).limit(batch_size)).all()
+        if not rows:
+            return filled
+        changed = []
+        for product_id, product_url in rows:
+            links = parse_stored_links(product_url)
+            if links:
+                replace_product_links(db, product_id, links)
+                changed.append(product_id)
+        if changed:
+            bundle_ids = db.execute(
+                select(bundle_products.c.bundle_id).where(bundle_products.c.product_id.in_(changed))
+            ).scalars().all()
+            refresh_bundle_read_models(db, bundle_ids)
+        db.commit()
+        filled += len(changed)
+        after = rows[-1].id
@@ -1,5 +1,5 @@
 // Service for API calls to the FastAPI backend
-import type { Product } from '../types';
+import type { LinkHealthSummary, MigrationJobStatus, Product } from '../types';
 
 const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000/api';
 
@@ -15,6 +15,17 @@ function mapProductFromApi(api: any): Product {
     productUrl: api.product_url,
     // Backend doesn't store customImageUrl; it's client-side only
     customImageUrl: undefined,
+    links: Array.isArray(api.links)
+      ? api.links.map((l: any) => ({
+          position: l.position,
+          label: l.label,
+          url: l.resolved_url,
+          originalUrl: l.original_url,
+          host: l.host ?? null,
+          checkStatus: l.check_status ?? null,
+          redirectUrl: l.redirect_url ?? null,
+        }))
+      : undefined,
     feed: api.feed ?? undefined,
     createdAt: api.created_at ?? undefined,
     updatedAt: api.updated_at ?? undefined,
@@ -168,13 +179,23 @@ class ApiService {
     });
   }
 
-  // Admin: migrate existing products to final labeled links
-  async migrateLinks(): Promise<{ scanned: number; updated: number }> {
+  // Admin: start (or join) the background job that migrates existing products to final labeled links
+  async migrateLinks(): Promise<MigrationJobStatus> {
     return this.request('/admin/debug/migrate-links', {
       method: 'POST',
     });
   }
 
+  // Admin: progress and ETA of the latest link migration
+  async getMigrationStatus(): Promise<MigrationJobStatus> {
+    return this.request('/admin/debug/migrate-links/status');
+  }
+
+  // Admin: link health check schedule, counts and dead/redirected links
+  async getLinkHealth(): Promise<LinkHealthSummary> {
+    return this.request('/admin/debug/link-health');
+  }
+
   // Resolve Channel 3 URLs server-side (admin)
   async resolveUrls(urls: string[]): Promise<string[]> {
     try {
@@ -236,6 +257,60 @@ class ApiService {
     }
   }
 
+  // Public streamed batch resolver: calls onResult for each Channel 3 link as soon as the
+  // server has resolved it (NDJSON). Resolves true once the whole batch was reported.
+  // The server takes at most 20 Channel 3 links; the rest are left to the caller's fallback.
+  async publicResolveStream(
+    urls: string[],
+    onResult: (index: number, resolved: string, title: string | null) => void,
+    signal?: AbortSignal
+  ): Promise<boolean> {
+    const all = Array.isArray(urls) ? urls : [];
+    const list = all.slice(0, 20);
+    try {
+      const response = await fetch(`${API_BASE_URL}/public/resolve-urls/stream`, {
+        method: 'POST',
+        credentials: 'include',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ urls: list }),
+        signal,
+      });
+      if (!response.ok || !response.body) return false;
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let done = false;
+      const handleLine = (line: string) => {
+        if (!line.trim()) return;
+        const row = JSON.parse(line);
+        if (row?.done) {
+          done = true;
+          return;
+        }
+        const index = typeof row?.index === 'number' ? row.index : -1;
+        if (index < 0 || index >= list.length) return;
+        const title = typeof row.title === 'string' && row.title.trim().length > 0 ? row.title : null;
+        onResult(index, row.final_url || list[index], title);
+      };
+      for (;;) {
+        const { value, done: streamDone } = await reader.read();
+        if (streamDone) break;
+        buffer += decoder.decode(value, { stream: true });
+        let newline = buffer.indexOf('\n');
+        while (newline !== -1) {
+          handleLine(buffer.slice(0, newline));
+          buffer = buffer.slice(newline + 1);
+          newline = buffer.indexOf('\n');
+        }
+      }
+      handleLine(buffer + decoder.decode());
+      return done && list.length === all.length;
+    } catch {
+      return false;
+    }
+  }
+
   // Public resolver with titles (preferred for runtime clean labels)
   async publicResolveAndTitles(urls: string[]): Promise<{ resolved: string[]; titles: (string | null)[] }> {
     try {
@@ -1,3 +1,14 @@
+export interface ProductLink {
+  position: number;
+  label: string;
+  url: string; // resolved destination
+  originalUrl: string;
+  host?: string | null;
+  // Scheduled link health check result; null until checked
+  checkStatus?: 'ok' | 'redirected' | 'dead' | null;
+  redirectUrl?: string | null;
+}
+
 export interface Product {
   id: string;
   slug: string;
@@ -6,8 +17,49 @@ export interface Product {
   imageUrl?: string | null; // The default generated image (may be absent)
   productUrl: string;
   customImageUrl?: string; // The developer-uploaded image
+  links?: ProductLink[]; // Structured productUrl lines from the backend (product_links), in display order
   feed?: string; // Optional feed key for future multi-feed support (currently single Eve feed)
   // Timestamps from backend (ISO strings)
   createdAt?: string;
   updatedAt?: string;
 }
+
+// Background link migration job (GET /api/admin/debug/migrate-links/status)
+export interface MigrationJobStatus {
+  id: string;
+  status: 'running' | 'done' | 'failed' | 'cancelled';
+  total: number;
+  scanned: number;
+  updated: number;
+  failed: number;
+  progress: number;
+  products_per_second: number | null;
+  eta_seconds: number | null;
+  error: string | null;
+}
+
+// Scheduled link health checks (GET /api/admin/debug/link-health)
+export interface LinkHealthProblem {
+  product_id: string;
+  product_title: string;
+  product_slug: string;
+  position: number;
+  label: string;
+  resolved_url: string;
+  check_status: 'redirected' | 'dead';
+  http_status: number | null;
+  redirect_url: string | null;
+  check_failures: number;
+  last_checked: string | null;
+}
+
+export interface LinkHealthSummary {
+  enabled: boolean;
+  window_hours: number;
+  interval_seconds: number;
+  per_tick: number;
+  total: number;
+  due: number;
+  by_status: { ok: number; redirected: number; dead: number; unchecked: number };
+  problems: LinkHealthProblem[];
+}